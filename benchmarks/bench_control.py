@@ -0,0 +1,177 @@
+"""
+Control server benchmark.
+
+Serves a FakeWindowSystem desktop from ControlServer and measures requests
+per second from local clients: whole-list and filtered list requests over
+loopback TCP and a Unix socket, and hide/show round trips. Clients run in
+separate processes, many connections each, so they do not share the
+server's interpreter lock. For comparison it prints how many list requests
+per second could be answered if each one enumerated the windows.
+
+    python benchmarks/bench_control.py
+    python benchmarks/bench_control.py --windows 1000 --clients 64 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep learned strategies and the hidden window journal out of the user's settings
+os.environ["TASKBAR_MANAGER_HOME"] = tempfile.mkdtemp(prefix="taskbar-bench-")
+
+from src.backends import FakeWindowSystem  # noqa: E402
+from src.control_server import ControlServer, load_token  # noqa: E402
+from src.hide_strategy import StrategyCache  # noqa: E402
+from src.journal import HiddenJournal  # noqa: E402
+from src.snapshot import scan_windows  # noqa: E402
+from src.window_ops import BulkWindowEngine  # noqa: E402
+
+
+async def client(address, kind, request, count):
+    """Send count requests one after another on one connection"""
+    if kind == "unix":
+        reader, writer = await asyncio.open_unix_connection(address, limit=1 << 24)
+    else:
+        reader, writer = await asyncio.open_connection(*address, limit=1 << 24)
+    line = json.dumps(request).encode() + b"\n"
+    for _ in range(count):
+        writer.write(line)
+        response = await reader.readline()
+        if not response.startswith(b'{"id":null,"ok":true'):
+            raise RuntimeError(response[:200])
+    writer.close()
+
+
+def client_process(address, kind, request, clients, count, elapsed):
+    """Run clients connections at once and report the seconds they took"""
+
+    async def run():
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(client(address, kind, request, count) for _ in range(clients))
+        )
+        elapsed.put(time.perf_counter() - started)
+
+    asyncio.run(run())
+
+
+def measure(address, kind, request, processes, clients, count):
+    """Return requests per second with clients connections in each of processes"""
+    # Spawned, not forked, as the server's threads are running
+    context = multiprocessing.get_context("spawn")
+    elapsed = context.Queue()
+    workers = [
+        context.Process(
+            target=client_process,
+            args=(address, kind, request, clients, count, elapsed),
+        )
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        if worker.exitcode:
+            raise RuntimeError(f"client process failed with {worker.exitcode}")
+    # Timed inside the clients, so starting the processes is not counted
+    return processes * clients * count / max(elapsed.get() for _ in workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        default=300,
+        help="top-level windows on the desktop (default: 300)",
+    )
+    parser.add_argument("--processes", type=int, default=2, help="client processes")
+    parser.add_argument(
+        "--clients", type=int, default=32, help="connections per process"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=100, help="requests per connection"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds added to every backend call (default: 20e-6)",
+    )
+    args = parser.parse_args()
+
+    backend = FakeWindowSystem(call_latency=args.latency)
+    backend.populate(args.windows)
+    hidden = set()
+    started = time.perf_counter()
+    windows = scan_windows(backend, hidden)
+    scan_time = time.perf_counter() - started
+    process = max(
+        {window.process for window in windows},
+        key=lambda name: sum(window.process == name for window in windows),
+    )
+
+    token = load_token()
+    journal = HiddenJournal(os.path.join(tempfile.mkdtemp(), "journal"))
+    engine = BulkWindowEngine(backend, strategies=StrategyCache(), journal=journal)
+    addresses = ["127.0.0.1:0"]
+    if hasattr(asyncio, "start_unix_server"):
+        addresses.append(os.path.join(tempfile.mkdtemp(), "control.sock"))
+
+    connections = args.processes * args.clients
+    print(
+        f"{args.windows} windows ({len(windows)} listed), {connections} connections, "
+        f"{args.requests} requests each"
+    )
+    print(f"enumerating per request: {1 / scan_time:,.0f} list requests/sec")
+    print(f"{'transport':<11}{'request':<22}{'req/sec':>10}")
+    for address in addresses:
+        server = ControlServer(engine, address)
+        server.seed(windows)
+        bound = server.start()
+        try:
+            for name, request, count in (
+                ("list", {"op": "list", "token": token}, args.requests),
+                (
+                    "list --process",
+                    {"op": "list", "process": [process], "token": token},
+                    args.requests,
+                ),
+                ("stats", {"op": "stats", "token": token}, args.requests),
+                ("hide + show", None, max(1, args.requests // 10)),
+            ):
+                if request is None:
+                    # Alternate hides and shows of one application's windows
+                    rates = [
+                        measure(
+                            bound,
+                            server.kind,
+                            {"op": op, "process": [process], "token": token},
+                            1,
+                            1,
+                            count,
+                        )
+                        for op in ("hide", "show")
+                    ]
+                    rate = sum(rates) / len(rates)
+                else:
+                    rate = measure(
+                        bound, server.kind, request, args.processes, args.clients, count
+                    )
+                print(f"{server.kind:<11}{name:<22}{rate:>10,.0f}")
+        finally:
+            server.stop()
+    engine.shutdown()
+    journal.close()
+
+
+if __name__ == "__main__":
+    main()
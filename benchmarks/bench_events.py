@@ -0,0 +1,171 @@
+"""
+Live window tracking benchmark.
+
+Replays bursty streams of window events (create, destroy, name change, show
+and hide) through ScriptedEventSource into a WindowTracker over a
+FakeWindowSystem desktop, flushing every coalesce interval as the GUI does.
+Reports how many events the tracker applied per second of flush time and
+how many window updates coalescing saved, then checks that the tracked list
+matches a fresh scan. Exits non-zero if it does not.
+
+    python benchmarks/bench_events.py
+    python benchmarks/bench_events.py --windows 1000 10000 --events 50000 --burst 100
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep learned strategies and the hidden window journal out of the user's settings
+os.environ["TASKBAR_MANAGER_HOME"] = tempfile.mkdtemp(prefix="taskbar-bench-")
+
+from src.backends import SW_HIDE, SW_SHOW, FakeWindowSystem  # noqa: E402
+from src.snapshot import scan_windows  # noqa: E402
+from src.window_events import (  # noqa: E402
+    ScriptedEventSource,
+    WindowEvent,
+    WindowTracker,
+)
+
+# Relative weight of each kind of burst in the script
+BURST_MIX = {"name_change": 5, "create": 2, "destroy": 1, "show": 1, "hide": 1}
+
+
+def script_events(backend, count, burst, seed=0):
+    """Change the desktop and return the events that describe the changes
+
+    A name change burst retitles one window burst times, as a progress
+    title does; a new window announces itself with create, show and name
+    change. The desktop is left in its final state, so the tracker has to
+    describe the windows after the whole script to match a scan.
+    """
+    rng = random.Random(seed)
+    kinds = list(BURST_MIX)
+    weights = [BURST_MIX[kind] for kind in kinds]
+    events = []
+    while len(events) < count:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "create":
+            pid = 1000 + rng.randrange(50)
+            hwnd = backend.add_window(
+                f"New window {len(events)}", process=f"app{pid - 1000}.exe", pid=pid
+            )
+            events += [
+                WindowEvent(announced, hwnd)
+                for announced in ("create", "show", "name_change")
+            ]
+            continue
+        hwnd = rng.choice(list(backend.windows))
+        if kind == "destroy":
+            backend.remove_window(hwnd)
+            events.append(WindowEvent(kind, hwnd))
+        elif kind == "name_change":
+            for step in range(burst):
+                backend.windows[hwnd].title = f"Working {step + 1}/{burst}"
+                events.append(WindowEvent(kind, hwnd))
+        else:
+            backend.show_window(hwnd, SW_SHOW if kind == "show" else SW_HIDE)
+            events.append(WindowEvent(kind, hwnd))
+    return events
+
+
+def run(count, events, burst, rate, coalesce_ms, latency):
+    """Replay the script on a desktop of count windows; returns (stats, matches)"""
+    backend = FakeWindowSystem(call_latency=latency)
+    backend.populate(count)
+    seed = scan_windows(backend)
+    source = ScriptedEventSource(script_events(backend, events, burst), rate=rate)
+    tracker = WindowTracker(backend, source, coalesce_ms=coalesce_ms)
+    tracker.seed(seed)
+    tracker.start()
+    try:
+        while not source.wait(coalesce_ms / 1000):
+            tracker.flush()
+        tracker.flush()
+    finally:
+        tracker.stop()
+    expected = {window.hwnd: window for window in scan_windows(backend)}
+    return tracker.stats(), tracker.windows == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="desktop sizes to run (default: 1000 10000)",
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=20000,
+        help="events to replay on each desktop (default: 20000)",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=50,
+        help="name changes per title burst (default: 50)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=50000,
+        help="events delivered per second, 0 for unthrottled (default: 50000)",
+    )
+    parser.add_argument(
+        "--coalesce-ms",
+        type=int,
+        default=50,
+        help="milliseconds between flushes (default: 50)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds per fake backend call (default: 20e-6)",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'windows':>8}{'events':>9}{'flushes':>9}{'applied':>9}"
+        f"{'saved':>9}{'applied/s':>12}{'flush ms':>10}"
+    )
+    failures = []
+    for count in args.windows:
+        started = time.perf_counter()
+        stats, matches = run(
+            count,
+            args.events,
+            args.burst,
+            args.rate or None,
+            args.coalesce_ms,
+            args.latency,
+        )
+        elapsed = time.perf_counter() - started
+        saved = stats["events_received"] - stats["events_applied"]
+        print(
+            f"{count:>8}{stats['events_received']:>9}{stats['flushes']:>9}"
+            f"{stats['events_applied']:>9}{saved:>9}"
+            f"{stats['applied_per_sec']:>12.0f}{stats['flush_time'] * 1000:>10.1f}"
+            f"   ({elapsed:.2f} s in total)"
+        )
+        if stats["events_received"] < args.events:
+            failures.append(f"{count} windows: events were lost before a flush")
+        if not matches:
+            failures.append(f"{count} windows: the tracked list differs from a scan")
+    for message in failures:
+        print(f"FAILED: {message}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Hidden window journal benchmark.
+
+Reports the cost of logging hide/show operations, of replaying and
+compacting a journal after many of them, and of restoring the windows it
+left stranded, against an in-memory window system. It then fails hides
+part way through and checks that a window the failed hide already changed
+keeps its journal entry and can still be shown. Exits non-zero if a window
+is left hidden.
+
+    python benchmarks/bench_journal.py
+    python benchmarks/bench_journal.py --operations 20000 --stranded 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.backends import SW_HIDE, SW_MINIMIZE, FakeWindowSystem  # noqa: E402
+from src.journal import HiddenJournal, capture_entry  # noqa: E402
+from src.window_ops import BulkWindowEngine  # noqa: E402
+
+
+def report(label, seconds, unit="ms"):
+    scale = 1e6 if unit == "us" else 1000
+    print(f"{label:<34}{seconds * scale:9.1f} {unit}")
+
+
+def check_failed_hides(latency):
+    """Fail the first and the second state-changing hide step of two windows
+
+    Returns a list of failure messages.
+    """
+    backend = FakeWindowSystem(call_latency=latency)
+    untouched = backend.add_window("Untouched", process="app.exe", pid=1000)
+    changed = backend.add_window("Changed", process="app.exe", pid=1000)
+    show_window = backend.show_window
+
+    def failing_show_window(hwnd, command):
+        if (hwnd, command) in ((untouched, SW_HIDE), (changed, SW_MINIMIZE)):
+            raise OSError(f"show_window({command}) failed")
+        return show_window(hwnd, command)
+
+    backend.show_window = failing_show_window
+    journal = HiddenJournal(os.path.join(tempfile.mkdtemp(), "failed.journal"))
+    engine = BulkWindowEngine(backend, journal=journal)
+    failures = []
+    try:
+        result = engine.run("hide", [untouched, changed])
+        if any(window_result.ok for window_result in result.results):
+            failures.append("a failing hide reported success")
+        if untouched in journal.entries:
+            failures.append("a hide that changed nothing kept its journal entry")
+        if changed not in journal.entries:
+            failures.append("a hide that hid the window lost its journal entry")
+        if backend.is_window_visible(changed):
+            failures.append("the second hide step failed before the first ran")
+        engine.run("show", list(journal.entries))
+        if not backend.is_window_visible(changed) or changed in journal.entries:
+            failures.append("the partly hidden window was not restored")
+    finally:
+        engine.shutdown()
+        journal.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--operations",
+        type=int,
+        default=5000,
+        help="hide/show pairs logged before the restart (default: 5000)",
+    )
+    parser.add_argument(
+        "--stranded",
+        type=int,
+        default=200,
+        help="windows left hidden at the restart (default: 200)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds per fake backend call (default: 20e-6)",
+    )
+    args = parser.parse_args()
+
+    backend = FakeWindowSystem(call_latency=args.latency)
+    hwnds = [
+        backend.add_window(
+            f"Window {index}", process=f"app{index % 25}.exe", pid=1000 + index % 25
+        )
+        for index in range(max(args.stranded, 1))
+    ]
+    path = os.path.join(tempfile.mkdtemp(), "hidden_windows.journal")
+
+    # Session 1: many hide/show round trips, then hide through the engine and "crash"
+    journal = HiddenJournal(path)
+    entries = [capture_entry(backend, hwnd) for hwnd in hwnds]
+    started = time.perf_counter()
+    for index in range(args.operations):
+        entry = entries[index % len(entries)]
+        journal.record_hide(entry)
+        journal.record_show(entry.hwnd)
+    appended = time.perf_counter() - started
+    started = time.perf_counter()
+    journal.sync()
+    synced = time.perf_counter() - started
+
+    engine = BulkWindowEngine(backend, journal=journal)
+    engine.run("hide", hwnds[: args.stranded])
+    engine.shutdown()
+    # A crash: the journal is never closed, so nothing is compacted. Dropping
+    # it closes its files, as the crashed process exiting would
+    records = journal.records
+    journal = engine = None
+
+    # Session 2: replay, compact, verify the windows and show them again
+    started = time.perf_counter()
+    journal = HiddenJournal(path)
+    opened = time.perf_counter() - started
+    stranded = journal.stranded(backend)
+    found = time.perf_counter() - started
+    engine = BulkWindowEngine(
+        backend, {entry.hwnd: entry.rect for entry in stranded}, journal=journal
+    )
+    result = engine.run("show", [entry.hwnd for entry in stranded])
+    restored = time.perf_counter() - started
+    engine.shutdown()
+    journal.close()
+
+    visible = sum(backend.is_window_visible(hwnd) for hwnd in hwnds[: args.stranded])
+    print(
+        f"{records} records, {len(stranded)} stranded windows, "
+        f"{visible} visible after the restore"
+    )
+    report("append per record", appended / (2 * args.operations), "us")
+    report("fsync of the batch", synced)
+    report("replay and compact", opened)
+    report("find stranded windows", found - opened)
+    report("bulk restore", result.elapsed)
+    report("restart to restored", restored)
+
+    failures = check_failed_hides(args.latency)
+    if visible != args.stranded:
+        failures.append(f"{args.stranded - visible} stranded windows left hidden")
+    for message in failures:
+        print(f"FAILED: {message}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Window list benchmark.
+
+Compares the virtualized window list with a Treeview holding one item per
+window: populating, refreshing with a few changed windows, scrolling,
+sorting and selecting everything. Needs a display; on Linux run it under
+Xvfb:
+
+    xvfb-run python benchmarks/bench_list.py
+    xvfb-run python benchmarks/bench_list.py --windows 1000 10000 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tkinter as tk  # noqa: E402
+from tkinter import ttk  # noqa: E402
+
+from src.records import FLAG_VISIBLE, WindowRecord  # noqa: E402
+from src.virtual_list import VirtualList  # noqa: E402
+
+COLUMNS = (
+    ("title", "Window Title", 250),
+    ("process", "Process Name", 150),
+    ("pid", "Process ID", 80),
+    ("visible", "Visibility", 80),
+)
+SCROLL_STEPS = 200
+
+
+def make_windows(count, rng):
+    return [
+        WindowRecord(
+            0x10000 + index * 4,
+            f"Window {rng.randrange(count * 10)}",
+            f"app{rng.randrange(50)}.exe",
+            1000 + rng.randrange(5000),
+            rng.choice([FLAG_VISIBLE, 0]),
+        )
+        for index in range(count)
+    ]
+
+
+def changed_copy(windows, rng, fraction=0.01):
+    """Return the windows with a fraction of their titles changed"""
+    windows = [
+        WindowRecord(
+            window.hwnd, window.title, window.process, window.pid, window.flags
+        )
+        for window in windows
+    ]
+    for window in rng.sample(windows, max(1, int(len(windows) * fraction))):
+        window.title += " (changed)"
+    return windows
+
+
+def tag(window):
+    return "visible" if window.is_visible else "hidden"
+
+
+def timed(root, call):
+    """Run call and let Tk redraw; returns the elapsed seconds"""
+    started = time.perf_counter()
+    call()
+    root.update()
+    return time.perf_counter() - started
+
+
+def bench_virtual(root, windows, changed, rng):
+    view = VirtualList(root, COLUMNS, key="hwnd", tag=tag)
+    view.pack(fill=tk.BOTH, expand=True)
+    root.update()
+    results = {
+        "populate": timed(root, lambda: view.set_records(windows)),
+        "refresh 1% changed": timed(root, lambda: view.set_records(changed)),
+    }
+
+    def scroll():
+        for _ in range(SCROLL_STEPS):
+            view.yview("moveto", rng.random())
+            root.update_idletasks()
+
+    results["scroll step"] = timed(root, scroll) / SCROLL_STEPS
+    results["sort by title"] = timed(root, lambda: view.sort_by("title"))
+    results["select all"] = timed(root, view.select_all)
+    view.destroy()
+    return results
+
+
+def bench_treeview(root, windows, changed, rng):
+    tree = ttk.Treeview(root, columns=[name for name, _, _ in COLUMNS], show="headings")
+    for name, heading, width in COLUMNS:
+        tree.heading(name, text=heading)
+        tree.column(name, width=width)
+    tree.pack(fill=tk.BOTH, expand=True)
+    root.update()
+
+    def values(window):
+        return window.title, window.process, window.pid, window.visible
+
+    def populate():
+        for window in windows:
+            tree.insert(
+                "",
+                tk.END,
+                iid=str(window.hwnd),
+                values=values(window),
+                tags=(tag(window),),
+            )
+
+    def refresh():
+        # Like the keyed refresh the list used before: rewrite changed rows only
+        for old, new in zip(windows, changed):
+            if old != new:
+                tree.item(str(new.hwnd), values=values(new), tags=(tag(new),))
+
+    results = {
+        "populate": timed(root, populate),
+        "refresh 1% changed": timed(root, refresh),
+    }
+
+    def scroll():
+        for _ in range(SCROLL_STEPS):
+            tree.yview_moveto(rng.random())
+            root.update_idletasks()
+
+    def sort():
+        ordered = sorted(changed, key=lambda window: window.title.lower())
+        for index, window in enumerate(ordered):
+            tree.move(str(window.hwnd), "", index)
+
+    results["scroll step"] = timed(root, scroll) / SCROLL_STEPS
+    results["sort by title"] = timed(root, sort)
+    results["select all"] = timed(root, lambda: tree.selection_set(tree.get_children()))
+    tree.destroy()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 50000],
+        help="list sizes (default: 1000 10000 50000)",
+    )
+    parser.add_argument(
+        "--treeview-limit",
+        type=int,
+        default=20000,
+        help="skip the plain Treeview above this many windows (default: 20000)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.geometry("800x500")
+    print(f"{'windows':>8}  {'operation':<20}{'virtual':>12}{'treeview':>12}")
+    for count in args.windows:
+        rng = random.Random(args.seed)
+        windows = make_windows(count, rng)
+        changed = changed_copy(windows, rng)
+        virtual = bench_virtual(root, windows, changed, random.Random(args.seed))
+        plain = None
+        if count <= args.treeview_limit:
+            plain = bench_treeview(root, windows, changed, random.Random(args.seed))
+        for operation, seconds in virtual.items():
+            other = f"{plain[operation] * 1000:9.2f} ms" if plain else f"{'-':>12}"
+            print(f"{count:>8}  {operation:<20}{seconds * 1000:9.2f} ms{other}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Panic hotkey benchmark.
+
+Simulates panic and restore hotkey presses on a FakeWindowSystem desktop and
+reports the time from the keypress until every target window is hidden (or
+shown) and journaled, with the target handles kept precomputed as the GUI
+keeps them. For comparison, the panic press is also timed the slow way, the
+way a press without precomputed targets would work: enumerate the desktop,
+filter the listed windows, then hide them.
+
+    python benchmarks/bench_panic.py
+    python benchmarks/bench_panic.py --windows 500 5000 --presses 20 --latency 50e-6
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep learned strategies and the hidden window journal out of the user's settings
+os.environ["TASKBAR_MANAGER_HOME"] = tempfile.mkdtemp(prefix="taskbar-bench-")
+
+from src.backends import DEFAULT_WINDOW_MIX, FakeWindowSystem  # noqa: E402
+from src.hide_strategy import StrategyCache  # noqa: E402
+from src.hotkeys import ManualHotkeySource, PanicButton  # noqa: E402
+from src.journal import HiddenJournal  # noqa: E402
+from src.rules import RuleSet, parse_rules  # noqa: E402
+from src.snapshot import scan_windows  # noqa: E402
+from src.window_ops import BulkWindowEngine  # noqa: E402
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run(count, presses, latency, resistant_apps):
+    """Return (targets, panic, restore and enumerate-first latencies)"""
+    backend = FakeWindowSystem(call_latency=latency)
+    backend.populate(
+        count,
+        mix=dict(
+            DEFAULT_WINDOW_MIX,
+            app=DEFAULT_WINDOW_MIX["app"] + DEFAULT_WINDOW_MIX["resistant"],
+            resistant=0,
+        ),
+    )
+    # Real applications ignore SW_HIDE for all their windows or for none
+    for window in backend.windows.values():
+        window.hide_resistant = window.pid % 100 < resistant_apps * 100
+    hidden = set()
+    journal = HiddenJournal(os.path.join(tempfile.mkdtemp(), "journal"))
+    engine = BulkWindowEngine(backend, strategies=StrategyCache(), journal=journal)
+    finished = threading.Event()
+    results = {"hide": [], "show": []}
+
+    def deliver(result):
+        results[result.action].append(result.latency)
+        for window_result in result.result.results:
+            if result.action == "show":
+                hidden.discard(window_result.hwnd)
+            elif window_result.ok:
+                hidden.add(window_result.hwnd)
+        finished.set()
+
+    source = ManualHotkeySource()
+    # Target every listed window, the most a press can have to hide
+    every_window = RuleSet(parse_rules([{"title": "*", "action": "hide"}]))
+    panic = PanicButton(engine, source, every_window, deliver=deliver)
+    panic.seed(scan_windows(backend, hidden))
+    panic.start()
+    targets = len(panic.targets)
+    enumerate_first = []
+    try:
+        for _ in range(presses):
+            for name in ("panic", "restore"):
+                finished.clear()
+                threading.Thread(target=source.press, args=(name,)).start()
+                finished.wait(10)
+            # The GUI reseeds the targets from the refresh after a restore
+            panic.seed(scan_windows(backend, hidden))
+
+            started = time.perf_counter()
+            listed = [window.hwnd for window in scan_windows(backend, hidden)]
+            engine.run("hide", listed)
+            enumerate_first.append(time.perf_counter() - started)
+            engine.run("show", listed)
+    finally:
+        panic.stop()
+        engine.shutdown()
+        journal.close()
+    return targets, results["hide"], results["show"], enumerate_first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=[300, 3000],
+        help="top-level windows on the desktop (default: 300 3000)",
+    )
+    parser.add_argument("--presses", type=int, default=10)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds added to every backend call (default: 20e-6)",
+    )
+    parser.add_argument(
+        "--resistant-apps",
+        type=float,
+        default=0.0,
+        help="share of applications whose windows ignore SW_HIDE and need "
+        "the slower hide strategies (default: 0)",
+    )
+    args = parser.parse_args()
+
+    print(f"latency {args.latency * 1e6:.0f} us/call, {args.presses} presses each")
+    print(
+        f"{'windows':>8}{'targets':>9}  {'press':<18}"
+        f"{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}"
+    )
+    for count in args.windows:
+        targets, hides, shows, enumerate_first = run(
+            count, args.presses, args.latency, args.resistant_apps
+        )
+        for name, latencies in (
+            ("panic", hides),
+            ("restore", shows),
+            ("enumerate + hide", enumerate_first),
+        ):
+            print(
+                f"{count:>8}{targets:>9}  {name:<18}"
+                f"{percentile(latencies, 0.5) * 1000:>8.1f}"
+                f"{percentile(latencies, 0.95) * 1000:>8.1f}"
+                f"{max(latencies) * 1000:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
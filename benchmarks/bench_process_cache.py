@@ -0,0 +1,134 @@
+"""
+Process cache benchmark.
+
+Starts real processes and looks them up through ProcessCache the way a scan
+does, with several windows per process, and reports the cost per lookup
+with and without the cache. It then checks the cache's bookkeeping against
+the real processes: repeat lookups are hits, a cache smaller than the
+process count evicts, and a process that exits is invalidated rather than
+served stale. Exits non-zero if a check fails, so it runs on Linux as a test.
+
+    python benchmarks/bench_process_cache.py
+    python benchmarks/bench_process_cache.py --processes 50 --windows 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import psutil  # noqa: E402
+
+from src.process_cache import ProcessCache  # noqa: E402
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(600)"]
+
+
+def uncached_lookup(pid):
+    process = psutil.Process(pid)
+    with process.oneshot():
+        return process.name(), process.exe()
+
+
+def scan(cache, pids, windows):
+    """Look up every process once per window; returns seconds per lookup"""
+    started = time.perf_counter()
+    for pid in pids:
+        for _ in range(windows):
+            cache.lookup(pid)
+    return (time.perf_counter() - started) / (len(pids) * windows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=20,
+        help="real processes to start (default: 20)",
+    )
+    parser.add_argument(
+        "--windows",
+        type=int,
+        default=5,
+        help="windows per process, looked up once each (default: 5)",
+    )
+    args = parser.parse_args()
+
+    children = [subprocess.Popen(SLEEPER) for _ in range(max(args.processes, 2))]
+    pids = [child.pid for child in children]
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    try:
+        started = time.perf_counter()
+        for pid in pids:
+            for _ in range(args.windows):
+                uncached_lookup(pid)
+        uncached = (time.perf_counter() - started) / (len(pids) * args.windows)
+
+        # One scan inside the ttl: one miss per process, every other window a hit
+        cache = ProcessCache(max_size=len(pids), ttl=60.0)
+        cached = scan(cache, pids, args.windows)
+        stats = cache.stats()
+        check(stats["misses"] == len(pids), f"expected {len(pids)} misses: {stats}")
+        check(
+            stats["hits"] == len(pids) * (args.windows - 1),
+            f"expected {len(pids) * (args.windows - 1)} hits: {stats}",
+        )
+        check(
+            all(cache.lookup(pid).status == "ok" for pid in pids),
+            "a live process was not ok",
+        )
+
+        # Past the ttl entries are revalidated by create time, not refetched
+        cache.ttl = 0.0
+        revalidated = scan(cache, pids, 1)
+        check(
+            cache.stats()["misses"] == len(pids),
+            f"revalidation refetched: {cache.stats()}",
+        )
+
+        # A process that exits invalidates its entry
+        children[0].kill()
+        children[0].wait()
+        info = cache.lookup(pids[0])
+        stats = cache.stats()
+        check(
+            info.status == "no_such_process", f"exited process served as {info.status}"
+        )
+        check(stats["invalidations"] == 1, f"expected one invalidation: {stats}")
+        check(stats["misses"] == len(pids) + 1, f"expected the exit to miss: {stats}")
+
+        # Half the processes no longer fit, so the least recently used go
+        small = ProcessCache(max_size=len(pids) // 2, ttl=60.0)
+        scan(small, pids[1:], 1)
+        stats = small.stats()
+        check(
+            stats["evictions"] == len(pids) - 1 - len(pids) // 2,
+            f"expected {len(pids) - 1 - len(pids) // 2} evictions: {stats}",
+        )
+        check(stats["size"] == len(pids) // 2, f"cache grew past max_size: {stats}")
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+
+    print(f"{len(pids)} processes, {args.windows} windows each")
+    print(f"{'uncached lookup':<28}{uncached * 1e6:9.1f} us")
+    print(f"{'cached lookup, one scan':<28}{cached * 1e6:9.1f} us")
+    print(f"{'revalidated lookup':<28}{revalidated * 1e6:9.1f} us")
+    for message in failures:
+        print(f"FAILED: {message}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
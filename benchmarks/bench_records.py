@@ -0,0 +1,142 @@
+"""
+Window record benchmark.
+
+Compares the slotted WindowRecord with the per-window dict the list used
+before: memory per window, allocations made by a refresh scan, and the cost
+of finding a window by handle and all windows of a process (selection and
+Hide All Similar), against an in-memory window system.
+
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --windows 1000 10000 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.backends import FakeWindowSystem  # noqa: E402
+from src.records import WindowTable  # noqa: E402
+from src.snapshot import (  # noqa: E402
+    get_process_name_from_hwnd,
+    is_alt_tab_window,
+    scan_windows,
+)
+
+LOOKUPS = 1000
+
+
+def scan_dicts(backend, hidden_windows=()):
+    """The scan as it was before WindowRecord: one dict per listed window"""
+    windows = []
+    for hwnd in backend.enum_windows():
+        if not (
+            is_alt_tab_window(backend, hwnd, hidden_windows) or hwnd in hidden_windows
+        ):
+            continue
+        title = backend.get_window_text(hwnd)
+        proc_name, pid = get_process_name_from_hwnd(backend, hwnd)
+        visibility = "Visible" if backend.is_window_visible(hwnd) else "Hidden"
+        windows.append(
+            {
+                "hwnd": hwnd,
+                "title": title,
+                "process": proc_name,
+                "pid": pid,
+                "visible": visibility,
+            }
+        )
+    return windows
+
+
+def traced(call):
+    """Run call under tracemalloc; return (result, bytes kept, allocations kept)"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = call()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    return (
+        result,
+        sum(stat.size_diff for stat in stats),
+        sum(stat.count_diff for stat in stats),
+    )
+
+
+def timed(call, repeat=LOOKUPS):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 50000],
+        help="windows on the simulated desktop (default: 1000 10000 50000)",
+    )
+    parser.add_argument("--processes", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'windows':>8}{'listed':>8}  {'shape':<8}{'bytes/win':>11}{'allocs/win':>12}"
+        f"{'by hwnd':>11}{'by process':>12}"
+    )
+    for count in args.windows:
+        backend = FakeWindowSystem()
+        backend.populate(count, processes=args.processes)
+        # Warm the process cache so both scans see the same names
+        scan_windows(backend)
+
+        dicts, dict_bytes, dict_allocs = traced(lambda: scan_dicts(backend))
+        records, record_bytes, record_allocs = traced(lambda: scan_windows(backend))
+        table = WindowTable(records)
+        listed = len(records)
+        middle = records[listed // 2]
+        target = middle.process.lower()
+
+        by_hwnd = {
+            "dict": timed(
+                lambda: next(
+                    window for window in dicts if window["hwnd"] == middle.hwnd
+                )
+            ),
+            "record": timed(lambda: table.get(middle.hwnd)),
+        }
+        by_process = {
+            "dict": timed(
+                lambda: [
+                    window["hwnd"]
+                    for window in dicts
+                    if window["process"].lower() == target
+                ],
+                100,
+            ),
+            "record": timed(
+                lambda: [window.hwnd for window in table.group(target)], 100
+            ),
+        }
+        for shape, size, allocs in (
+            ("dict", dict_bytes, dict_allocs),
+            ("record", record_bytes, record_allocs),
+        ):
+            print(
+                f"{count:>8}{listed:>8}  {shape:<8}{size / listed:>11.0f}"
+                f"{allocs / listed:>12.1f}{by_hwnd[shape] * 1e6:>8.2f} us"
+                f"{by_process[shape] * 1e6:>9.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Auto-hide rule benchmark.
+
+Reports the cost of matching one window against rule sets of growing size,
+for the compiled RuleSet and for checking every rule in turn.
+
+    python benchmarks/bench_rules.py
+    python benchmarks/bench_rules.py --rules 10 100 1000 --windows 5000
+"""
+
+import argparse
+import fnmatch
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.records import FLAG_VISIBLE, WindowRecord  # noqa: E402
+from src.rules import RuleSet, parse_rules  # noqa: E402
+
+
+def make_rules(count, rng):
+    """Return rule dicts mixing exact processes, exe paths and title patterns"""
+    rules = []
+    for index in range(count):
+        kind = index % 4
+        if kind == 0:
+            rules.append({"process": f"app{index}.exe", "action": "hide"})
+        elif kind == 1 and index % 8 == 1:
+            rules.append(
+                {
+                    "process": f"app{rng.randrange(count)}.exe",
+                    "title": f"*Document {index}*",
+                    "action": "hide",
+                }
+            )
+        elif kind == 1:
+            # Title globs on any process share one bucket
+            rules.append({"title": f"*Document {index} -*", "action": "hide"})
+        elif kind == 2:
+            rules.append({"exe": f"c:\\tools\\tool{index}.exe", "action": "show"})
+        else:
+            rules.append(
+                {
+                    "title_regex": f"^Meeting {index} ",
+                    "visible": "visible",
+                    "action": "hide",
+                }
+            )
+    return rules
+
+
+def make_windows(count, rule_count, rng):
+    windows = []
+    for index in range(count):
+        app = rng.randrange(rule_count * 2)
+        windows.append(
+            WindowRecord(
+                index,
+                rng.choice(
+                    [
+                        f"Document {rng.randrange(rule_count)} - Editor",
+                        f"Meeting {rng.randrange(rule_count)} - Call",
+                        "Inbox - Mail",
+                    ]
+                ),
+                f"app{app}.exe",
+                app,
+                rng.choice([FLAG_VISIBLE, 0]),
+            )
+        )
+    return windows
+
+
+def naive_match(rules, window, get_exe):
+    """Check every rule in file order; the reference the RuleSet must agree with"""
+    for rule in rules:
+        if rule.visible is not None and window.visible.lower() != rule.visible:
+            continue
+        if rule.process and not fnmatch.fnmatchcase(
+            window.process.lower(), rule.process
+        ):
+            continue
+        if rule.title and not fnmatch.fnmatchcase(
+            window.title.lower(), rule.title.lower()
+        ):
+            continue
+        if rule.title_regex and not re.search(
+            rule.title_regex, window.title, re.IGNORECASE
+        ):
+            continue
+        if rule.exe and not fnmatch.fnmatchcase(get_exe(window.pid).lower(), rule.exe):
+            continue
+        return rule
+    return None
+
+
+def per_window(function, windows):
+    started = time.perf_counter()
+    results = [function(window) for window in windows]
+    return (time.perf_counter() - started) / len(windows), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rules",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="rule set sizes (default: 10 100 1000)",
+    )
+    parser.add_argument(
+        "--windows",
+        type=int,
+        default=2000,
+        help="windows matched per rule set (default: 2000)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    def get_exe(pid):
+        return f"C:\\Tools\\tool{pid}.exe"
+
+    print(f"{'rules':>6}{'compile':>12}{'compiled':>14}{'naive':>14}{'matches':>9}")
+    for count in args.rules:
+        rng = random.Random(args.seed)
+        rules = parse_rules(make_rules(count, rng))
+        windows = make_windows(args.windows, count, rng)
+
+        started = time.perf_counter()
+        rule_set = RuleSet(rules)
+        compiled = time.perf_counter() - started
+
+        fast, fast_results = per_window(
+            lambda window: rule_set.match(window, get_exe), windows
+        )
+        slow, slow_results = per_window(
+            lambda window: naive_match(rules, window, get_exe), windows
+        )
+        if fast_results != slow_results:
+            print(
+                f"{count} rules: compiled and naive matching disagree", file=sys.stderr
+            )
+            return 1
+
+        matched = sum(result is not None for result in fast_results)
+        print(
+            f"{count:>6}{compiled * 1000:>9.1f} ms{fast * 1e6:>11.1f} us"
+            f"{slow * 1e6:>11.1f} us{matched:>9}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Resource sampler benchmark.
+
+Samples the processes running on this machine the way the Resources columns
+do and compares it with reading CPU, memory and threads per window without
+oneshot(): CPU time per pass, per process, and the interval the sampler
+settles on for its CPU budget.
+
+    python benchmarks/bench_sampler.py
+    python benchmarks/bench_sampler.py --windows-per-process 1 5 20 --passes 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.resource_sampler import ResourceSampler  # noqa: E402
+
+
+def sample_per_window(processes, windows_per_process):
+    """Read every figure separately for every window, as a per-row lookup would"""
+    for process in processes:
+        for _ in range(windows_per_process):
+            try:
+                process.cpu_percent()
+                process.memory_info()
+                process.num_threads()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+
+
+def cpu_per_pass(call, passes):
+    started = time.thread_time()
+    for _ in range(passes):
+        call()
+    return (time.thread_time() - started) / passes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows-per-process",
+        type=int,
+        nargs="+",
+        default=[1, 5, 20],
+        help="windows each process owns in the simulated list (default: 1 5 20)",
+    )
+    parser.add_argument("--passes", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0.01,
+        help="sampler CPU budget as a fraction of one CPU (default: 0.01)",
+    )
+    args = parser.parse_args()
+
+    pids = psutil.pids()
+    processes = [psutil.Process(pid) for pid in pids if psutil.pid_exists(pid)]
+    sampler = ResourceSampler(budget=args.budget)
+    sampler.set_pids(pids)
+    sampler.sample_once()  # the first pass opens the processes
+    sampled = cpu_per_pass(sampler.sample_once, args.passes)
+
+    print(f"{len(pids)} processes, budget {args.budget * 100:.1f}% of one CPU")
+    print(
+        f"{'win/proc':>8}{'windows':>9}  {'per-window ms':>14}{'sampler ms':>12}"
+        f"{'us/process':>12}{'interval':>10}"
+    )
+    for per_process in args.windows_per_process:
+        naive = cpu_per_pass(
+            lambda: sample_per_window(processes, per_process), args.passes
+        )
+        print(
+            f"{per_process:>8}{len(pids) * per_process:>9}  {naive * 1000:>14.1f}"
+            f"{sampled * 1000:>12.1f}{sampled / len(pids) * 1e6:>12.0f}"
+            f"{sampler.interval:>8.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Filter box search benchmark.
+
+Types queries one keystroke at a time against the window search index and
+reports the latency of each keystroke, compared with scanning every title
+and process name, plus the cost of building and updating the index.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --windows 1000 10000 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.records import WindowRecord  # noqa: E402
+from src.search_index import SearchIndex  # noqa: E402
+
+WORDS = (
+    "inbox youtube google chrome document report slack zoom meeting notepad editor "
+    "terminal build code python project spotify music outlook calendar"
+).split()
+QUERIES = ("youtube chrome", "report 12", "zoom", "xyz")
+
+
+def make_windows(count, rng):
+    return [
+        WindowRecord(
+            0x10000 + index * 4,
+            " - ".join(rng.sample(WORDS, 3)) + f" {index}",
+            rng.choice(WORDS) + ".exe",
+            0,
+        )
+        for index in range(count)
+    ]
+
+
+def naive_search(windows, query):
+    terms = query.lower().split()
+    return {
+        window.hwnd
+        for window in windows
+        if all(
+            term in window.title.lower() or term in window.process.lower()
+            for term in terms
+        )
+    }
+
+
+def keystrokes(query):
+    return [query[:length] for length in range(1, len(query) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 50000],
+        help="window counts (default: 1000 10000 50000)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(
+        f"{'windows':>8}{'build':>11}{'update 1%':>12}{'key avg':>11}{'key max':>11}"
+        f"{'scan avg':>11}"
+    )
+    for count in args.windows:
+        rng = random.Random(args.seed)
+        windows = make_windows(count, rng)
+
+        index = SearchIndex()
+        started = time.perf_counter()
+        index.sync(windows)
+        built = time.perf_counter() - started
+
+        changed = [
+            WindowRecord(
+                window.hwnd,
+                window.title + " (renamed)",
+                window.process,
+                window.pid,
+                window.flags,
+            )
+            for window in rng.sample(windows, max(1, count // 100))
+        ]
+        started = time.perf_counter()
+        index.update(changed, [window.hwnd for window in windows[: count // 100]])
+        updated = time.perf_counter() - started
+        index.sync(windows)
+
+        latencies = []
+        scans = []
+        for query in QUERIES:
+            for typed in keystrokes(query):
+                started = time.perf_counter()
+                found = index.search(typed)
+                latencies.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                expected = naive_search(windows, typed)
+                scans.append(time.perf_counter() - started)
+                if found != expected:
+                    print(
+                        f"{count} windows: index and scan disagree on {typed!r}",
+                        file=sys.stderr,
+                    )
+                    return 1
+
+        print(
+            f"{count:>8}{built * 1000:>8.1f} ms{updated * 1000:>9.2f} ms"
+            f"{sum(latencies) / len(latencies) * 1000:>8.2f} ms"
+            f"{max(latencies) * 1000:>8.2f} ms"
+            f"{sum(scans) / len(scans) * 1000:>8.2f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Startup benchmark.
+
+Reports how long the GUI takes to import, to paint its first frame and to
+show a populated window list, and compares module import time of the GUI
+with the headless command line.
+
+    python benchmarks/bench_startup.py                   # real desktop (Windows)
+    python benchmarks/bench_startup.py --fake 500        # in-memory windows
+    xvfb-run python benchmarks/bench_startup.py --fake 500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def import_time(module, repeat=5):
+    """Median time to import a module in a fresh interpreter, in seconds"""
+    code = (
+        "import time; started = time.perf_counter(); import {}; "
+        "print(time.perf_counter() - started)"
+    ).format(module)
+    samples = sorted(
+        float(subprocess.check_output([sys.executable, "-c", code], cwd=ROOT))
+        for _ in range(repeat)
+    )
+    return samples[len(samples) // 2]
+
+
+def report(label, seconds):
+    print(f"{label:<28}{seconds * 1000:9.1f} ms")
+
+
+def make_fake_backend(count, call_latency):
+    from src.backends import FakeWindowSystem
+
+    backend = FakeWindowSystem(call_latency=call_latency)
+    for index in range(count):
+        backend.add_window(
+            f"Window {index}", process=f"app{index % 25}.exe", pid=1000 + index % 25
+        )
+    return backend
+
+
+def measure_gui(backend, timeout):
+    """Return (import, first paint, first populated list) times in seconds"""
+    started = time.perf_counter()
+    import tkinter as tk
+    from src.taskbar_manager import TaskbarManager
+
+    imported = time.perf_counter()
+
+    marks = {}
+    root = tk.Tk()
+    app = TaskbarManager(root, backend=backend, admin_warning=False)
+
+    def on_expose(event):
+        marks.setdefault("paint", time.perf_counter())
+
+    app.tree.bind("<Expose>", on_expose, add="+")
+
+    # finish_startup hands app.apply_snapshot to the snapshot worker, so
+    # wrapping it here sees the first populated list
+    apply_snapshot = app.apply_snapshot
+
+    def timed_apply(snapshot):
+        apply_snapshot(snapshot)
+        if app.windows and "populated" not in marks:
+            marks["populated"] = time.perf_counter()
+            root.after(0, app.on_close)
+
+    app.apply_snapshot = timed_apply
+    root.after(int(timeout * 1000), app.on_close)
+    root.mainloop()
+
+    def since_start(mark):
+        return marks[mark] - started if mark in marks else float("nan")
+
+    return imported - started, since_start("paint"), since_start("populated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--fake",
+        type=int,
+        metavar="N",
+        help="use an in-memory window system with N windows",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds per fake backend call (default: 20e-6)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30.0,
+        help="give up waiting for the list after this many seconds",
+    )
+    args = parser.parse_args()
+
+    if args.fake is None and sys.platform != "win32":
+        parser.error("--fake is required when not running on Windows")
+
+    report("import src.cli", import_time("src.cli"))
+    report("import src.taskbar_manager", import_time("src.taskbar_manager"))
+
+    backend = (
+        make_fake_backend(args.fake, args.latency) if args.fake is not None else None
+    )
+    imported, painted, populated = measure_gui(backend, args.timeout)
+    report("GUI import (with tkinter)", imported)
+    report("time to first paint", painted)
+    report("time to populated list", populated)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Benchmark suite on a simulated window system.
+
+Builds desktops of 100, 1000 and 10000 windows in FakeWindowSystem, with a
+configurable mix of window styles and per-call latencies, and measures the
+operations behind the GUI: refreshing the list, the Alt+Tab filter, hiding
+one window, Hide All Similar and Reset All. For every phase it reports the
+wall time, operations per second and the backend calls made.
+
+By default the phases run through the same scanning and bulk hide/show code
+the GUI uses, without Tk, so the suite runs anywhere. --gui drives a real
+TaskbarManager instead and needs a display (xvfb-run on Linux).
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --windows 100 1000 --latency 50e-6 --json out.json
+    python benchmarks/bench_suite.py --latency-for get_process_info=1e-3 --mix app=1
+    xvfb-run python benchmarks/bench_suite.py --gui
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep learned strategies and the hidden window journal out of the user's settings
+os.environ["TASKBAR_MANAGER_HOME"] = tempfile.mkdtemp(prefix="taskbar-bench-")
+
+from src.backends import (  # noqa: E402
+    DEFAULT_WINDOW_MIX,
+    WINDOW_KINDS,
+    FakeWindowSystem,
+)
+
+# ops is what the phase counts per second: windows scanned, checked or acted on
+PhaseResult = namedtuple("PhaseResult", ["name", "ops", "elapsed", "calls"])
+
+
+def measure(backend, name, call):
+    """Run call() and return a PhaseResult; call returns the number of operations"""
+    backend.reset_calls()
+    started = time.perf_counter()
+    ops = call()
+    elapsed = time.perf_counter() - started
+    return PhaseResult(name, ops, elapsed, backend.reset_calls())
+
+
+def most_common_process(windows):
+    counts = Counter(window.process for window in windows)
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def pick_sample(windows, count):
+    """Pick windows to hide one by one, leaving the Hide All Similar process alone"""
+    process = most_common_process(windows)
+    return [window.hwnd for window in windows if window.process != process][:count]
+
+
+def run_headless(backend, sample):
+    """Run the phases through the scanning and bulk engine code, without Tk"""
+    from src.hide_strategy import StrategyCache
+    from src.journal import HiddenJournal
+    from src.snapshot import is_alt_tab_window, scan_windows
+    from src.window_ops import BulkWindowEngine
+
+    hidden = set()
+    positions = {}
+    journal = HiddenJournal()
+    engine = BulkWindowEngine(
+        backend, positions, strategies=StrategyCache(), journal=journal
+    )
+    results = []
+    state = {}
+
+    def refresh():
+        state["windows"] = scan_windows(backend, hidden)
+        return len(backend.windows)
+
+    def alt_tab():
+        hwnds = list(backend.windows)
+        for hwnd in hwnds:
+            is_alt_tab_window(backend, hwnd, hidden)
+        return len(hwnds)
+
+    def run(action, hwnds):
+        result = engine.run(action, hwnds)
+        for window_result in result.results:
+            if action == "hide" and window_result.ok:
+                hidden.add(window_result.hwnd)
+            elif action == "show":
+                hidden.discard(window_result.hwnd)
+        return len(hwnds)
+
+    def hide_one_by_one():
+        hwnds = pick_sample(state["windows"], sample)
+        for hwnd in hwnds:
+            run("hide", [hwnd])
+        return len(hwnds)
+
+    def hide_all_similar():
+        process = most_common_process(state["windows"])
+        return run(
+            "hide",
+            [window.hwnd for window in state["windows"] if window.process == process],
+        )
+
+    try:
+        results.append(measure(backend, "refresh_apps", refresh))
+        results.append(measure(backend, "is_alt_tab_window", alt_tab))
+        results.append(measure(backend, "hide_window", hide_one_by_one))
+        results.append(measure(backend, "hide_all_similar", hide_all_similar))
+        results.append(
+            measure(backend, "reset_all", lambda: run("show", sorted(hidden)))
+        )
+    finally:
+        engine.shutdown()
+        journal.close()
+    return results, len(state["windows"])
+
+
+def run_gui(backend, sample):
+    """Run the phases through a TaskbarManager on a real Tk root"""
+    import tkinter as tk
+    from src.taskbar_manager import TaskbarManager
+
+    root = tk.Tk()
+    app = TaskbarManager(root, backend=backend, admin_warning=False)
+
+    def pump(done, timeout=600):
+        deadline = time.perf_counter() + timeout
+        while not done() and time.perf_counter() < deadline:
+            root.update()
+            time.sleep(0.001)
+
+    def settle(future):
+        # Wait for the operation, then for the re-check its callback starts
+        pump(future.done)
+        requested = app.refresher.requested
+        pump(
+            lambda: app.refresher.requested > requested and app.refresher.idle(),
+            timeout=5,
+        )
+
+    pump(lambda: app.applied_generation > 0)
+    results = []
+
+    def refresh():
+        app.refresh_apps(wait=True)
+        return len(backend.windows)
+
+    def alt_tab():
+        hwnds = list(backend.windows)
+        for hwnd in hwnds:
+            app.is_alt_tab_window(hwnd)
+        return len(hwnds)
+
+    def hide_one_by_one():
+        hwnds = pick_sample(app.windows, sample)
+        for hwnd in hwnds:
+            app.hide_window(hwnd)
+        app.refresh_apps(wait=True)
+        return len(hwnds)
+
+    def hide_all_similar():
+        process = most_common_process(app.windows)
+        hwnds = [window.hwnd for window in app.windows if window.process == process]
+        app.window_list.select(hwnds[:1])
+        settle(app.hide_all_similar())
+        return len(hwnds)
+
+    def reset_all():
+        count = len(app.hidden_windows)
+        settle(app.reset_all())
+        return count
+
+    try:
+        results.append(measure(backend, "refresh_apps", refresh))
+        results.append(measure(backend, "is_alt_tab_window", alt_tab))
+        results.append(measure(backend, "hide_window", hide_one_by_one))
+        results.append(measure(backend, "hide_all_similar", hide_all_similar))
+        results.append(measure(backend, "reset_all", reset_all))
+        listed = len(app.windows)
+    finally:
+        app.on_close()
+    return results, listed
+
+
+def parse_pairs(pairs, option, names=None):
+    """Parse name=value options into a dict of floats"""
+    values = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if not value or (names is not None and name not in names):
+            raise SystemExit(
+                f"{option}: expected NAME=VALUE"
+                + (f" with NAME one of {', '.join(names)}" if names else "")
+            )
+        values[name] = float(value)
+    return values
+
+
+def print_results(count, listed, results):
+    print(f"\n{count} windows ({listed} listed)")
+    print(
+        f"  {'phase':<24}{'ops':>7}{'time':>12}{'ops/sec':>12}"
+        f"{'calls':>9}{'calls/op':>10}"
+        f"  top calls"
+    )
+    for result in results:
+        total = sum(result.calls.values())
+        top = ", ".join(
+            f"{name} {calls}" for name, calls in Counter(result.calls).most_common(3)
+        )
+        rate = result.ops / result.elapsed if result.elapsed else 0.0
+        per_op = total / result.ops if result.ops else 0.0
+        print(
+            f"  {result.name:<24}{result.ops:>7}{result.elapsed * 1000:>9.1f} ms"
+            f"{rate:>12.0f}{total:>9}{per_op:>10.1f}  {top}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="desktop sizes in windows (default: 100 1000 10000)",
+    )
+    parser.add_argument(
+        "--mix",
+        action="append",
+        default=[],
+        metavar="KIND=WEIGHT",
+        help="share of a window kind, repeatable; kinds: " + ", ".join(WINDOW_KINDS),
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=50,
+        help="processes the windows belong to (default: 50)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds per backend call (default: 20e-6)",
+    )
+    parser.add_argument(
+        "--latency-for",
+        action="append",
+        default=[],
+        metavar="METHOD=SECONDS",
+        help="latency of one backend method, repeatable",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=20,
+        help="windows hidden one at a time in the hide_window phase (default: 20)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--gui",
+        action="store_true",
+        help="drive a real TaskbarManager (needs a display)",
+    )
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    mix = dict(DEFAULT_WINDOW_MIX)
+    mix.update(parse_pairs(args.mix, "--mix", WINDOW_KINDS))
+    latencies = parse_pairs(args.latency_for, "--latency-for")
+
+    print(
+        f"mode: {'gui' if args.gui else 'headless'}, "
+        f"latency {args.latency * 1e6:.0f} us/call, "
+        "mix "
+        + ", ".join(f"{kind}={weight:g}" for kind, weight in mix.items() if weight)
+    )
+    report = []
+    for count in args.windows:
+        backend = FakeWindowSystem(call_latency=args.latency, latencies=latencies)
+        backend.populate(count, mix=mix, processes=args.processes, seed=args.seed)
+        runner = run_gui if args.gui else run_headless
+        results, listed = runner(backend, args.sample)
+        print_results(count, listed, results)
+        report.append(
+            {
+                "windows": count,
+                "listed": listed,
+                "phases": [
+                    dict(
+                        result._asdict(),
+                        ops_per_sec=(
+                            result.ops / result.elapsed if result.elapsed else 0.0
+                        ),
+                    )
+                    for result in results
+                ],
+            }
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "mode": "gui" if args.gui else "headless",
+                    "latency": args.latency,
+                    "latencies": latencies,
+                    "mix": mix,
+                    "results": report,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
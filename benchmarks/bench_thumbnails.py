@@ -0,0 +1,88 @@
+"""
+Thumbnail cache benchmark.
+
+Points at windows the way a user skims the list (a few windows often, most
+rarely) and reports, for each cache budget, the hit rate, the bytes the
+cache holds, how many captures it took and what one capture and downscale
+costs. Images come from SyntheticCaptureSource, so it runs anywhere.
+
+    python benchmarks/bench_thumbnails.py
+    python benchmarks/bench_thumbnails.py --windows 500 --budgets 1 4 16 64
+"""
+
+import argparse
+import os
+import random
+import sys
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.thumbnails import (  # noqa: E402
+    SyntheticCaptureSource,
+    ThumbnailCache,
+    Thumbnails,
+)
+
+Window = namedtuple("Window", ["hwnd", "title"])
+
+
+def hover_sequence(windows, count, seed=0):
+    """Windows pointed at, Zipf-like: the n-th most popular about 1/n as often"""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(windows) + 1)]
+    return rng.choices(windows, weights, k=count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--windows", type=int, default=300)
+    parser.add_argument("--hovers", type=int, default=5000)
+    parser.add_argument(
+        "--budgets",
+        type=float,
+        nargs="+",
+        default=[1, 4, 16, 64],
+        help="cache budgets in MB (default: 1 4 16 64)",
+    )
+    parser.add_argument(
+        "--capture-size",
+        type=int,
+        nargs=2,
+        default=[1280, 800],
+        metavar=("WIDTH", "HEIGHT"),
+    )
+    args = parser.parse_args()
+
+    windows = [
+        Window(0x10000 + index * 4, f"Untitled - Notepad {index}")
+        for index in range(args.windows)
+    ]
+    hovers = hover_sequence(windows, args.hovers)
+
+    print(
+        f"{args.windows} windows, {args.hovers} hovers, captures of "
+        f"{args.capture_size[0]}x{args.capture_size[1]}"
+    )
+    print(
+        f"{'budget':>8}{'hit rate':>10}{'cached':>8}{'held MB':>9}{'captures':>10}"
+        f"{'evictions':>11}{'ms/capture':>12}"
+    )
+    for budget in args.budgets:
+        source = SyntheticCaptureSource(tuple(args.capture_size))
+        thumbnails = Thumbnails(source, ThumbnailCache(int(budget * 1024 * 1024)))
+        for window in hovers:
+            if thumbnails.cache.get(window.hwnd) is None:
+                thumbnails.capture(window.hwnd, window.title)
+        stats = thumbnails.stats()
+        print(
+            f"{budget:>5.0f} MB{stats['hit_rate']:>10.1%}{stats['size']:>8}"
+            f"{stats['bytes'] / 1048576:>9.1f}{stats['captures']:>10}"
+            f"{stats['evictions']:>11}{stats['capture_ms']:>12.2f}"
+        )
+        thumbnails.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Workspace switch benchmark.
+
+Saves two workspaces of the same windows in FakeWindowSystem, one with every
+window shown and one with a third of them hidden and the rest moved and
+restacked, and times switching between them. Each switch hides or shows the
+windows whose visibility differs and then places the visible ones in one
+deferred batch; for comparison the same placements are also made with one
+SetWindowPos per window. --place-latency models what one positioning call
+costs, as each SetWindowPos repaints while a deferred batch repaints once.
+It also checks that windows reopened with other titles are matched to their
+saved entries by title pattern, and exits non-zero if they are not.
+
+    python benchmarks/bench_workspaces.py
+    python benchmarks/bench_workspaces.py --windows 100 500 --place-latency 1e-3
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep learned strategies, the journal and the workspaces out of the user's settings
+os.environ["TASKBAR_MANAGER_HOME"] = tempfile.mkdtemp(prefix="taskbar-bench-")
+
+from src.backends import HWND_BOTTOM, FakeWindowSystem  # noqa: E402
+from src.hide_strategy import StrategyCache  # noqa: E402
+from src.journal import HiddenJournal  # noqa: E402
+from src.snapshot import scan_windows  # noqa: E402
+from src.window_ops import BulkWindowEngine  # noqa: E402
+from src.workspaces import (  # noqa: E402
+    capture_workspace,
+    match_windows,
+    plan_restore,
+)
+
+
+def build_workspaces(backend, engine, hidden, positions, count, seed=0):
+    """Open count windows and return two workspaces of them"""
+    rng = random.Random(seed)
+    hwnds = [
+        backend.add_window(
+            f"Document {index}",
+            process=f"app{index % 20}.exe",
+            pid=1000 + index % 20,
+            rect=(index, index, index + 800, index + 600),
+        )
+        for index in range(count)
+    ]
+    shown = capture_workspace(
+        "shown", backend, scan_windows(backend, hidden), hidden, positions
+    )
+
+    result = engine.run("hide", hwnds[::3])
+    hidden.update(
+        window_result.hwnd for window_result in result.results if window_result.ok
+    )
+    for hwnd in rng.sample(hwnds, len(hwnds)):
+        left, top = rng.randrange(1600), rng.randrange(900)
+        backend.set_window_pos(hwnd, HWND_BOTTOM, left, top, 640, 480, 0)
+    mixed = capture_workspace(
+        "mixed", backend, scan_windows(backend, hidden), hidden, positions
+    )
+    return shown, mixed
+
+
+def switch(backend, engine, hidden, workspace):
+    """Restore a workspace; returns (seconds, backend calls, windows placed)"""
+    windows = scan_windows(backend, hidden)
+    backend.reset_calls()
+    started = time.perf_counter()
+    plan = plan_restore(workspace, windows, hidden)
+    result = engine.arrange(plan.hide, plan.show, plan.placements).result()
+    elapsed = time.perf_counter() - started
+    hidden.update(
+        window_result.hwnd for window_result in result.hidden if window_result.ok
+    )
+    hidden.difference_update(window_result.hwnd for window_result in result.shown)
+    return elapsed, sum(backend.reset_calls().values()), len(plan.placements)
+
+
+def place_one_by_one(backend, hidden, workspace):
+    """Make a workspace's placements with one SetWindowPos each; returns seconds"""
+    plan = plan_restore(workspace, scan_windows(backend, hidden), hidden)
+    started = time.perf_counter()
+    for placement in plan.placements:
+        backend.set_window_pos(*placement)
+    return time.perf_counter() - started
+
+
+def check_title_patterns():
+    """Reopen a process's windows with new handles and titles and match them
+
+    Returns a list of failure messages.
+    """
+    backend = FakeWindowSystem()
+    for title in ("World 1 - Minecraft", "Untitled - Editor"):
+        backend.add_window(title, process="javaw.exe", pid=1000)
+    saved = capture_workspace("saved", backend, scan_windows(backend))
+
+    # After a restart the editor has another file open and comes first
+    for hwnd in list(backend.windows):
+        backend.remove_window(hwnd)
+    for title in ("notes.txt - Editor", "World 2 - Minecraft"):
+        backend.add_window(title, process="javaw.exe", pid=2000)
+    pairs, missing = match_windows(saved, scan_windows(backend))
+    failures = []
+    if missing:
+        failures.append(f"saved windows left unmatched: {missing}")
+    for entry, window in pairs:
+        if entry.pattern != "*" + entry.title[entry.title.rfind(" - ") :]:
+            failures.append(f"{entry.title!r} saved with pattern {entry.pattern!r}")
+        if entry.title.split(" - ")[-1] != window.title.split(" - ")[-1]:
+            failures.append(f"{entry.title!r} matched {window.title!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--windows", type=int, nargs="+", default=[100, 300])
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=20e-6,
+        help="seconds added to every backend call (default: 20e-6)",
+    )
+    parser.add_argument(
+        "--place-latency",
+        type=float,
+        default=300e-6,
+        help="seconds one SetWindowPos or one deferred batch costs "
+        "(default: 300e-6)",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"latency {args.latency * 1e6:.0f} us/call, "
+        f"{args.place_latency * 1e6:.0f} us per positioning call"
+    )
+    print(
+        f"{'windows':>8}  {'switch':<14}{'placed':>7}{'ms':>9}{'calls':>8}"
+        f"{'one by one ms':>15}"
+    )
+    for count in args.windows:
+        backend = FakeWindowSystem(
+            call_latency=args.latency,
+            latencies={
+                "set_window_pos": args.place_latency,
+                "defer_window_positions": args.place_latency,
+            },
+        )
+        hidden, positions = set(), {}
+        journal = HiddenJournal(os.path.join(tempfile.mkdtemp(), "journal"))
+        engine = BulkWindowEngine(
+            backend, positions, strategies=StrategyCache(), journal=journal
+        )
+        try:
+            shown, mixed = build_workspaces(backend, engine, hidden, positions, count)
+            for workspace in (shown, mixed, shown):
+                one_by_one = place_one_by_one(backend, hidden, workspace)
+                elapsed, calls, placed = switch(backend, engine, hidden, workspace)
+                print(
+                    f"{count:>8}  {'-> ' + workspace.name:<14}{placed:>7}"
+                    f"{elapsed * 1000:>9.1f}{calls:>8}{one_by_one * 1000:>15.1f}"
+                )
+        finally:
+            engine.shutdown()
+            journal.close()
+
+    failures = check_title_patterns()
+    for message in failures:
+        print(f"FAILED: {message}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -204,6 +204,8 @@ def build():
             '--version-file', version_file,
             '--disable-windowed-traceback',
             '--noupx',
+            '--paths', project_root,
+            '--collect-submodules', 'src',
             source_file
         ]
         
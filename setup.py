@@ -44,7 +44,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "taskbar-manager=src.taskbar_manager:main",
+            "taskbar-manager=src.cli:main",
         ],
     },
     include_package_data=True,
@@ -9,6 +9,13 @@ __version__ = "1.0.0"
 __author__ = "AltafEmpaxis"
 __license__ = "MIT"
 
-from .taskbar_manager import TaskbarManager
+__all__ = ["TaskbarManager"]
 
-__all__ = ["TaskbarManager"]
\ No newline at end of file
+
+def __getattr__(name):
+    # Import the GUI lazily so headless users (the CLI) never load tkinter
+    if name == "TaskbarManager":
+        from .taskbar_manager import TaskbarManager
+
+        return TaskbarManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
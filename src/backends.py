@@ -0,0 +1,584 @@
+"""
+Window system backends.
+
+The rest of the application talks to the desktop through a backend object
+instead of calling pywin32 directly. Win32Backend wraps the real Windows API;
+CtypesBackend is the same with the calls a scan makes going straight to
+user32. FakeWindowSystem keeps an in-memory model of the same surface so
+scanning and window operations can be exercised and load-tested on any
+platform.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from .process_cache import ProcessCache, ProcessInfo
+
+# Win32 constants used by the backends (values from win32con)
+GWL_STYLE = -16
+GWL_EXSTYLE = -20
+WS_VISIBLE = 0x10000000
+WS_DISABLED = 0x08000000
+WS_EX_TOOLWINDOW = 0x00000080
+WS_EX_LAYERED = 0x00080000
+SW_HIDE = 0
+SW_NORMAL = 1
+SW_MINIMIZE = 6
+SW_SHOW = 5
+SW_RESTORE = 9
+HWND_TOP = 0
+HWND_BOTTOM = 1
+SWP_NOSIZE = 0x0001
+SWP_NOMOVE = 0x0002
+SWP_NOZORDER = 0x0004
+SWP_NOACTIVATE = 0x0010
+SWP_SHOWWINDOW = 0x0040
+SWP_NOOWNERZORDER = 0x0200
+LWA_ALPHA = 0x00000002
+WM_CLOSE = 0x0010
+
+
+class _CallCount(threading.local):
+    """Native calls made by the current thread"""
+
+    calls = 0
+
+
+class Win32Backend:
+    """Backend that talks to the real Windows desktop through pywin32"""
+
+    def __init__(self):
+        import win32gui
+        import win32process
+        import psutil
+
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._psutil = psutil
+        self.process_cache = ProcessCache(psutil_module=psutil)
+
+    def enum_windows(self):
+        """Return the handles of all top-level windows in z-order"""
+        hwnds = []
+        self._win32gui.EnumWindows(lambda hwnd, _: hwnds.append(hwnd), None)
+        return hwnds
+
+    def is_window(self, hwnd):
+        return self._win32gui.IsWindow(hwnd)
+
+    def is_window_visible(self, hwnd):
+        return self._win32gui.IsWindowVisible(hwnd)
+
+    def get_window_long(self, hwnd, index):
+        return self._win32gui.GetWindowLong(hwnd, index)
+
+    def get_parent(self, hwnd):
+        return self._win32gui.GetParent(hwnd)
+
+    def get_window_text(self, hwnd):
+        return self._win32gui.GetWindowText(hwnd)
+
+    def get_window_pid(self, hwnd):
+        _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_window_rect(self, hwnd):
+        return self._win32gui.GetWindowRect(hwnd)
+
+    def show_window(self, hwnd, command):
+        return self._win32gui.ShowWindow(hwnd, command)
+
+    def set_window_long(self, hwnd, index, value):
+        return self._win32gui.SetWindowLong(hwnd, index, value)
+
+    def set_layered_window_attributes(self, hwnd, color_key, alpha, flags):
+        return self._win32gui.SetLayeredWindowAttributes(hwnd, color_key, alpha, flags)
+
+    def set_window_pos(self, hwnd, insert_after, x, y, cx, cy, flags):
+        return self._win32gui.SetWindowPos(hwnd, insert_after, x, y, cx, cy, flags)
+
+    def defer_window_positions(self, placements):
+        """Apply many set_window_pos argument tuples in one DeferWindowPos batch
+
+        Windows moves, sizes and restacks them all at once when the batch
+        ends, with one repaint, and fails the whole batch if any fails.
+        """
+        handle = self._win32gui.BeginDeferWindowPos(len(placements))
+        for placement in placements:
+            handle = self._win32gui.DeferWindowPos(handle, *placement)
+        self._win32gui.EndDeferWindowPos(handle)
+
+    def enable_window(self, hwnd, enable):
+        return self._win32gui.EnableWindow(hwnd, enable)
+
+    def post_message(self, hwnd, message, wparam=0, lparam=0):
+        return self._win32gui.PostMessage(hwnd, message, wparam, lparam)
+
+    def get_process_info(self, pid):
+        """Return the cached ProcessInfo for a process"""
+        return self.process_cache.lookup(pid)
+
+    def get_process_name(self, pid):
+        """Return the executable name of a process, or "Unknown" if unavailable"""
+        return self.process_cache.lookup(pid).name
+
+    def process_exists(self, pid):
+        return self._psutil.pid_exists(pid)
+
+    def terminate_process(self, pid):
+        """Ask a process to exit immediately (TerminateProcess on Windows)"""
+        self._psutil.Process(pid).terminate()
+        self.process_cache.invalidate(pid)
+
+    def native_calls(self):
+        """Return the native calls made by the current thread, or None if not counted"""
+        return None
+
+
+class CtypesBackend(Win32Backend):
+    """Win32Backend that enumerates and reads windows through user32 directly
+
+    A scan makes several reads for each of hundreds of top-level windows,
+    and pywin32 adds argument parsing and error translation to every one.
+    Here enumeration and the reads a scan uses call user32 through ctypes;
+    operations on single windows stay on pywin32. native_calls() counts the
+    user32 calls made by the calling thread, so a scan can report its own.
+    """
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+
+        # A private WinDLL, so the argtypes set here never affect ctypes.windll
+        user32 = ctypes.WinDLL("user32")
+        self._enum_proc = ctypes.WINFUNCTYPE(
+            wintypes.BOOL, wintypes.HWND, wintypes.LPARAM
+        )
+        user32.EnumWindows.argtypes = (self._enum_proc, wintypes.LPARAM)
+        user32.EnumWindows.restype = wintypes.BOOL
+        user32.IsWindow.argtypes = (wintypes.HWND,)
+        user32.IsWindow.restype = wintypes.BOOL
+        user32.IsWindowVisible.argtypes = (wintypes.HWND,)
+        user32.IsWindowVisible.restype = wintypes.BOOL
+        user32.GetWindowLongW.argtypes = (wintypes.HWND, ctypes.c_int)
+        user32.GetWindowLongW.restype = wintypes.LONG
+        user32.GetParent.argtypes = (wintypes.HWND,)
+        user32.GetParent.restype = wintypes.HWND
+        user32.GetWindowTextLengthW.argtypes = (wintypes.HWND,)
+        user32.GetWindowTextLengthW.restype = ctypes.c_int
+        user32.GetWindowTextW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+        user32.GetWindowTextW.restype = ctypes.c_int
+        user32.GetWindowThreadProcessId.argtypes = (
+            wintypes.HWND,
+            ctypes.POINTER(wintypes.DWORD),
+        )
+        user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+        self._user32 = user32
+        self._ctypes = ctypes
+        self._dword = wintypes.DWORD
+        self._count = _CallCount()
+
+    def native_calls(self):
+        return self._count.calls
+
+    def enum_windows(self):
+        """Return the handles of all top-level windows in z-order in one pass"""
+        hwnds = []
+        append = hwnds.append
+
+        def collect(hwnd, _):
+            append(hwnd)
+            return True
+
+        self._count.calls += 1
+        self._user32.EnumWindows(self._enum_proc(collect), 0)
+        return hwnds
+
+    def is_window(self, hwnd):
+        self._count.calls += 1
+        return bool(self._user32.IsWindow(hwnd))
+
+    def is_window_visible(self, hwnd):
+        self._count.calls += 1
+        return bool(self._user32.IsWindowVisible(hwnd))
+
+    def get_window_long(self, hwnd, index):
+        self._count.calls += 1
+        return self._user32.GetWindowLongW(hwnd, index)
+
+    def get_parent(self, hwnd):
+        self._count.calls += 1
+        return self._user32.GetParent(hwnd) or 0
+
+    def get_window_text(self, hwnd):
+        # The length is an upper bound, so long titles are read whole
+        self._count.calls += 1
+        length = self._user32.GetWindowTextLengthW(hwnd)
+        if length <= 0:
+            return ""
+        buffer = self._ctypes.create_unicode_buffer(length + 1)
+        self._count.calls += 1
+        self._user32.GetWindowTextW(hwnd, buffer, length + 1)
+        return buffer.value
+
+    def get_window_pid(self, hwnd):
+        pid = self._dword()
+        self._count.calls += 1
+        self._user32.GetWindowThreadProcessId(hwnd, self._ctypes.byref(pid))
+        return pid.value
+
+
+class FakeWindow:
+    """A top-level window in a FakeWindowSystem"""
+
+    __slots__ = (
+        "hwnd",
+        "title",
+        "pid",
+        "style",
+        "ex_style",
+        "parent",
+        "rect",
+        "alpha",
+        "enabled",
+        "minimized",
+        "hide_resistant",
+        "close_delay",
+    )
+
+    def __init__(
+        self,
+        hwnd,
+        title,
+        pid,
+        style,
+        ex_style,
+        parent,
+        rect,
+        hide_resistant=False,
+        close_delay=0.0,
+    ):
+        self.hwnd = hwnd
+        self.title = title
+        self.pid = pid
+        self.style = style
+        self.ex_style = ex_style
+        self.parent = parent
+        self.rect = rect
+        self.alpha = 255
+        self.enabled = True
+        self.minimized = False
+        self.hide_resistant = hide_resistant  # Ignores SW_HIDE unless minimized
+        self.close_delay = (
+            close_delay  # Seconds to close after WM_CLOSE; None ignores it
+        )
+
+
+# Kinds of top-level windows FakeWindowSystem.populate creates, and their
+# default share of a desktop: most enumerated windows are invisible helpers,
+# and only "app" and "resistant" windows appear in the Alt+Tab list
+WINDOW_KINDS = (
+    "app",
+    "resistant",
+    "invisible",
+    "tool",
+    "owned",
+    "untitled",
+    "disabled",
+)
+DEFAULT_WINDOW_MIX = {
+    "app": 0.12,
+    "resistant": 0.03,  # app windows that ignore a plain SW_HIDE
+    "invisible": 0.55,
+    "tool": 0.12,
+    "owned": 0.06,
+    "untitled": 0.10,
+    "disabled": 0.02,
+}
+
+
+class FakeWindowSystem:
+    """In-memory window system implementing the backend surface
+
+    Windows and processes are plain Python objects, so the scanning code can be
+    run on Linux without a desktop. The optional call_latency (in seconds) is
+    added to every backend call to approximate the cost of real Win32 calls;
+    latencies overrides it per method name. calls counts the calls made to
+    each method, and native_calls() the calls made by the current thread, as
+    CtypesBackend counts its user32 calls.
+    """
+
+    def __init__(self, call_latency=0.0, latencies=None):
+        self.windows = OrderedDict()  # hwnd -> FakeWindow, in z-order
+        self.processes = {}  # pid -> process name
+        self.call_latency = call_latency
+        self.latencies = dict(latencies or {})
+        self.calls = {}
+        self._count = _CallCount()
+        self._next_hwnd = 0x10010
+        self._lock = threading.RLock()
+        self._calls_lock = threading.Lock()
+
+    def add_window(
+        self,
+        title,
+        process="app.exe",
+        pid=1000,
+        style=WS_VISIBLE,
+        ex_style=0,
+        parent=0,
+        rect=(100, 100, 900, 700),
+        hide_resistant=False,
+        close_delay=0.0,
+    ):
+        """Create a window and return its handle
+
+        close_delay is how long the window takes to close after WM_CLOSE;
+        None makes it ignore WM_CLOSE.
+        """
+        with self._lock:
+            hwnd = self._next_hwnd
+            self._next_hwnd += 4
+            self.windows[hwnd] = FakeWindow(
+                hwnd,
+                title,
+                pid,
+                style,
+                ex_style,
+                parent,
+                rect,
+                hide_resistant,
+                close_delay,
+            )
+            self.processes.setdefault(pid, process)
+            return hwnd
+
+    def populate(self, count, mix=None, processes=50, seed=0):
+        """Add count windows of the kinds in mix (kind -> weight); returns their handles
+
+        Windows are spread over the given number of processes. The same seed
+        always builds the same desktop.
+        """
+        rng = random.Random(seed)
+        mix = mix if mix is not None else DEFAULT_WINDOW_MIX
+        kinds = [kind for kind in WINDOW_KINDS if mix.get(kind)]
+        weights = [mix[kind] for kind in kinds]
+        hwnds = []
+        for index, kind in enumerate(rng.choices(kinds, weights, k=count)):
+            pid = 1000 + rng.randrange(processes)
+            style, ex_style, parent, title = WS_VISIBLE, 0, 0, f"Window {index}"
+            if kind == "invisible":
+                style = 0
+            elif kind == "tool":
+                ex_style = WS_EX_TOOLWINDOW
+            elif kind == "owned":
+                parent = hwnds[-1] if hwnds else 0x10010
+            elif kind == "untitled":
+                title = ""
+            elif kind == "disabled":
+                style |= WS_DISABLED
+            hwnds.append(
+                self.add_window(
+                    title,
+                    process=f"app{pid - 1000}.exe",
+                    pid=pid,
+                    style=style,
+                    ex_style=ex_style,
+                    parent=parent,
+                    hide_resistant=kind == "resistant",
+                )
+            )
+        return hwnds
+
+    def remove_window(self, hwnd):
+        """Destroy a window"""
+        with self._lock:
+            self.windows.pop(hwnd, None)
+
+    def reset_calls(self):
+        """Return the call counts so far and start counting from zero"""
+        with self._calls_lock:
+            calls, self.calls = self.calls, {}
+        return calls
+
+    def native_calls(self):
+        """Return the calls made by the current thread"""
+        return self._count.calls
+
+    def _call(self, name):
+        self._count.calls += 1
+        with self._calls_lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        latency = self.latencies.get(name, self.call_latency)
+        if latency:
+            _spin(latency)
+
+    def _window(self, hwnd, name):
+        self._call(name)
+        return self.windows.get(hwnd)
+
+    def enum_windows(self):
+        self._call("enum_windows")
+        with self._lock:
+            return list(self.windows)
+
+    def is_window(self, hwnd):
+        return self._window(hwnd, "is_window") is not None
+
+    def is_window_visible(self, hwnd):
+        window = self._window(hwnd, "is_window_visible")
+        return window is not None and bool(window.style & WS_VISIBLE)
+
+    def get_window_long(self, hwnd, index):
+        window = self._window(hwnd, "get_window_long")
+        if window is None:
+            return 0
+        return window.ex_style if index == GWL_EXSTYLE else window.style
+
+    def get_parent(self, hwnd):
+        window = self._window(hwnd, "get_parent")
+        return window.parent if window is not None else 0
+
+    def get_window_text(self, hwnd):
+        window = self._window(hwnd, "get_window_text")
+        return window.title if window is not None else ""
+
+    def get_window_pid(self, hwnd):
+        window = self._window(hwnd, "get_window_pid")
+        return window.pid if window is not None else 0
+
+    def _require(self, hwnd, name):
+        window = self._window(hwnd, name)
+        if window is None:
+            raise OSError(1400, "Invalid window handle")
+        return window
+
+    def get_window_rect(self, hwnd):
+        return self._require(hwnd, "get_window_rect").rect
+
+    def show_window(self, hwnd, command):
+        window = self._require(hwnd, "show_window")
+        was_visible = bool(window.style & WS_VISIBLE)
+        if command == SW_HIDE:
+            if not window.hide_resistant or window.minimized:
+                window.style &= ~WS_VISIBLE
+        else:
+            window.style |= WS_VISIBLE
+            window.minimized = command == SW_MINIMIZE
+        return was_visible
+
+    def set_window_long(self, hwnd, index, value):
+        window = self._require(hwnd, "set_window_long")
+        if index == GWL_EXSTYLE:
+            previous, window.ex_style = window.ex_style, value
+        else:
+            previous, window.style = window.style, value
+        return previous
+
+    def set_layered_window_attributes(self, hwnd, color_key, alpha, flags):
+        window = self._require(hwnd, "set_layered_window_attributes")
+        if not window.ex_style & WS_EX_LAYERED:
+            raise OSError(87, "Window is not layered")
+        if flags & LWA_ALPHA:
+            window.alpha = alpha
+
+    def set_window_pos(self, hwnd, insert_after, x, y, cx, cy, flags):
+        self._place(
+            self._require(hwnd, "set_window_pos"), insert_after, x, y, cx, cy, flags
+        )
+
+    def defer_window_positions(self, placements):
+        """Apply set_window_pos argument tuples as one call; fails before
+        changing anything if any window is gone, like EndDeferWindowPos"""
+        self._call("defer_window_positions")
+        with self._lock:
+            windows = [self.windows.get(placement[0]) for placement in placements]
+            if None in windows:
+                raise OSError(1400, "Invalid window handle")
+            for window, placement in zip(windows, placements):
+                self._place(window, *placement[1:])
+
+    def _place(self, window, insert_after, x, y, cx, cy, flags):
+        hwnd = window.hwnd
+        left, top, right, bottom = window.rect
+        if not flags & SWP_NOMOVE:
+            right, bottom = x + (right - left), y + (bottom - top)
+            left, top = x, y
+        if not flags & SWP_NOSIZE:
+            right, bottom = left + cx, top + cy
+        window.rect = (left, top, right, bottom)
+        if flags & SWP_SHOWWINDOW:
+            window.style |= WS_VISIBLE
+        if not flags & SWP_NOZORDER:
+            with self._lock:
+                if hwnd not in self.windows or insert_after == hwnd:
+                    return
+                if (
+                    insert_after in (HWND_TOP, HWND_BOTTOM)
+                    or insert_after not in self.windows
+                ):
+                    # Move the window to the top or bottom of the z-order
+                    self.windows.move_to_end(hwnd, last=insert_after == HWND_BOTTOM)
+                    return
+                # Put the window just below insert_after
+                order = [key for key in self.windows if key != hwnd]
+                order.insert(order.index(insert_after) + 1, hwnd)
+                for key in order[order.index(hwnd) :]:
+                    self.windows.move_to_end(key)
+
+    def enable_window(self, hwnd, enable):
+        window = self._require(hwnd, "enable_window")
+        was_disabled = not window.enabled
+        window.enabled = bool(enable)
+        if enable:
+            window.style &= ~WS_DISABLED
+        else:
+            window.style |= WS_DISABLED
+        return was_disabled
+
+    def post_message(self, hwnd, message, wparam=0, lparam=0):
+        window = self._require(hwnd, "post_message")
+        if message == WM_CLOSE:
+            if window.close_delay is None:
+                return
+            if window.close_delay:
+                timer = threading.Timer(window.close_delay, self.remove_window, (hwnd,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self.remove_window(hwnd)
+
+    def process_exists(self, pid):
+        self._call("process_exists")
+        return pid in self.processes
+
+    def terminate_process(self, pid):
+        """End a process and destroy its windows"""
+        self._call("terminate_process")
+        with self._lock:
+            if self.processes.pop(pid, None) is None:
+                raise ProcessLookupError(f"no process {pid}")
+            for hwnd in [
+                hwnd for hwnd, window in self.windows.items() if window.pid == pid
+            ]:
+                del self.windows[hwnd]
+
+    def get_process_info(self, pid):
+        self._call("get_process_info")
+        name = self.processes.get(pid)
+        if name is None:
+            return ProcessInfo(pid, "Unknown", "", None, "no_such_process")
+        return ProcessInfo(pid, name, "", None, "ok")
+
+    def get_process_name(self, pid):
+        return self.get_process_info(pid).name
+
+
+def _spin(seconds):
+    """Busy-wait to model the CPU cost of a native call"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
@@ -0,0 +1,432 @@
+"""
+Command line interface.
+
+``taskbar-manager`` with no arguments starts the GUI. With a command it runs
+headless: it lists, hides, shows or closes windows and exits, without ever
+importing tkinter, so it starts quickly and can be used from scripts.
+
+    taskbar-manager list --format csv
+    taskbar-manager hide --process chrome.exe --title "*YouTube*"
+    taskbar-manager show --hwnd 132456
+    taskbar-manager close --process notepad.exe --timeout 10 --terminate
+    taskbar-manager reset
+    taskbar-manager apply-rules --dry-run
+    taskbar-manager workspace save coding
+    taskbar-manager workspace restore presentation
+    taskbar-manager serve --listen 127.0.0.1:47815
+    taskbar-manager --stats timings.json hide --process notepad.exe
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+from .backends import CtypesBackend
+from .config import config_path
+from .instrumentation import metrics, setup_logging
+from .journal import HiddenJournal
+from .records import FIELDS, select_windows
+from .snapshot import scan_windows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="taskbar-manager",
+        description="List, hide, show and close taskbar windows. "
+        "Run without a command to start the GUI.",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="PATH",
+        help="write scan and hide/show timings to PATH as JSON",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    list_parser = commands.add_parser("list", help="list windows")
+    list_parser.add_argument(
+        "--format",
+        choices=("json", "csv"),
+        default="json",
+        help="output format (default: json)",
+    )
+    add_selectors(list_parser)
+
+    for command, help_text in (
+        ("hide", "hide matching windows"),
+        ("show", "show matching windows"),
+    ):
+        add_selectors(commands.add_parser(command, help=help_text))
+
+    close_parser = commands.add_parser("close", help="close matching windows")
+    close_parser.add_argument(
+        "--timeout",
+        type=float,
+        help="seconds to wait for each window to close (default: 5)",
+    )
+    close_parser.add_argument(
+        "--terminate",
+        action="store_true",
+        help="terminate the process of a window still open " "after the timeout",
+    )
+    add_selectors(close_parser)
+
+    commands.add_parser("reset", help="show every window hidden by taskbar-manager")
+
+    rules_parser = commands.add_parser(
+        "apply-rules", help="run the auto-hide rules once"
+    )
+    rules_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print what the rules would do without doing it",
+    )
+
+    workspace_parser = commands.add_parser(
+        "workspace", help="save, restore, list or delete named window layouts"
+    )
+    workspace_parser.add_argument(
+        "action", choices=("save", "restore", "list", "delete")
+    )
+    workspace_parser.add_argument("name", nargs="?", help="workspace name")
+
+    serve_parser = commands.add_parser(
+        "serve",
+        help="answer list/hide/show/close requests from local scripts as JSON lines",
+    )
+    serve_parser.add_argument(
+        "--listen",
+        metavar="ADDRESS",
+        help="loopback HOST:PORT, PORT or a Unix socket path "
+        "(default: 127.0.0.1:47815)",
+    )
+    return parser
+
+
+def add_selectors(parser):
+    group = parser.add_argument_group("window selection")
+    group.add_argument(
+        "--hwnd",
+        type=lambda value: int(value, 0),
+        action="append",
+        default=[],
+        help="window handle (repeatable)",
+    )
+    group.add_argument(
+        "--pid", type=int, action="append", default=[], help="process ID (repeatable)"
+    )
+    group.add_argument(
+        "--process",
+        action="append",
+        default=[],
+        help="process name, case-insensitive (repeatable)",
+    )
+    group.add_argument(
+        "--title",
+        action="append",
+        default=[],
+        help="window title glob pattern, case-insensitive (repeatable)",
+    )
+
+
+def has_selectors(args):
+    return bool(args.hwnd or args.pid or args.process or args.title)
+
+
+def selected_windows(windows, args):
+    """Return the windows matching the --hwnd, --pid, --process and --title options"""
+    return select_windows(windows, args.hwnd, args.pid, args.process, args.title)
+
+
+def write_windows(windows, output_format, stream):
+    windows = [window.as_dict() for window in windows]
+    if output_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(windows)
+    else:
+        json.dump(windows, stream, indent=2)
+        stream.write("\n")
+
+
+def perform(backend, action, hwnds, journal, stream, terminate=False, timeout=None):
+    """Hide, show or close windows, logging them in the journal
+
+    Returns the number of windows acted on successfully.
+
+    terminate and timeout apply to close, as in BulkWindowEngine.close().
+    """
+    from .hide_strategy import StrategyCache
+    from .window_ops import BulkWindowEngine, close_summary
+
+    positions = {hwnd: entry.rect for hwnd, entry in journal.entries.items()}
+    engine = BulkWindowEngine(
+        backend, positions, strategies=StrategyCache(), journal=journal
+    )
+    try:
+        if action == "close":
+            result = engine.close(hwnds, terminate, timeout).result()
+        else:
+            result = engine.run(action, hwnds)
+    finally:
+        engine.shutdown()
+
+    count = sum(window_result.ok for window_result in result.results)
+
+    if action == "close":
+        print(close_summary(result), file=stream)
+        for window_result in result.results:
+            if not window_result.ok:
+                print(f"{window_result.hwnd}: {window_result.error}", file=sys.stderr)
+        return count
+    verb = "Hidden" if action == "hide" else "Showed"
+    print(f"{verb} {count} window(s) in {result.elapsed * 1000:.0f} ms", file=stream)
+    return count
+
+
+def run(args, backend, stream=sys.stdout):
+    """Execute a parsed command against a backend; returns the exit code"""
+    journal = HiddenJournal()
+    try:
+        return run_command(args, backend, journal, stream)
+    finally:
+        journal.close()
+
+
+def run_command(args, backend, journal, stream):
+    if args.command == "serve":
+        return serve(args, backend, journal, stream)
+
+    if args.command == "reset":
+        # Every window hidden by an earlier run, whether it is listed or not
+        hwnds = [entry.hwnd for entry in journal.stranded(backend)]
+        if not hwnds:
+            print("No hidden windows to reset", file=sys.stderr)
+            return 1
+        count = perform(backend, "show", hwnds, journal, stream)
+        return 0 if count == len(hwnds) else 1
+
+    if args.command == "workspace":
+        # list and delete only touch workspaces.json, so it scans for itself
+        return run_workspace(args, backend, journal, stream)
+
+    windows = scan_windows(backend, set(journal.entries))
+
+    if args.command == "list":
+        if has_selectors(args):
+            windows = selected_windows(windows, args)
+        write_windows(windows, args.format, stream)
+        return 0
+
+    if args.command == "apply-rules":
+        return apply_rules(args, backend, windows, journal, stream)
+
+    if not has_selectors(args):
+        print(
+            f"{args.command}: give at least one of --hwnd, --pid, --process, --title",
+            file=sys.stderr,
+        )
+        return 2
+    hwnds = [window.hwnd for window in selected_windows(windows, args)]
+    if not hwnds:
+        print("No matching windows", file=sys.stderr)
+        return 1
+
+    if args.command == "close":
+        count = perform(
+            backend, "close", hwnds, journal, stream, args.terminate, args.timeout
+        )
+    else:
+        count = perform(backend, args.command, hwnds, journal, stream)
+    return 0 if count == len(hwnds) else 1
+
+
+def apply_rules(args, backend, windows, journal, stream):
+    """Run the auto-hide rules once over the current windows"""
+    from .rules import RuleError, load_rules
+
+    try:
+        rules = load_rules()
+    except RuleError as e:
+        print(f"apply-rules: {e}", file=sys.stderr)
+        return 2
+
+    matches = rules.match_all(windows, lambda pid: backend.get_process_info(pid).exe)
+    if args.dry_run:
+        for match in matches:
+            print(f"{match.action}\t{match.hwnd}\t{match.rule.name}", file=stream)
+        return 0
+
+    failed = 0
+    for action in ("close", "hide", "show"):
+        hwnds = [match.hwnd for match in matches if match.action == action]
+        if hwnds:
+            failed += len(hwnds) - perform(backend, action, hwnds, journal, stream)
+    return 0 if not failed else 1
+
+
+def run_workspace(args, backend, journal, stream):
+    """Save, restore, list or delete a workspace; only save and restore scan"""
+    from .hide_strategy import StrategyCache
+    from .window_ops import BulkWindowEngine
+    from .workspaces import WorkspaceStore, capture_workspace, plan_restore
+
+    store = WorkspaceStore()
+    if args.action == "list":
+        for name in store.names():
+            workspace = store.get(name)
+            visible = sum(entry.visible for entry in workspace.windows)
+            print(
+                f"{name}\t{len(workspace.windows)} window(s), {visible} visible",
+                file=stream,
+            )
+        return 0
+    if not args.name:
+        print(f"workspace {args.action}: give a workspace name", file=sys.stderr)
+        return 2
+
+    if args.action == "delete":
+        if not store.delete(args.name):
+            print(f'No workspace named "{args.name}"', file=sys.stderr)
+            return 1
+        return 0
+
+    positions = {hwnd: entry.rect for hwnd, entry in journal.entries.items()}
+    if args.action == "save":
+        windows = scan_windows(backend, set(journal.entries))
+        workspace = capture_workspace(
+            args.name, backend, windows, set(journal.entries), positions
+        )
+        store.put(workspace)
+        print(
+            f'Saved workspace "{args.name}" with {len(workspace.windows)} window(s)',
+            file=stream,
+        )
+        return 0
+
+    workspace = store.get(args.name)
+    if workspace is None:
+        print(f'No workspace named "{args.name}"', file=sys.stderr)
+        return 1
+    windows = scan_windows(backend, set(journal.entries))
+    plan = plan_restore(workspace, windows, set(journal.entries))
+    engine = BulkWindowEngine(
+        backend, positions, strategies=StrategyCache(), journal=journal
+    )
+    try:
+        result = engine.arrange(plan.hide, plan.show, plan.placements).result()
+    finally:
+        engine.shutdown()
+
+    hidden = sum(window_result.ok for window_result in result.hidden)
+    placed = sum(window_result.ok for window_result in result.placed)
+    print(
+        f'Restored workspace "{args.name}": {placed} window(s) placed, {hidden} hidden '
+        f"in {result.elapsed * 1000:.0f} ms",
+        file=stream,
+    )
+    for entry in plan.missing:
+        print(f"Not open: {entry.process} {entry.title!r}", file=sys.stderr)
+    failed = [
+        window_result
+        for window_result in result.hidden + result.shown + result.placed
+        if not window_result.ok
+    ]
+    for window_result in failed:
+        print(f"{window_result.hwnd}: {window_result.error}", file=sys.stderr)
+    return 0 if not failed else 1
+
+
+def serve(args, backend, journal, stream):
+    """Run the control server until interrupted, tracking windows from events"""
+    import time
+
+    from .control_server import DEFAULT_ADDRESS, TOKEN_FILE, ControlServer
+    from .hide_strategy import StrategyCache
+    from .window_events import WindowEvent, WindowTracker, WinEventSource
+    from .window_ops import BulkWindowEngine
+
+    hidden = set(journal.entries)
+    positions = {hwnd: entry.rect for hwnd, entry in journal.entries.items()}
+    engine = BulkWindowEngine(
+        backend, positions, strategies=StrategyCache(), journal=journal
+    )
+    tracker = WindowTracker(backend, WinEventSource(), hidden)
+
+    def acted(action):
+        # Called on the server thread; the tracker re-describes the windows on
+        # its next flush
+        for window_result in action.result.results:
+            if action.action == "hide" and window_result.ok:
+                hidden.add(window_result.hwnd)
+            elif action.action == "show" or window_result.ok:
+                hidden.discard(window_result.hwnd)
+            tracker.post(WindowEvent("show", window_result.hwnd))
+
+    try:
+        server = ControlServer(engine, args.listen or DEFAULT_ADDRESS, deliver=acted)
+    except ValueError as e:
+        print(f"serve: {e}", file=sys.stderr)
+        engine.shutdown()
+        return 2
+    except OSError as e:
+        print(f"serve: cannot read the control token: {e}", file=sys.stderr)
+        engine.shutdown()
+        return 1
+    tracker.on_change = server.update
+    windows = scan_windows(backend, hidden)
+    tracker.seed(windows)
+    server.seed(windows)
+    try:
+        address = server.start()
+    except OSError as e:
+        print(f"serve: {e}", file=sys.stderr)
+        engine.shutdown()
+        return 1
+    tracker.start()
+    if server.kind == "tcp":
+        address = f"{address[0]}:{address[1]}"
+    print(
+        f"Listening on {address}; clients must send the token in "
+        f"{config_path(TOKEN_FILE)}",
+        file=stream,
+    )
+    stream.flush()
+    try:
+        while True:
+            time.sleep(tracker.coalesce_ms / 1000)
+            tracker.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.stop()
+        server.stop()
+        engine.shutdown()
+    return 0
+
+
+def main(argv=None):
+    """Entry point for the taskbar-manager command"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        from .taskbar_manager import main as gui_main
+
+        return gui_main()
+
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        build_parser().print_help()
+        return 2
+
+    setup_logging()
+    if args.stats:
+        metrics.enabled = True
+    try:
+        return run(args, CtypesBackend())
+    finally:
+        if args.stats:
+            metrics.export(args.stats)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Per-user settings files.
+
+Everything TaskbarManager keeps between runs lives in one directory:
+%APPDATA%\\TaskbarManager on Windows, ~/.config/TaskbarManager elsewhere.
+Set TASKBAR_MANAGER_HOME to use a different directory.
+"""
+
+import json
+import os
+
+APP_DIR_NAME = "TaskbarManager"
+
+
+def config_dir():
+    """Return the settings directory, creating it if needed"""
+    path = os.environ.get("TASKBAR_MANAGER_HOME")
+    if not path:
+        base = (
+            os.environ.get("APPDATA")
+            or os.environ.get("XDG_CONFIG_HOME")
+            or os.path.join(os.path.expanduser("~"), ".config")
+        )
+        path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def config_path(name):
+    """Return the path of a file in the settings directory"""
+    return os.path.join(config_dir(), name)
+
+
+def load_json(path, default=None):
+    """Read a JSON file, returning default if it is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Write a JSON file atomically so a crash never leaves it half-written"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
@@ -0,0 +1,459 @@
+"""
+Local control server.
+
+Scripts and dashboards can drive Taskbar Manager over a local socket: a
+loopback TCP port, or a Unix socket on platforms that have them. The
+protocol is one JSON object per line in each direction. A request names an
+op and may carry an id, which its response repeats. The first request on a
+connection must carry the token from control_token in the settings
+directory:
+
+    {"token": "...", "id": 1, "op": "list", "process": ["chrome.exe"]}
+    {"id": 1, "ok": true, "windows": [{"hwnd": 132456, "title": "...", ...}]}
+    {"id": 2, "op": "hide", "title": ["*YouTube*"]}
+    {"id": 2, "ok": true, "count": 1, "elapsed_ms": 12.5, "failed": []}
+
+Ops are list, hide, show, close (with optional timeout and terminate),
+subscribe and stats. Windows are selected with hwnd, pid, process and title
+lists, as on the command line; hide, show and close need at least one.
+After subscribe the connection also receives a line for every change to
+the window list: {"event": "windows", "changed": [...], "removed": [...]}.
+
+Loopback is reachable by every local user, and by web pages, which can
+send a request body to a loopback port. So a connection is closed on a wrong
+or missing token, on any line that is not JSON, and without an answer on
+anything that looks like HTTP. The token file is readable by its owner only:
+created with mode 0600 on POSIX, and in %APPDATA% on Windows, which only the
+user (and administrators) can read. A Unix socket is made owner-only too.
+
+Reads never enumerate windows: the app feeds the server every snapshot and
+change (seed() and update()), and the encoded list is cached until the next
+change. Clients are served concurrently by an asyncio loop on a private
+thread; actions go to the app's BulkWindowEngine.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+from collections import namedtuple
+
+from .config import config_path
+from .records import select_windows
+
+DEFAULT_ADDRESS = "127.0.0.1:47815"
+TOKEN_FILE = "control_token"
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+OPS = ("list", "hide", "show", "close", "subscribe", "stats")
+SELECTORS = ("hwnd", "pid", "process", "title")
+
+# An HTTP request line or header, as a browser sends to a loopback port
+_HTTP_LINE = re.compile(rb"^(?:[A-Z]+ \S+ HTTP/\d|[!#-'*+.0-9A-Z^-z|~-]+:[ \t])")
+
+# A finished action requested by a client
+ControlAction = namedtuple("ControlAction", ["action", "result"])
+
+log = logging.getLogger(__name__)
+
+
+class ControlError(ValueError):
+    """Raised for a bad request; its message is sent back to the client"""
+
+
+def parse_address(text):
+    """Turn "host:port", "port" or a socket path into an address
+
+    Returns ("tcp", (host, port)) or ("unix", path).
+
+    Only loopback hosts are accepted, so the server is never reachable from
+    another machine.
+    """
+    text = str(text).strip()
+    if os.sep in text or "/" in text or text.endswith(".sock"):
+        return "unix", text
+    host, _, port = text.rpartition(":")
+    host = host.strip("[]") or "127.0.0.1"
+    if host not in LOOPBACK_HOSTS:
+        raise ValueError(f"the control server only listens on loopback, not {host}")
+    try:
+        return "tcp", (host, int(port))
+    except ValueError:
+        raise ValueError(f"bad control server address: {text}")
+
+
+def load_token(path=None):
+    """Return the control token, generating it on first use"""
+    path = path if path is not None else config_path(TOKEN_FILE)
+    try:
+        # O_EXCL: when two servers start at once, both end up with one token
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "r", encoding="utf-8") as f:
+            token = f.read().strip()
+        if not token:
+            raise OSError(f"{path} is empty; delete it to make a new token")
+        return token
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _error(request_id, message):
+    return _dumps({"id": request_id, "ok": False, "error": message}) + b"\n"
+
+
+def _selectors(request):
+    """Return the selector lists of a request, checking their types"""
+    selectors = {}
+    for name in SELECTORS:
+        values = request.get(name, [])
+        if not isinstance(values, list):
+            values = [values]
+        kind = str if name in ("process", "title") else int
+        if not all(
+            isinstance(value, kind) and not isinstance(value, bool) for value in values
+        ):
+            raise ControlError(f"{name} must be a list of {kind.__name__}s")
+        selectors[name] = values
+    return selectors
+
+
+class ControlServer:
+    """Serve the window list and window actions to local clients
+
+    engine is the BulkWindowEngine actions run on; token defaults to the
+    one in control_token, generated if needed. seed(windows) and
+    update(changed, removed) keep the cached list current and may be called
+    from any thread. Every finished action is passed to deliver(ControlAction):
+    with schedule (for example root.after) on the thread that called
+    start(), otherwise on the server thread.
+    """
+
+    poll_interval = 25  # ms between checks for finished actions when scheduled
+    max_subscriber_buffer = (
+        1 << 20
+    )  # bytes a subscriber may fall behind before it is dropped
+
+    def __init__(
+        self, engine, address=DEFAULT_ADDRESS, deliver=None, schedule=None, token=None
+    ):
+        self.engine = engine
+        self.kind, self.address = parse_address(address)
+        self.deliver = deliver
+        self.schedule = schedule
+        self._token = (token if token is not None else load_token()).encode("utf-8")
+        self.requests = 0
+        self.connections = 0  # connections accepted in total
+        self.rejected = 0  # connections closed for a bad token or line
+        self.events_sent = 0
+        self._windows = {}  # hwnd -> WindowRecord; only touched on the server loop
+        self._encoded = None  # the encoded list of every window, until it changes
+        self._subscribers = set()  # StreamWriters of subscribed connections
+        self._connections = {}  # StreamWriter -> the task serving each open connection
+        self._finished = []
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        """Start listening; returns the bound address, with the port chosen if 0"""
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=loop.run_forever, name="control-server", daemon=True
+        )
+        self._thread.start()
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(
+                self._listen(), loop
+            ).result(10)
+        except BaseException:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(5)
+            raise
+        self._loop = loop
+        if self.kind == "tcp":
+            self.address = self._server.sockets[0].getsockname()[:2]
+        if self.schedule is not None:
+            self.schedule(self.poll_interval, self._tick)
+        return self.address
+
+    def stop(self):
+        """Close every connection and stop the server thread"""
+        loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(5)
+        except Exception as e:
+            # An action still running keeps its connection open past the wait
+            log.warning("Control server did not close cleanly: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(5)
+        loop.close()
+        if self.kind == "unix":
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def seed(self, windows):
+        """Replace the cached list with a snapshot; subscribers get the difference"""
+        self._call(self._seed, list(windows))
+
+    def update(self, changed, removed):
+        """Apply windows added, changed or removed since the last snapshot"""
+        self._call(self._update, list(changed), list(removed))
+
+    def stats(self):
+        """Return the request and connection counters as a dict"""
+        return {
+            "requests": self.requests,
+            "clients": len(self._connections),
+            "connections": self.connections,
+            "rejected": self.rejected,
+            "subscribers": len(self._subscribers),
+            "events_sent": self.events_sent,
+            "windows": len(self._windows),
+        }
+
+    def _call(self, func, *args):
+        loop = self._loop
+        if loop is None:
+            func(*args)
+        else:
+            loop.call_soon_threadsafe(func, *args)
+
+    def _seed(self, windows):
+        fresh = {window.hwnd: window for window in windows}
+        changed = [
+            window for window in windows if self._windows.get(window.hwnd) != window
+        ]
+        removed = [hwnd for hwnd in self._windows if hwnd not in fresh]
+        self._windows = fresh
+        self._encoded = None
+        self._publish(changed, removed)
+
+    def _update(self, changed, removed):
+        for hwnd in removed:
+            self._windows.pop(hwnd, None)
+        for window in changed:
+            self._windows[window.hwnd] = window
+        self._encoded = None
+        self._publish(changed, removed)
+
+    def _publish(self, changed, removed):
+        """Send a change to every subscriber, encoded once"""
+        if not self._subscribers or not (changed or removed):
+            return
+        line = (
+            _dumps(
+                {
+                    "event": "windows",
+                    "changed": [window.as_dict() for window in changed],
+                    "removed": removed,
+                }
+            )
+            + b"\n"
+        )
+        for writer in list(self._subscribers):
+            if writer.transport.get_write_buffer_size() > self.max_subscriber_buffer:
+                # Never let one stalled client make the server buffer without end
+                log.warning("Dropping a control client that stopped reading events")
+                self._subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+            self.events_sent += 1
+
+    def _encoded_windows(self):
+        if self._encoded is None:
+            self._encoded = _dumps(
+                [window.as_dict() for window in self._windows.values()]
+            )
+        return self._encoded
+
+    async def _listen(self):
+        if self.kind == "unix":
+            server = await asyncio.start_unix_server(self._serve, path=self.address)
+            os.chmod(self.address, 0o600)
+            return server
+        host, port = self.address
+        return await asyncio.start_server(self._serve, host, port)
+
+    async def _close(self):
+        self._server.close()
+        # A closed transport ends each connection's read loop as if the client left
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        self._subscribers.clear()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        """Answer one connection's requests in order until it closes"""
+        self.connections += 1
+        self._connections[writer] = asyncio.current_task()
+        authenticated = False
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break  # reset, or a line past the stream limit
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if _HTTP_LINE.match(line):
+                    # Most likely a web page reaching for a loopback port
+                    self.rejected += 1
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    writer.write(_error(None, "request is not valid JSON"))
+                    self.rejected += 1
+                    break
+                if not authenticated:
+                    if not self._authenticate(request):
+                        writer.write(
+                            _error(
+                                (
+                                    request.get("id")
+                                    if isinstance(request, dict)
+                                    else None
+                                ),
+                                "missing or wrong token",
+                            )
+                        )
+                        self.rejected += 1
+                        break
+                    authenticated = True
+                writer.write(await self._respond(request, writer))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            self._subscribers.discard(writer)
+            writer.close()
+
+    def _authenticate(self, request):
+        token = request.get("token") if isinstance(request, dict) else None
+        return isinstance(token, str) and hmac.compare_digest(
+            token.encode("utf-8"), self._token
+        )
+
+    async def _respond(self, request, writer):
+        """Return the encoded response line to one decoded request"""
+        self.requests += 1
+        request_id = None
+        try:
+            if not isinstance(request, dict):
+                raise ControlError("request must be a JSON object")
+            request_id = request.get("id")
+            op = request.get("op")
+            if op not in OPS:
+                raise ControlError(f"op must be one of {', '.join(OPS)}")
+
+            if op == "list":
+                selectors = _selectors(request)
+                if not any(selectors.values()):
+                    # The common case: the whole list, encoded once per change
+                    return (
+                        b'{"id":'
+                        + _dumps(request_id)
+                        + b',"ok":true,"windows":'
+                        + self._encoded_windows()
+                        + b"}\n"
+                    )
+                body = {
+                    "windows": [
+                        window.as_dict()
+                        for window in select_windows(
+                            self._windows.values(), **selectors
+                        )
+                    ]
+                }
+            elif op == "subscribe":
+                self._subscribers.add(writer)
+                body = {"subscribed": True}
+            elif op == "stats":
+                body = {"stats": self.stats()}
+            else:
+                body = await self._act(op, request)
+        except ControlError as e:
+            return _error(request_id, str(e))
+        except Exception as e:
+            log.exception("Error answering a control request")
+            return _error(request_id, f"internal error: {e}")
+        return _dumps(dict({"id": request_id, "ok": True}, **body)) + b"\n"
+
+    async def _act(self, op, request):
+        selectors = _selectors(request)
+        if not any(selectors.values()):
+            raise ControlError(f"{op}: give at least one of {', '.join(SELECTORS)}")
+        hwnds = [
+            window.hwnd
+            for window in select_windows(self._windows.values(), **selectors)
+        ]
+        if not hwnds:
+            return {"count": 0, "elapsed_ms": 0.0, "failed": []}
+
+        if op == "close":
+            timeout = request.get("timeout")
+            if timeout is not None and (
+                not isinstance(timeout, (int, float))
+                or isinstance(timeout, bool)
+                or timeout < 0
+            ):
+                raise ControlError("timeout must be a number of seconds")
+            future = self.engine.close(hwnds, bool(request.get("terminate")), timeout)
+        else:
+            future = self.engine.submit(op, hwnds)
+        result = await asyncio.wrap_future(future)
+
+        self._finish(ControlAction(op, result))
+        body = {
+            "count": sum(window_result.ok for window_result in result.results),
+            "elapsed_ms": round(result.elapsed * 1000, 1),
+            "failed": [
+                {"hwnd": window_result.hwnd, "error": str(window_result.error)}
+                for window_result in result.results
+                if not window_result.ok
+            ],
+        }
+        if op == "close":
+            body["outcomes"] = {
+                str(window_result.hwnd): window_result.outcome
+                for window_result in result.results
+            }
+        return body
+
+    def _finish(self, action):
+        if self.deliver is None:
+            return
+        if self.schedule is None:
+            self.deliver(action)
+            return
+        with self._lock:
+            self._finished.append(action)
+
+    def _tick(self):
+        if self._loop is None:
+            return
+        with self._lock:
+            finished, self._finished = self._finished, []
+        for action in finished:
+            self.deliver(action)
+        self.schedule(self.poll_interval, self._tick)
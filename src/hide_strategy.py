@@ -0,0 +1,81 @@
+"""
+Learned hide strategies.
+
+Most applications disappear from Alt+Tab and the taskbar after a plain
+SW_HIDE, yet the full hide sequence makes around a dozen Win32 calls and
+pauses twice. The hide ladder below splits the sequence into strategies of
+increasing strength. StrategyCache remembers, per application, the weakest
+strategy that was verified to work, so later hides start there.
+"""
+
+import logging
+import threading
+
+from .config import config_path, load_json, save_json
+
+# Hide strategies from weakest to strongest; each one adds steps to the previous
+HIDE_STRATEGIES = ("hide", "minimize", "tool_window", "full")
+
+STRATEGY_FILE = "hide_strategies.json"
+
+log = logging.getLogger(__name__)
+
+
+class StrategyCache:
+    """Persisted map of application -> weakest hide strategy known to work
+
+    Applications are keyed by lowercased process name. Changes are kept in
+    memory until save() is called.
+    """
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else config_path(STRATEGY_FILE)
+        self._lock = threading.Lock()
+        self._dirty = False
+        data = load_json(self.path, {}) or {}
+        self._strategies = {
+            key: name
+            for key, name in data.get("strategies", {}).items()
+            if name in HIDE_STRATEGIES
+        }
+
+    def start_level(self, key):
+        """Return the index in HIDE_STRATEGIES to try first for an application"""
+        with self._lock:
+            name = self._strategies.get(key)
+        return HIDE_STRATEGIES.index(name) if name is not None else 0
+
+    def record(self, key, level):
+        """Remember the strategy that hid a window of an application"""
+        name = HIDE_STRATEGIES[level]
+        with self._lock:
+            if self._strategies.get(key) != name:
+                self._strategies[key] = name
+                self._dirty = True
+
+    def entries(self):
+        """Return a copy of the learned strategies"""
+        with self._lock:
+            return dict(self._strategies)
+
+    def reset(self, key=None):
+        """Forget one application's strategy, or all of them when key is None"""
+        with self._lock:
+            if key is None:
+                self._strategies.clear()
+            else:
+                self._strategies.pop(key, None)
+            self._dirty = True
+        self.save()
+
+    def save(self):
+        """Write the learned strategies to disk if they changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": 1, "strategies": dict(self._strategies)}
+            self._dirty = False
+        try:
+            save_json(self.path, data)
+        except OSError as e:
+            log.warning("Failed to save hide strategies: %s", e)
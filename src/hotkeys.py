@@ -0,0 +1,360 @@
+"""
+Global panic hotkeys.
+
+When a screen share goes wrong, going through the window list is too slow.
+The panic hotkey hides a configured set of windows from anywhere, and the
+restore hotkey shows them again. Both are set in hotkeys.json in the
+settings directory, for example:
+
+    {"panic": "ctrl+alt+h", "restore": "ctrl+alt+s",
+     "targets": [{"process": "slack.exe"}, {"title": "*Confidential*"}]}
+
+targets take the conditions of auto-hide rules (process, exe, title,
+title_regex). The hotkeys are opt-in: nothing is registered unless
+hotkeys.json exists and names at least one target. A binding set to null
+is not registered.
+
+PanicButton keeps the handles to hide precomputed: the window list feeds it
+every change, so a keypress enumerates nothing. The press is handled on the
+hotkey thread, which hands the handles straight to the BulkWindowEngine
+without waiting for the Tk loop, and the time from the keypress until every
+window is hidden and journaled is measured.
+
+WinHotkeySource registers the hotkeys with RegisterHotKey on Windows;
+ManualHotkeySource lets presses be simulated anywhere.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from .config import config_path, load_json
+from .instrumentation import metrics
+from .rules import RuleError, RuleSet, parse_rules
+
+HOTKEY_FILE = "hotkeys.json"
+DEFAULT_HOTKEYS = {"panic": "ctrl+alt+h", "restore": "ctrl+alt+s"}
+
+MOD_ALT = 0x0001
+MOD_CONTROL = 0x0002
+MOD_SHIFT = 0x0004
+MOD_WIN = 0x0008
+MOD_NOREPEAT = 0x4000
+WM_HOTKEY = 0x0312
+WM_QUIT = 0x0012
+
+MODIFIERS = {
+    "alt": MOD_ALT,
+    "ctrl": MOD_CONTROL,
+    "control": MOD_CONTROL,
+    "shift": MOD_SHIFT,
+    "win": MOD_WIN,
+}
+
+# Virtual-key codes of the named keys; letters, digits and F1-F24 are computed
+KEY_CODES = {
+    "backspace": 0x08,
+    "tab": 0x09,
+    "enter": 0x0D,
+    "pause": 0x13,
+    "esc": 0x1B,
+    "escape": 0x1B,
+    "space": 0x20,
+    "pageup": 0x21,
+    "pagedown": 0x22,
+    "end": 0x23,
+    "home": 0x24,
+    "left": 0x25,
+    "up": 0x26,
+    "right": 0x27,
+    "down": 0x28,
+    "insert": 0x2D,
+    "delete": 0x2E,
+    "scrolllock": 0x91,
+}
+
+# A hotkey press; time is the time.perf_counter() the key was pressed
+HotkeyEvent = namedtuple("HotkeyEvent", ["name", "time"])
+
+# The panic settings: bindings maps "panic"/"restore" to (modifiers, vk);
+# targets is the RuleSet of the windows to hide
+HotkeyConfig = namedtuple("HotkeyConfig", ["bindings", "targets"])
+
+# A finished press: the engine's BulkResult and the seconds from the keypress
+PanicResult = namedtuple("PanicResult", ["action", "result", "latency"])
+
+log = logging.getLogger(__name__)
+
+
+class HotkeyError(ValueError):
+    """Raised for a malformed hotkey or hotkeys.json"""
+
+
+def parse_hotkey(text):
+    """Turn a hotkey such as "ctrl+alt+h" into (modifiers, virtual-key code)"""
+    *modifier_names, key = [part.strip().lower() for part in text.split("+")]
+    modifiers = 0
+    for name in modifier_names:
+        if name not in MODIFIERS:
+            raise HotkeyError(f"{text}: unknown modifier {name!r}")
+        modifiers |= MODIFIERS[name]
+    if len(key) == 1 and key.isalnum() and key.isascii():
+        vk = ord(key.upper())
+    elif key[:1] == "f" and key[1:].isdigit() and 1 <= int(key[1:]) <= 24:
+        vk = 0x70 + int(key[1:]) - 1
+    elif key in KEY_CODES:
+        vk = KEY_CODES[key]
+    else:
+        raise HotkeyError(f"{text}: unknown key {key!r}")
+    if not modifiers:
+        raise HotkeyError(f"{text}: a global hotkey needs at least one modifier")
+    return modifiers, vk
+
+
+def load_hotkey_config(path=None):
+    """Read hotkeys.json; returns None unless it exists and names targets to hide"""
+    path = path if path is not None else config_path(HOTKEY_FILE)
+    data = load_json(path, None)
+    if data is None:
+        return None
+    if not isinstance(data, dict):
+        raise HotkeyError(f"{HOTKEY_FILE}: expected an object")
+    bindings = {}
+    for name, default in DEFAULT_HOTKEYS.items():
+        text = data.get(name, default)
+        if text and not isinstance(text, str):
+            raise HotkeyError(
+                f'{HOTKEY_FILE}: {name} must be a hotkey such as "{default}"'
+            )
+        if text:
+            bindings[name] = parse_hotkey(text)
+    targets = data.get("targets")
+    if not targets or not bindings:
+        return None
+    if not isinstance(targets, list):
+        raise HotkeyError(f"{HOTKEY_FILE}: targets must be a list of rule conditions")
+    try:
+        rules = parse_rules(
+            [
+                dict(target, action="hide") if isinstance(target, dict) else target
+                for target in targets
+            ]
+        )
+    except RuleError as e:
+        raise HotkeyError(f"{HOTKEY_FILE} targets: {e}")
+    return HotkeyConfig(bindings, RuleSet(rules))
+
+
+class WinHotkeySource:
+    """Global hotkeys from RegisterHotKey, received on a private thread
+
+    WM_HOTKEY is posted to the thread that registered the hotkey, so the
+    thread runs its own message loop. A hotkey another application holds
+    already is skipped with a warning; start() fails if none registered.
+    """
+
+    def __init__(self, bindings):
+        self.bindings = dict(bindings)
+        self.registered = []
+        self._thread = None
+        self._thread_id = None
+        self._error = None
+        self._ready = threading.Event()
+
+    def start(self, callback):
+        """Register the hotkeys and call callback(HotkeyEvent) for every press"""
+        self._ready.clear()
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, args=(callback,), name="panic-hotkeys", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait(5)
+        if self._error is not None:
+            self._thread.join(5)
+            self._thread = None
+            raise OSError(f"Could not register hotkeys: {self._error}")
+
+    def stop(self):
+        """Unregister the hotkeys and end the hotkey thread"""
+        if self._thread is None:
+            return
+        import ctypes
+
+        ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread.join(5)
+        self._thread = None
+
+    def _run(self, callback):
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+        except (ImportError, AttributeError) as e:
+            self._error = e
+            self._ready.set()
+            return
+
+        names = {}
+        for hotkey_id, (name, (modifiers, vk)) in enumerate(self.bindings.items(), 1):
+            if user32.RegisterHotKey(None, hotkey_id, modifiers | MOD_NOREPEAT, vk):
+                names[hotkey_id] = name
+            else:
+                log.warning("Hotkey for %s is taken by another application", name)
+        self.registered = list(names.values())
+        if not names:
+            self._error = "every hotkey is taken"
+            self._ready.set()
+            return
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.message == WM_HOTKEY and msg.wParam in names:
+                # msg.time is when the key was pressed; count the queueing too
+                waited = (kernel32.GetTickCount() - msg.time) & 0xFFFFFFFF
+                callback(
+                    HotkeyEvent(names[msg.wParam], time.perf_counter() - waited / 1000)
+                )
+
+        for hotkey_id in names:
+            user32.UnregisterHotKey(None, hotkey_id)
+
+
+class ManualHotkeySource:
+    """Hotkey source whose presses are made by calling press()"""
+
+    def __init__(self):
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def press(self, name):
+        """Simulate a press, handled on the calling thread as on the hotkey thread"""
+        if self._callback is not None:
+            self._callback(HotkeyEvent(name, time.perf_counter()))
+
+
+class PanicButton:
+    """Hide a precomputed set of windows when the panic hotkey is pressed
+
+    seed() and update() are fed the listed windows as they change, and keep
+    targets, the visible windows the RuleSet rules matches, current. Presses
+    arrive on the hotkey source's thread and start hiding at once; restore
+    shows the windows hidden by the panic presses since the last restore. A
+    press waits for the one before it to finish. With schedule (for example
+    root.after) finished presses are passed to deliver(PanicResult) on the
+    thread that called start().
+    """
+
+    poll_interval = 25  # ms between checks for finished presses when scheduled
+
+    def __init__(
+        self, engine, source, targets, get_exe=None, deliver=None, schedule=None
+    ):
+        self.engine = engine
+        self.source = source
+        self.rules = targets
+        self.get_exe = get_exe
+        self.deliver = deliver
+        self.schedule = schedule
+        self.targets = ()  # hwnds a panic press hides, replaced whole on every update
+        self.panicked = ()  # hwnds hidden by panic presses, shown by the next restore
+        self.presses = 0
+        self.last = None  # PanicResult of the latest finished press
+        self._matching = {}  # hwnd -> None for every listed target, in list order
+        self._finished = []
+        self._lock = threading.Lock()
+        self._running = None
+        self._started = False
+
+    def seed(self, windows):
+        """Recompute the targets from a full window list"""
+        self._matching = {}
+        self.update(windows, ())
+
+    def update(self, changed, removed):
+        """Bring the targets up to date with windows that changed or left the list"""
+        for hwnd in removed:
+            self._matching.pop(hwnd, None)
+        for window in changed:
+            if window.is_visible and self.rules.match(window, self.get_exe) is not None:
+                self._matching[window.hwnd] = None
+            else:
+                self._matching.pop(window.hwnd, None)
+        self.targets = tuple(self._matching)
+
+    def start(self):
+        self._started = True
+        self.source.start(self.press)
+        if self.schedule is not None:
+            self.schedule(self.poll_interval, self._tick)
+
+    def stop(self):
+        self._started = False
+        self.source.stop()
+
+    def press(self, event):
+        """Handle a hotkey press; called on the hotkey thread"""
+        running = self._running
+        if running is not None:
+            running.result()
+        if event.name == "panic":
+            hwnds = self.targets
+            self.panicked = tuple(dict.fromkeys(self.panicked + hwnds))
+            action = "hide"
+        elif event.name == "restore":
+            hwnds, self.panicked = self.panicked, ()
+            action = "show"
+        else:
+            return
+        if not hwnds:
+            return
+        self.presses += 1
+        future = self.engine.submit(action, hwnds)
+        self._running = future
+        future.add_done_callback(lambda done: self._done(action, event, done))
+
+    def stats(self):
+        """Return the press counters and the latest latency in seconds"""
+        return {
+            "presses": self.presses,
+            "targets": len(self.targets),
+            "panicked": len(self.panicked),
+            "last_action": self.last.action if self.last is not None else None,
+            "last_latency": self.last.latency if self.last is not None else None,
+        }
+
+    def _done(self, action, event, future):
+        latency = time.perf_counter() - event.time
+        if future.exception() is not None:
+            log.error("Error in panic %s", action, exc_info=future.exception())
+            return
+        metrics.record(f"panic.{action}", latency)
+        result = PanicResult(action, future.result(), latency)
+        self.last = result
+        with self._lock:
+            self._finished.append(result)
+        if self.schedule is None and self.deliver is not None:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            finished, self._finished = self._finished, []
+        for result in finished:
+            self.deliver(result)
+
+    def _tick(self):
+        if not self._started:
+            return
+        if self.deliver is not None:
+            self._flush()
+        self.schedule(self.poll_interval, self._tick)
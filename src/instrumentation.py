@@ -0,0 +1,204 @@
+"""
+Timing instrumentation and logging.
+
+Metrics keeps latency histograms for the phases of a refresh (enumeration,
+filtering, process lookup, list update) and for every hide/show step, and
+reports p50/p95/p99 for each. It is off unless TASKBAR_MANAGER_DEBUG is set
+or the debug panel (F12) is opened: while disabled, timer() returns a shared
+no-op context manager and wrap() returns the function unchanged, so
+instrumented code costs one attribute check.
+
+setup_logging() configures the package loggers. The windowed build has no
+console, so records go to a log file in the settings directory when there is
+no stderr to write to.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from .config import config_path, save_json
+
+DEBUG_ENV = "TASKBAR_MANAGER_DEBUG"
+LOG_FILE = "taskbar_manager.log"
+TIMINGS_FILE = "timings.json"
+MAX_SAMPLES = 1024  # most recent samples kept per phase
+PERCENTILES = (50, 95, 99)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Histogram:
+    """Latency samples of one phase; percentiles use the most recent samples"""
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Return the nearest-rank percentile of the kept samples, in seconds"""
+        return _nearest_rank(sorted(self.samples), percent)
+
+    def summary(self):
+        """Return count, mean, percentiles and max in milliseconds"""
+        ordered = sorted(self.samples)
+        result = {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+        }
+        for percent in PERCENTILES:
+            result[f"p{percent}_ms"] = _nearest_rank(ordered, percent) * 1000
+        result["max_ms"] = self.max * 1000
+        return result
+
+
+def _nearest_rank(ordered, percent):
+    if not ordered:
+        return 0.0
+    rank = -(-len(ordered) * percent // 100)  # ceil without floats
+    return ordered[max(1, rank) - 1]
+
+
+class Metrics:
+    """Named latency histograms, shared by the scanner, the GUI and the bulk engine"""
+
+    def __init__(self, enabled=False, max_samples=MAX_SAMPLES):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def timer(self, name):
+        """Context manager that records the time spent in its block under name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def wrap(self, name, func):
+        """Return func timed under name, or func itself while disabled"""
+        if not self.enabled:
+            return func
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - started)
+
+        return timed
+
+    def record(self, name, seconds):
+        """Add a sample in seconds to the histogram of a phase"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.max_samples)
+            histogram.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def summary(self):
+        """Return {phase: summary dict} for every phase recorded so far"""
+        with self._lock:
+            return {
+                name: histogram.summary()
+                for name, histogram in sorted(self.histograms.items())
+            }
+
+    def describe(self, names):
+        """Return a one-line p50/p95/p99 summary of phases, for the debug panel"""
+        summary = self.summary()
+        parts = []
+        for name in names:
+            phase = summary.get(name)
+            if phase is not None:
+                parts.append(
+                    f"{name} "
+                    + "/".join(
+                        f"{phase[f'p{percent}_ms']:.1f}" for percent in PERCENTILES
+                    )
+                )
+        if not parts:
+            return "No timings recorded yet"
+        return "p50/p95/p99 ms: " + "   ".join(parts)
+
+    def export(self, path=None):
+        """Write the summary of every phase as JSON; returns the path written"""
+        path = path if path is not None else config_path(TIMINGS_FILE)
+        save_json(
+            path, {"version": 1, "exported": time.time(), "phases": self.summary()}
+        )
+        return path
+
+
+# Shared by every module; enabled from the environment or the debug panel
+metrics = Metrics(enabled=bool(os.environ.get(DEBUG_ENV)))
+
+
+def setup_logging(debug=None):
+    """Configure the package loggers once
+
+    Warnings and errors are logged by default, everything with debug=True
+    (by default, when TASKBAR_MANAGER_DEBUG is set). Records go to stderr,
+    or to the log file in the settings directory when there is no stderr.
+    """
+    if debug is None:
+        debug = bool(os.environ.get(DEBUG_ENV))
+    logger = logging.getLogger(__package__)
+    logger.setLevel(logging.DEBUG if debug else logging.WARNING)
+    if logger.handlers:
+        return logger
+
+    if sys.stderr is not None:
+        handler = logging.StreamHandler()
+    else:
+        handler = logging.FileHandler(
+            config_path(LOG_FILE), encoding="utf-8", delay=True
+        )
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    logger.addHandler(handler)
+    return logger
@@ -0,0 +1,308 @@
+"""
+Hidden window journal.
+
+Hidden windows are transparent, disabled tool windows parked at -32000, so a
+crash or a plain exit used to strand them. HiddenJournal keeps an append-only
+log of hide and show operations in the settings directory. A hide is written
+before the window is touched and records what is needed to undo it: the
+original rect and extended style, and the owning process, so a recycled
+window handle is never "restored".
+
+Each record is one JSON line, flushed to the OS as it is written; fsync is
+batched and happens once per bulk operation through sync(). Replaying keeps
+the last record per window and skips a torn final line, and the file is
+compacted to the live entries on open and close when it has grown well past
+them.
+
+The GUI and the command line may have the journal open at once, each
+appending its own operations. Compaction re-reads the file so every
+writer's records survive, and is skipped while another writer has the file
+open: on POSIX each open journal holds a shared lock on a lock file and
+compaction needs an exclusive one; on Windows the file cannot be replaced
+while another process has it open.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .backends import GWL_EXSTYLE
+from .config import config_path
+
+JOURNAL_FILE = "hidden_windows.journal"
+
+# What a hide changed; ex_style is the extended style before the hide
+HiddenEntry = namedtuple(
+    "HiddenEntry", ["hwnd", "rect", "ex_style", "pid", "process", "create_time"]
+)
+
+
+def capture_entry(backend, hwnd):
+    """Read the state a hide is about to change"""
+    pid = backend.get_window_pid(hwnd)
+    info = backend.get_process_info(pid)
+    return HiddenEntry(
+        hwnd,
+        tuple(backend.get_window_rect(hwnd)),
+        backend.get_window_long(hwnd, GWL_EXSTYLE),
+        pid,
+        info.name,
+        info.create_time,
+    )
+
+
+def _hide_record(entry):
+    return {
+        "op": "hide",
+        "hwnd": entry.hwnd,
+        "rect": list(entry.rect) if entry.rect else None,
+        "ex_style": entry.ex_style,
+        "pid": entry.pid,
+        "process": entry.process,
+        "create_time": entry.create_time,
+    }
+
+
+log = logging.getLogger(__name__)
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+class HiddenJournal:
+    """Append-only journal of the windows hidden and not yet shown again
+
+    entries maps hwnd -> HiddenEntry for every window the journal considers
+    hidden. Methods may be called from any thread.
+    """
+
+    compact_min = 256  # records before compaction is considered
+    compact_ratio = 4  # compact when records exceed live entries this many times
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else config_path(JOURNAL_FILE)
+        self.entries = {}
+        self.records = 0  # records in the file, live or not
+        self.skipped = 0  # unreadable records found by the last replay
+        self._unsynced = False
+        self._file = None
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._offset = 0  # bytes of the file replayed into entries
+        if fcntl is not None:
+            self._lock_file = open(self.path + ".lock", "a")
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+        self.replay()
+        # A torn last line must not swallow the next append, so rewrite it away
+        if self.skipped or self._should_compact():
+            self.compact()
+        self._file = open(self.path, "a", encoding="utf-8", newline="\n")
+        if self.skipped and self._ends_torn():
+            # Another writer kept the file from being compacted; end the line
+            self._file.write("\n")
+            self._file.flush()
+
+    def replay(self):
+        """Rebuild entries from the file"""
+        entries, records, skipped, offset = self._read()
+        with self._lock:
+            self.entries = entries
+            self.records = records
+            self.skipped = skipped
+            self._offset = offset
+
+    def _read(self, offset=0, entries=None):
+        """Replay the file from offset onto entries
+
+        Returns (entries, records, skipped, offset), offset being where the
+        last complete line ends. Replaying records this journal wrote itself
+        again changes nothing, as the last record per window decides.
+        """
+        entries = {} if entries is None else entries
+        records = skipped = 0
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if line.endswith(b"\n"):
+                        offset += len(line)
+                    try:
+                        record = json.loads(line)
+                        hwnd = record["hwnd"]
+                        if record["op"] == "hide":
+                            entries[hwnd] = HiddenEntry(
+                                hwnd,
+                                tuple(record["rect"]) if record["rect"] else None,
+                                record["ex_style"],
+                                record["pid"],
+                                record["process"],
+                                record["create_time"],
+                            )
+                        else:
+                            entries.pop(hwnd, None)
+                    except (ValueError, KeyError, TypeError):
+                        # A torn write from a crash; every earlier record is intact
+                        skipped += 1
+                        continue
+                    records += 1
+        except FileNotFoundError:
+            pass
+        return entries, records, skipped, offset
+
+    def _ends_torn(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False  # empty or missing
+
+    def _should_compact(self):
+        return (
+            self.records >= self.compact_min
+            and self.records > self.compact_ratio * len(self.entries)
+        )
+
+    def record_hide(self, entry):
+        """Log that a window is about to be hidden
+
+        A window hidden twice keeps its first entry, which holds the state
+        from before any hide.
+        """
+        with self._lock:
+            if entry.hwnd in self.entries:
+                return
+            self.entries[entry.hwnd] = entry
+            self._append(_hide_record(entry))
+
+    def record_show(self, hwnd):
+        """Log that a window was shown, closed or is otherwise no longer hidden"""
+        with self._lock:
+            if self.entries.pop(hwnd, None) is None:
+                return
+            self._append({"op": "show", "hwnd": hwnd})
+
+    def _append(self, record):
+        self._file.write(_dumps(record))
+        # Reaching the OS is enough to survive a crash of this process
+        self._file.flush()
+        self.records += 1
+        self._unsynced = True
+
+    def sync(self):
+        """fsync records written since the last sync"""
+        with self._lock:
+            if not self._unsynced or self._file is None:
+                return
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+
+    def compact(self):
+        """Rewrite the file with one record per live entry; returns whether it did
+
+        The file is read again first, so entries other writers appended are
+        kept, and left alone while another writer has it open.
+        """
+        with self._lock:
+            if not self._lock_exclusive():
+                log.debug("Not compacting %s: another writer has it open", self.path)
+                return False
+            try:
+                return self._compact()
+            finally:
+                self._lock_shared()
+
+    def _compact(self):
+        # Only what was appended since the last replay needs reading
+        entries, _, _, _ = self._read(self._offset, dict(self.entries))
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            for entry in entries.values():
+                f.write(_dumps(_hide_record(entry)))
+            f.flush()
+            os.fsync(f.fileno())
+
+        reopen = self._file is not None
+        if reopen:
+            self._file.close()
+        try:
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            # On Windows another process still has the file open
+            log.debug("Not compacting %s: %s", self.path, e)
+            os.remove(temp_path)
+            return False
+        else:
+            self.entries = entries
+            self.records = len(entries)
+            self.skipped = 0
+            self._offset = os.path.getsize(self.path)
+            self._unsynced = False
+        finally:
+            if reopen:
+                self._file = open(self.path, "a", encoding="utf-8", newline="\n")
+        return True
+
+    def _lock_exclusive(self):
+        """Take the lock file exclusively if no other journal holds it"""
+        if self._lock_file is None:
+            return True
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            # A failed conversion may have dropped the shared lock too
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+            return False
+
+    def _lock_shared(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+
+    def stranded(self, backend):
+        """Return the entries whose window still exists in its original process
+
+        Entries for windows that are gone, or whose handle now belongs to
+        another process, are dropped from the journal.
+        """
+        stranded = []
+        for entry in list(self.entries.values()):
+            if self._matches(backend, entry):
+                stranded.append(entry)
+            else:
+                self.record_show(entry.hwnd)
+        return stranded
+
+    @staticmethod
+    def _matches(backend, entry):
+        try:
+            if not backend.is_window(entry.hwnd):
+                return False
+            pid = backend.get_window_pid(entry.hwnd)
+            if pid != entry.pid:
+                return False
+            info = backend.get_process_info(pid)
+        except Exception:
+            return False
+        return info.name == entry.process and info.create_time == entry.create_time
+
+    def close(self):
+        """Sync and close the file, compacting it if it has grown"""
+        if self._file is not None and self._should_compact():
+            self.compact()
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
@@ -0,0 +1,134 @@
+"""
+Process metadata cache.
+
+Browsers and similar applications own dozens of windows, so looking up the
+owning process for every window on every refresh repeats the same psutil
+calls many times. ProcessCache remembers name and exe per process, keyed by
+(pid, create_time) so a recycled PID is never served stale data.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# status is "ok", "access_denied" or "no_such_process"
+ProcessInfo = namedtuple("ProcessInfo", ["pid", "name", "exe", "create_time", "status"])
+
+
+class _Entry:
+    __slots__ = ("info", "checked")
+
+    def __init__(self, info, checked):
+        self.info = info
+        self.checked = checked
+
+
+class ProcessCache:
+    """Bounded LRU cache of process metadata keyed by (pid, create_time)
+
+    Entries validated less than ttl seconds ago are served without touching
+    the OS, which covers the many windows of one process seen during a single
+    scan. Older entries are revalidated by comparing the process create time;
+    a mismatch means the PID was reused and the entry is refetched. The
+    create time is kept for processes whose name or exe is denied too; when
+    even it cannot be read the entry is refetched once the ttl has passed.
+    """
+
+    def __init__(self, max_size=512, ttl=1.0, psutil_module=None):
+        if psutil_module is None:
+            import psutil as psutil_module
+        self._psutil = psutil_module
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # pid -> _Entry, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, pid):
+        """Return the ProcessInfo for a PID"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pid)
+            if entry is not None and now - entry.checked < self.ttl:
+                self._entries.move_to_end(pid)
+                self.hits += 1
+                return entry.info
+
+        process, create_time = self._open(pid)
+
+        with self._lock:
+            entry = self._entries.get(pid)
+            if entry is not None:
+                # Without a create time a reused PID cannot be told apart
+                if create_time is not None and entry.info.create_time == create_time:
+                    entry.checked = now
+                    self._entries.move_to_end(pid)
+                    self.hits += 1
+                    return entry.info
+                self.invalidations += 1
+            self.misses += 1
+
+        info = self._fetch(pid, process, create_time)
+
+        with self._lock:
+            self._entries[pid] = _Entry(info, now)
+            self._entries.move_to_end(pid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return info
+
+    def invalidate(self, pid=None):
+        """Forget one PID, or every entry when pid is None"""
+        with self._lock:
+            if pid is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(pid, None)
+
+    def stats(self):
+        """Return the cache counters as a dict"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _open(self, pid):
+        """Return (process, create_time); process is None if it does not exist"""
+        psutil = self._psutil
+        try:
+            process = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            return None, None
+        try:
+            return process, process.create_time()
+        except psutil.NoSuchProcess:
+            return None, None
+        except psutil.AccessDenied:
+            # psutil already asks with the least access it can; name() is tried anyway
+            return process, None
+
+    def _fetch(self, pid, process, create_time):
+        psutil = self._psutil
+        if process is None:
+            return ProcessInfo(pid, "Unknown", "", create_time, "no_such_process")
+
+        try:
+            with process.oneshot():
+                name = process.name()
+                try:
+                    exe = process.exe()
+                except psutil.AccessDenied:
+                    exe = ""
+            return ProcessInfo(pid, name, exe, create_time, "ok")
+        except psutil.NoSuchProcess:
+            return ProcessInfo(pid, "Unknown", "", create_time, "no_such_process")
+        except psutil.AccessDenied:
+            return ProcessInfo(pid, "Unknown", "", create_time, "access_denied")
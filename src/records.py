@@ -0,0 +1,143 @@
+"""
+Window records.
+
+Every refresh describes each listed window. WindowRecord holds one window in
+slots rather than a dict: handle, title, PID, the process name interned so
+all windows of an application share one string, and the visibility and
+style bits packed into an int. WindowTable holds the listed records indexed
+by handle and grouped by process name, so selection lookups and Hide All
+Similar are dictionary lookups instead of scans of the whole list.
+"""
+
+import fnmatch
+import sys
+
+# Bits of WindowRecord.flags
+FLAG_VISIBLE = 0x1  # IsWindowVisible
+FLAG_DISABLED = 0x2  # WS_DISABLED
+FLAG_TOOL_WINDOW = 0x4  # WS_EX_TOOLWINDOW
+FLAG_LAYERED = 0x8  # WS_EX_LAYERED
+
+FIELDS = ("hwnd", "title", "process", "pid", "visible")
+
+
+def select_windows(windows, hwnd=(), pid=(), process=(), title=()):
+    """Return the windows matching every given selector type
+
+    Values of one selector type are alternatives, e.g. pid=[1, 2] matches
+    either PID; process names match case-insensitively and titles are
+    case-insensitive globs. The command line and the control server select
+    windows with it.
+    """
+    hwnds = set(hwnd)
+    pids = set(pid)
+    processes = {name.lower() for name in process}
+    titles = [pattern.lower() for pattern in title]
+
+    selected = []
+    for window in windows:
+        if hwnds and window.hwnd not in hwnds:
+            continue
+        if pids and window.pid not in pids:
+            continue
+        if processes and window.process.lower() not in processes:
+            continue
+        if titles and not any(
+            fnmatch.fnmatchcase(window.title.lower(), pattern) for pattern in titles
+        ):
+            continue
+        selected.append(window)
+    return selected
+
+
+class WindowRecord:
+    """A listed window; visible is the text the list shows for its flags"""
+
+    __slots__ = ("hwnd", "title", "process", "pid", "flags")
+
+    def __init__(self, hwnd, title, process, pid, flags=0):
+        self.hwnd = hwnd
+        self.title = title
+        self.process = sys.intern(process)
+        self.pid = pid
+        self.flags = flags
+
+    @property
+    def is_visible(self):
+        return bool(self.flags & FLAG_VISIBLE)
+
+    @property
+    def visible(self):
+        return "Visible" if self.flags & FLAG_VISIBLE else "Hidden"
+
+    def __eq__(self, other):
+        if not isinstance(other, WindowRecord):
+            return NotImplemented
+        return (
+            self.hwnd == other.hwnd
+            and self.title == other.title
+            and self.process == other.process
+            and self.pid == other.pid
+            and self.flags == other.flags
+        )
+
+    __hash__ = None  # compared by value but mutable
+
+    def __repr__(self):
+        return (
+            f"WindowRecord(hwnd={self.hwnd!r}, title={self.title!r}, "
+            f"process={self.process!r}, pid={self.pid!r}, flags={self.flags:#x})"
+        )
+
+    def as_dict(self):
+        """Return the record as the dict the command line prints"""
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+class WindowTable:
+    """Listed windows by handle, in the order they were added, and by process"""
+
+    def __init__(self, records=()):
+        self.by_hwnd = {}
+        self.by_process = {}  # lowercased process name -> {hwnd: record}
+        self.update(records)
+
+    def __len__(self):
+        return len(self.by_hwnd)
+
+    def __iter__(self):
+        return iter(self.by_hwnd.values())
+
+    def __contains__(self, hwnd):
+        return hwnd in self.by_hwnd
+
+    def get(self, hwnd, default=None):
+        return self.by_hwnd.get(hwnd, default)
+
+    def update(self, changed=(), removed=()):
+        """Add or replace changed records and drop removed handles"""
+        for hwnd in removed:
+            record = self.by_hwnd.pop(hwnd, None)
+            if record is not None:
+                self._ungroup(record)
+        for record in changed:
+            old = self.by_hwnd.get(record.hwnd)
+            if old is not None:
+                self._ungroup(old)
+            self.by_hwnd[record.hwnd] = record
+            self.by_process.setdefault(record.process.lower(), {})[record.hwnd] = record
+
+    def _ungroup(self, record):
+        key = record.process.lower()
+        group = self.by_process[key]
+        del group[record.hwnd]
+        if not group:
+            del self.by_process[key]
+
+    def group(self, process):
+        """Return the records of a process, matched case-insensitively"""
+        return list(self.by_process.get(process.lower(), {}).values())
+
+    def process_counts(self):
+        """Return {lowercased process name: number of listed windows}"""
+        return {process: len(group) for process, group in self.by_process.items()}
@@ -0,0 +1,142 @@
+"""
+Refresh scheduling.
+
+Every hide, show and close ends by refreshing the list, so a burst of clicks
+or a scripted sequence of actions would enumerate every window again and
+again. RefreshScheduler merges refresh requests that arrive close together,
+runs at most one scan at a time, and lets an action ask for a re-check of
+only the windows it touched instead of a full scan.
+"""
+
+import logging
+from concurrent.futures import wait as wait_futures
+
+log = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """Coalesce refresh requests into as few scans as possible
+
+    request(hwnds) asks for a re-check of just those windows; request()
+    asks for a full scan. Requests made within coalesce_ms of the first
+    pending one are merged into one job: a full scan if any of them asked
+    for one, since it covers every window, else one re-check of all their
+    windows. A job never starts while another runs; requests made meanwhile
+    are merged and run as one job when it finishes.
+
+    scan() and recheck(hwnds) start the work and return a Future; each
+    finished job's result is passed to deliver(result). With schedule (for
+    example root.after) jobs start and deliver on the thread that made the
+    requests; without it requests start at once when nothing is running and
+    results are delivered from the worker thread.
+    """
+
+    poll_interval = 15  # ms between completion checks when scheduled
+
+    def __init__(self, scan, recheck, deliver=None, schedule=None, coalesce_ms=50):
+        self.scan = scan
+        self.recheck = recheck
+        self.deliver = deliver
+        self.schedule = schedule
+        self.coalesce_ms = coalesce_ms
+        self.requested = 0  # requests made
+        self.scans = 0  # full scans run
+        self.rechecks = 0  # re-checks run
+        self.rechecked_windows = 0  # windows the re-checks described
+        self._full = False  # a pending request asked for a full scan
+        self._hwnds = set()  # windows pending requests asked to re-check
+        self._pending = False
+        self._timer = False  # a coalescing timer is scheduled
+        self._running = None  # Future of the job in flight
+
+    def request(self, hwnds=None):
+        """Ask for a re-check of hwnds, or for a full scan when hwnds is None"""
+        self.requested += 1
+        if hwnds is None:
+            self._full = True
+        else:
+            self._hwnds.update(hwnds)
+        self._pending = True
+        if self.schedule is None:
+            if self._running is None:
+                self._start()
+        elif not self._timer:
+            self._timer = True
+            self.schedule(self.coalesce_ms, self._fire)
+
+    def idle(self):
+        """Return True when no job is running or waiting to run"""
+        return self._running is None and not self._pending
+
+    def wait(self, timeout=None):
+        """Run every pending job now and deliver it, blocking until all are done"""
+        while True:
+            future = self._running
+            if future is None:
+                future = self._start(watch=False)
+                if future is None:
+                    return
+            wait_futures([future], timeout)
+            if not future.done():
+                return
+            self._done(future)
+
+    def stats(self):
+        """Return the request and job counters as a dict"""
+        return {
+            "requested": self.requested,
+            "scans": self.scans,
+            "rechecks": self.rechecks,
+            "rechecked_windows": self.rechecked_windows,
+            "coalesced": self.requested - self.scans - self.rechecks,
+        }
+
+    def _fire(self):
+        self._timer = False
+        if self._running is None:
+            self._start()
+
+    def _start(self, watch=True):
+        """Start the merged pending job; returns its Future, or None when idle"""
+        if not self._pending:
+            return None
+        full, hwnds = self._full, self._hwnds
+        self._full, self._hwnds, self._pending = False, set(), False
+        if full:
+            self.scans += 1
+            future = self.scan()
+        else:
+            self.rechecks += 1
+            self.rechecked_windows += len(hwnds)
+            future = self.recheck(hwnds)
+        self._running = future
+        if watch:
+            if self.schedule is not None:
+                self.schedule(self.poll_interval, lambda: self._poll(future))
+            else:
+                future.add_done_callback(self._done)
+        return future
+
+    def _poll(self, future):
+        if not future.done():
+            self.schedule(self.poll_interval, lambda: self._poll(future))
+            return
+        self._done(future)
+
+    def _done(self, future):
+        # wait() may already have delivered this job
+        if self._running is not future:
+            return
+        self._running = None
+        if future.cancelled():
+            result = None
+        elif future.exception() is not None:
+            log.error("Error refreshing windows", exc_info=future.exception())
+            result = None
+        else:
+            result = future.result()
+        if result is not None and self.deliver is not None:
+            self.deliver(result)
+        # Requests made while the job ran have waited long enough
+        if self._pending:
+            self._start()
@@ -0,0 +1,206 @@
+"""
+Process resource sampling.
+
+The list can show how much CPU, memory and how many threads each window's
+process uses. Reading them for every window on every refresh would repeat
+the same work for every window of a browser, so ResourceSampler samples
+each process once, on its own thread, reading all three figures inside one
+psutil oneshot() block. It slows down as the number of processes grows so
+its own CPU use stays within a budget, and hands back only the processes
+whose figures changed.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+# cpu is the percent of one CPU used since the previous sample (None on the
+# first) and memory the resident set in MB, both rounded to what the list
+# shows so a sample only counts as changed when a cell would; fields are
+# None when access is denied
+ResourceSample = namedtuple("ResourceSample", ["pid", "cpu", "memory", "threads"])
+
+MB = 1024 * 1024
+
+
+class ResourceSampler:
+    """Sample CPU, memory and thread count of a set of processes
+
+    set_pids() sets the processes to sample, normally the PIDs of the listed
+    windows, so a process with many windows is sampled once. A background
+    thread started by start() samples them all every interval seconds. The
+    interval adapts to the work: after each pass it becomes the CPU time the
+    pass took divided by budget (a fraction of one CPU), kept between
+    min_interval and max_interval. Samples that differ from the last ones
+    handed out are queued, and flush() passes them to deliver(changed, gone)
+    as {pid: ResourceSample} and the PIDs that exited. When schedule (for
+    example root.after) is given, flush runs on the thread that called
+    start().
+    """
+
+    poll_interval = 250  # ms between flushes when scheduled
+
+    def __init__(
+        self,
+        deliver=None,
+        schedule=None,
+        min_interval=1.0,
+        max_interval=10.0,
+        budget=0.01,
+        psutil_module=None,
+    ):
+        if psutil_module is None:
+            import psutil as psutil_module
+        self._psutil = psutil_module
+        self.deliver = deliver
+        self.schedule = schedule
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget = budget
+        self.interval = min_interval
+        self.samples = {}  # pid -> last ResourceSample handed out
+        self.passes = 0
+        self.cpu_time = 0.0  # CPU seconds the sampling passes took
+        self._pids = frozenset()
+        self._processes = {}  # pid -> psutil.Process; cpu_percent needs the same object
+        self._changed = {}
+        self._gone = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._started = None
+
+    def set_pids(self, pids):
+        """Sample exactly these processes from the next pass on"""
+        self._pids = frozenset(pids)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._started = time.perf_counter()
+        self._wake.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="resource-sampler", daemon=True
+        )
+        self._thread.start()
+        if self.schedule is not None:
+            self.schedule(self.poll_interval, self._tick)
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def sample_once(self):
+        """Run one sampling pass now; returns (changed, gone) as queued for flush"""
+        started = time.thread_time()
+        pids = self._pids
+        processes = self._processes
+        changed = {}
+
+        for pid in list(processes):
+            if pid not in pids:
+                del processes[pid]
+        gone = [pid for pid in self.samples if pid not in pids]
+        for pid in pids:
+            sample = self._sample(pid)
+            if sample is None:
+                if pid in self.samples:
+                    gone.append(pid)
+            elif self.samples.get(pid) != sample:
+                changed[pid] = sample
+
+        with self._lock:
+            for pid in gone:
+                self.samples.pop(pid, None)
+                self._changed.pop(pid, None)
+                self._gone.add(pid)
+            self.samples.update(changed)
+            self._changed.update(changed)
+            self._gone.difference_update(changed)
+
+        cost = time.thread_time() - started
+        self.cpu_time += cost
+        self.passes += 1
+        self.interval = min(
+            self.max_interval, max(self.min_interval, cost / self.budget)
+        )
+        return changed, gone
+
+    def _sample(self, pid):
+        """Return the ResourceSample of a process, or None if it is gone"""
+        psutil = self._psutil
+        process = self._processes.get(pid)
+        try:
+            if process is None:
+                process = self._processes[pid] = psutil.Process(pid)
+                first = True
+            else:
+                first = False
+            with process.oneshot():
+                cpu = _read(psutil, process.cpu_percent)
+                memory = _read(psutil, process.memory_info)
+                threads = _read(psutil, process.num_threads)
+        except psutil.NoSuchProcess:
+            self._processes.pop(pid, None)
+            return None
+        # The first cpu_percent() call only sets the starting point
+        return ResourceSample(
+            pid,
+            None if first or cpu is None else round(cpu, 1),
+            round(memory.rss / MB, 1) if memory is not None else None,
+            threads,
+        )
+
+    def flush(self):
+        """Deliver the samples that changed since the previous flush"""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+            gone, self._gone = self._gone, set()
+        if (changed or gone) and self.deliver is not None:
+            self.deliver(changed, gone)
+        return changed, gone
+
+    def overhead(self):
+        """Return the sampler's CPU use since start() as a percent of one CPU"""
+        if self._started is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._started
+        return self.cpu_time / elapsed * 100 if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "processes": len(self._pids),
+            "passes": self.passes,
+            "interval": self.interval,
+            "cpu_time": self.cpu_time,
+            "overhead_percent": self.overhead(),
+        }
+
+    def _run(self):
+        while self._running:
+            try:
+                self.sample_once()
+            except Exception:
+                log.exception("Error sampling process resources")
+            self._wake.wait(self.interval)
+
+    def _tick(self):
+        if not self._running:
+            return
+        self.flush()
+        self.schedule(self.poll_interval, self._tick)
+
+
+def _read(psutil, method):
+    try:
+        return method()
+    except psutil.AccessDenied:
+        return None
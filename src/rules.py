@@ -0,0 +1,368 @@
+"""
+Auto-hide rules.
+
+Rules are loaded from rules.json in the settings directory, for example:
+
+    {"rules": [
+        {"name": "Chat", "process": "slack.exe", "action": "hide"},
+        {"title": "*Zoom Meeting*", "action": "hide"},
+        {"exe": "C:\\\\Tools\\\\*", "visible": "hidden", "action": "show"},
+        {"process": "notepad.exe", "title_regex": "^Untitled - ", "action": "close"}
+    ]}
+
+process, exe and title are case-insensitive globs, title_regex is a
+case-insensitive regular expression searched anywhere in the title, and
+visible is "visible" or "hidden". A window must satisfy every condition of a
+rule; the first rule in file order that matches decides the action.
+
+RuleSet compiles the rules once so matching cost stays flat as the list grows:
+rules naming an exact process or exe are bucketed in hash tables. Within a
+bucket, title conditions with a fixed part are indexed (exact titles by
+title, literal prefixes by prefix, other globs by a trigram of their longest
+literal part), so only the rules a title can match are checked. The remaining
+title regexes are joined into a single regex whose named groups tell which
+of them matched first.
+"""
+
+import fnmatch
+import re
+from collections import Counter, namedtuple
+
+from .config import config_path, load_json
+
+ACTIONS = ("hide", "show", "close")
+VISIBILITY = ("visible", "hidden")
+RULE_FIELDS = ("name", "action", "process", "exe", "title", "title_regex", "visible")
+RULES_FILE = "rules.json"
+
+# index is the rule's position in the file; earlier rules take precedence
+Rule = namedtuple("Rule", ("index",) + RULE_FIELDS)
+
+# A window and the rule that matched it
+RuleMatch = namedtuple("RuleMatch", ["hwnd", "action", "rule"])
+
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+# One literal character of a regex: plain ASCII or escaped ASCII punctuation
+_REGEX_LITERAL = re.compile(r"[A-Za-z0-9 !\"#%&',/:;<=>@_`~-]|\\[ -/:-@\[-`{-~]")
+_QUANTIFIERS = "*+?{"
+
+# Characters that match an ASCII letter case-insensitively but do not lower()
+# to it; folding them first lets the index compare lowered ASCII text
+_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+_ASCII_RUN = re.compile(r"[\x00-\x7f]+")
+
+
+class RuleError(ValueError):
+    """Raised for a malformed rule"""
+
+
+def _is_glob(pattern):
+    return any(char in pattern for char in "*?[")
+
+
+def _glob_regex(pattern):
+    return fnmatch.translate(pattern.lower())
+
+
+def _title_regex(rule):
+    """Return a full-match regex source for a rule's title_regex"""
+    # An anchored pattern without alternatives need not be tried at every
+    # position, which keeps long alternations of them cheap
+    if rule.title_regex.startswith("^") and "|" not in rule.title_regex:
+        return "(?:(?:{}).*)".format(rule.title_regex)
+    return "(?:.*?(?:{}).*)".format(rule.title_regex)
+
+
+def _fold(title):
+    return title.translate(_FOLD).lower()
+
+
+def _trigrams(text):
+    return {text[start : start + 3] for start in range(len(text) - 2)}
+
+
+def _regex_prefix(pattern):
+    """Return the lowered literal text an anchored regex starts with"""
+    position = 1
+    chars = []
+    while True:
+        literal = _REGEX_LITERAL.match(pattern, position)
+        if literal is None:
+            break
+        chars.append(literal.group()[-1])
+        position = literal.end()
+    if chars and pattern[position : position + 1] in tuple(_QUANTIFIERS):
+        # The last character is quantified, so it may be missing
+        chars.pop()
+    return "".join(chars).lower()
+
+
+def _title_key(rule):
+    """Return how a rule's title is indexed: (kind, key), or None if it is not
+
+    kind is "exact" for a title without wildcards, "prefix" for the literal
+    text every matching title starts with and "trigram" for a glob whose
+    longest literal part every matching title contains.
+    """
+    if rule.title:
+        pattern = rule.title.lower()
+        if not _is_glob(pattern):
+            return "exact", pattern
+        # Bracket expressions have their own escaping rules; stop at the first
+        parts = re.split(r"[*?]", pattern.split("[", 1)[0])
+        leading = _ASCII_RUN.match(parts[0])
+        prefix = leading.group() if leading else ""
+        longest = max(
+            (run for part in parts for run in _ASCII_RUN.findall(part)),
+            key=len,
+            default="",
+        )
+        if len(prefix) >= 3 or (prefix and len(longest) < 3):
+            return "prefix", prefix
+        if len(longest) >= 3:
+            return "trigram", longest
+        return None
+    if rule.title_regex and rule.title_regex.startswith("^"):
+        if "|" in rule.title_regex:
+            return None
+        prefix = _regex_prefix(rule.title_regex)
+        return ("prefix", prefix) if prefix else None
+    return None
+
+
+def parse_rules(data):
+    """Validate rule dicts (as loaded from JSON) and return a list of Rules"""
+    if not isinstance(data, list):
+        raise RuleError("rules must be a list")
+    rules = []
+    for index, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            raise RuleError(f"rule {index + 1}: expected an object")
+        unknown = set(entry) - set(RULE_FIELDS)
+        if unknown:
+            raise RuleError(
+                f"rule {index + 1}: unknown field(s) {', '.join(sorted(unknown))}"
+            )
+        for field in RULE_FIELDS:
+            if entry.get(field) is not None and not isinstance(entry[field], str):
+                raise RuleError(f"rule {index + 1}: {field} must be a string")
+        action = entry.get("action")
+        if action not in ACTIONS:
+            raise RuleError(
+                f"rule {index + 1}: action must be one of {', '.join(ACTIONS)}"
+            )
+        visible = entry.get("visible")
+        if visible is not None and visible.lower() not in VISIBILITY:
+            raise RuleError(f'rule {index + 1}: visible must be "visible" or "hidden"')
+        if entry.get("title_regex"):
+            try:
+                re.compile(entry["title_regex"])
+            except re.error as e:
+                raise RuleError(f"rule {index + 1}: bad title_regex: {e}")
+        rules.append(
+            Rule(
+                index=index,
+                name=entry.get("name") or f"rule {index + 1}",
+                action=action,
+                process=(entry.get("process") or "").lower() or None,
+                exe=(entry.get("exe") or "").lower() or None,
+                title=entry.get("title") or None,
+                title_regex=entry.get("title_regex") or None,
+                visible=visible.lower() if visible else None,
+            )
+        )
+    return rules
+
+
+def load_rules(path=None):
+    """Load the rules file; a missing file gives an empty RuleSet"""
+    path = path if path is not None else config_path(RULES_FILE)
+    data = load_json(path, None)
+    if data is None:
+        return RuleSet([])
+    if not isinstance(data, dict):
+        raise RuleError(f'{RULES_FILE}: expected an object with a "rules" list')
+    return RuleSet(parse_rules(data.get("rules", [])))
+
+
+class _Bucket:
+    """Rules sharing a dispatch key, with their title checks indexed or combined"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.titles = None
+        self.checks = []
+        self.exact = {}  # lowered title -> positions of the rules naming it
+        self.prefixes = {}  # prefix length -> {folded prefix -> positions}
+        self.literals = []  # (folded literal, position) of the other globs
+        self.trigrams = {}  # folded trigram -> positions of the globs containing it
+        self.always = []  # positions of the rules any title may match
+        self.searched = []  # positions of the title regexes combined in titles
+        for position, rule in enumerate(rules):
+            self.checks.append(
+                (
+                    re.compile(_glob_regex(rule.process)) if rule.process else None,
+                    re.compile(_glob_regex(rule.exe)) if rule.exe else None,
+                    re.compile(_glob_regex(rule.title)) if rule.title else None,
+                    (
+                        re.compile(rule.title_regex, re.IGNORECASE)
+                        if rule.title_regex
+                        else None
+                    ),
+                )
+            )
+            key = _title_key(rule)
+            if key is None and rule.title_regex and not rule.title:
+                self.searched.append(position)
+            elif key is None:
+                self.always.append(position)
+            elif key[0] == "exact":
+                self.exact.setdefault(key[1], []).append(position)
+            elif key[0] == "prefix":
+                prefixes = self.prefixes.setdefault(len(key[1]), {})
+                prefixes.setdefault(key[1], []).append(position)
+            else:
+                self.literals.append((key[1], position))
+
+        # Index each glob by the trigram of its literal that the fewest other
+        # literals share, so a title pulls in few candidates
+        shared = Counter(
+            trigram for literal, _ in self.literals for trigram in _trigrams(literal)
+        )
+        for literal, position in self.literals:
+            trigram = min(sorted(_trigrams(literal)), key=shared.__getitem__)
+            self.trigrams.setdefault(trigram, []).append(position)
+
+        # Patterns with backreferences would be renumbered by the join;
+        # such buckets are checked rule by rule instead
+        searched = [rules[position] for position in self.searched]
+        if searched and not any(
+            _BACKREFERENCE.search(rule.title_regex) for rule in searched
+        ):
+            combined = "|".join(
+                "(?P<_rule{}>{})".format(offset, _title_regex(rule))
+                for offset, rule in enumerate(searched)
+            )
+            try:
+                self.titles = re.compile(combined, re.IGNORECASE | re.DOTALL)
+            except re.error:
+                self.titles = None
+
+    def _candidates(self, title):
+        """Return the positions of the rules whose title conditions may match"""
+        lowered = title.lower()
+        positions = list(self.exact.get(lowered, ()))
+        if self.prefixes or self.literals:
+            folded = lowered if lowered.isascii() else _fold(title)
+            for length, prefixes in self.prefixes.items():
+                positions += prefixes.get(folded[:length], ())
+            if len(self.literals) <= len(folded):
+                # Fewer globs than trigrams in the title: test their literals
+                positions += [
+                    position for literal, position in self.literals if literal in folded
+                ]
+            else:
+                for start in range(len(folded) - 2):
+                    positions += self.trigrams.get(folded[start : start + 3], ())
+        positions += self.always
+        if self.searched:
+            if self.titles is None:
+                positions += self.searched
+            else:
+                found = self.titles.fullmatch(title)
+                if found is not None:
+                    # Alternatives are tried in order, so this is the first
+                    # searched rule whose title matches; later ones are only
+                    # checked if it fails elsewhere
+                    positions += self.searched[int(found.lastgroup[len("_rule") :]) :]
+        return sorted(set(positions))
+
+    def first_match(self, window, exe, limit):
+        """Return the first rule in the bucket matching a window, if before limit"""
+        for position in self._candidates(window.title):
+            rule = self.rules[position]
+            if rule.index >= limit:
+                return None
+            if self._check(position, window, exe):
+                return rule
+        return None
+
+    def _check(self, position, window, exe):
+        rule = self.rules[position]
+        process, exe_pattern, title, title_regex = self.checks[position]
+        if rule.visible is not None and window.visible.lower() != rule.visible:
+            return False
+        if process is not None and not process.match(window.process.lower()):
+            return False
+        if title is not None and not title.match(window.title.lower()):
+            return False
+        if title_regex is not None and not title_regex.search(window.title):
+            return False
+        if exe_pattern is not None and not exe_pattern.match(exe(window).lower()):
+            return False
+        return True
+
+
+class RuleSet:
+    """Rules compiled for fast matching against WindowRecords"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        by_process = {}
+        by_exe = {}
+        wildcard = []
+        for rule in self.rules:
+            if rule.process and not _is_glob(rule.process):
+                by_process.setdefault(rule.process, []).append(rule)
+            elif rule.exe and not _is_glob(rule.exe):
+                by_exe.setdefault(rule.exe, []).append(rule)
+            else:
+                wildcard.append(rule)
+        self._by_process = {key: _Bucket(rules) for key, rules in by_process.items()}
+        self._by_exe = {key: _Bucket(rules) for key, rules in by_exe.items()}
+        self._wildcard = _Bucket(wildcard) if wildcard else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, window, get_exe=None):
+        """Return the first Rule matching a window, or None
+
+        get_exe(pid) supplies the executable path; it is only called when a
+        candidate rule has an exe condition.
+        """
+        exe_cache = []
+
+        def exe(window):
+            if not exe_cache:
+                exe_cache.append(get_exe(window.pid) if get_exe is not None else "")
+            return exe_cache[0] or ""
+
+        best = None
+        limit = len(self.rules)
+        buckets = [self._by_process.get(window.process.lower()), self._wildcard]
+        for bucket in buckets:
+            if bucket is not None:
+                rule = bucket.first_match(window, exe, limit)
+                if rule is not None:
+                    best, limit = rule, rule.index
+
+        if self._by_exe:
+            bucket = self._by_exe.get(exe(window).lower())
+            if bucket is not None:
+                rule = bucket.first_match(window, exe, limit)
+                if rule is not None:
+                    best = rule
+        return best
+
+    def match_all(self, windows, get_exe=None):
+        """Return a RuleMatch for every window that matches a rule"""
+        matches = []
+        if not self.rules:
+            return matches
+        for window in windows:
+            rule = self.match(window, get_exe)
+            if rule is not None:
+                matches.append(RuleMatch(window.hwnd, rule.action, rule))
+        return matches
@@ -0,0 +1,147 @@
+"""
+Window search index.
+
+SearchIndex answers case-insensitive substring queries over the titles and
+process names of the listed windows without rescanning all of them. Every
+window's text is split into trigrams, and each trigram maps to the windows
+containing it; a query only has to check the windows that contain all of its
+trigrams. The index is updated incrementally as windows appear, change and
+disappear, and results are reused while a query is being typed: the matches
+for "chrom" are found among the matches for "chro".
+"""
+
+import threading
+
+GRAM = 3
+MAX_CACHED_TERMS = 64
+SEPARATOR = "\0"  # joins the fields; typed queries never contain it
+
+
+def _grams(text):
+    return {text[start : start + GRAM] for start in range(len(text) - GRAM + 1)}
+
+
+class SearchIndex:
+    """Trigram index of searchable text by key
+
+    The fields of a record are joined with a separator no query contains, so
+    a query never matches across the end of one field and the start of the
+    next. Whitespace separates query terms, and a record matches when every
+    term is found in one of its fields.
+    """
+
+    def __init__(self, fields=("title", "process"), key="hwnd"):
+        self.fields = fields
+        self.key = key
+        self.texts = {}  # key -> lowercased fields joined by SEPARATOR
+        self.postings = {}  # trigram -> set of keys
+        self._cache = {}  # term -> matching keys, valid until the index changes
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def sync(self, records):
+        """Make the index hold exactly these records; returns the number re-indexed"""
+        with self._lock:
+            seen = set()
+            changed = 0
+            for record in records:
+                key = getattr(record, self.key)
+                seen.add(key)
+                changed += self._put(key, record)
+            for key in [key for key in self.texts if key not in seen]:
+                self._drop(key)
+                changed += 1
+            if changed:
+                self._cache.clear()
+            return changed
+
+    def update(self, changed=(), removed=()):
+        """Index added or changed records and forget removed keys"""
+        with self._lock:
+            touched = 0
+            for key in removed:
+                if key in self.texts:
+                    self._drop(key)
+                    touched += 1
+            for record in changed:
+                touched += self._put(getattr(record, self.key), record)
+            if touched:
+                self._cache.clear()
+
+    def _put(self, key, record):
+        text = SEPARATOR.join(
+            str(getattr(record, field)) for field in self.fields
+        ).lower()
+        old = self.texts.get(key)
+        if old == text:
+            return 0
+        old_grams = _grams(old) if old is not None else set()
+        new_grams = _grams(text)
+        for gram in old_grams - new_grams:
+            self._unpost(gram, key)
+        for gram in new_grams - old_grams:
+            self.postings.setdefault(gram, set()).add(key)
+        self.texts[key] = text
+        return 1
+
+    def _drop(self, key):
+        for gram in _grams(self.texts.pop(key)):
+            self._unpost(gram, key)
+
+    def _unpost(self, gram, key):
+        keys = self.postings[gram]
+        keys.discard(key)
+        if not keys:
+            del self.postings[gram]
+
+    def search(self, query):
+        """Return the set of keys matching every whitespace-separated term"""
+        with self._lock:
+            result = None
+            for term in sorted(set(query.lower().split()), key=len, reverse=True):
+                if result is not None and len(term) < GRAM and term not in self._cache:
+                    # A short term narrows the matches so far more cheaply than
+                    # it could be looked up on its own
+                    texts = self.texts
+                    result = {key for key in result if term in texts[key]}
+                else:
+                    matches = self._search_term(term)
+                    result = matches if result is None else result & matches
+                if not result:
+                    break
+            return set(self.texts) if result is None else set(result)
+
+    def _search_term(self, term):
+        cached = self._cache.get(term)
+        if cached is not None:
+            return cached
+
+        # Typing extends the previous term, so start from the smallest cached
+        # result for a term contained in this one
+        candidates = None
+        for previous, keys in self._cache.items():
+            if previous in term and (candidates is None or len(keys) < len(candidates)):
+                candidates = keys
+
+        if len(term) >= GRAM:
+            for gram in sorted(
+                _grams(term), key=lambda gram: len(self.postings.get(gram, ()))
+            ):
+                keys = self.postings.get(gram)
+                if not keys:
+                    candidates = set()
+                    break
+                candidates = keys if candidates is None else candidates & keys
+                if len(candidates) < 32:
+                    break  # few enough to check directly
+        if candidates is None:
+            candidates = self.texts
+
+        texts = self.texts
+        matches = {key for key in candidates if term in texts[key]}
+        if len(self._cache) >= MAX_CACHED_TERMS:
+            self._cache.clear()
+        self._cache[term] = matches
+        return matches
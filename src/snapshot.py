@@ -0,0 +1,333 @@
+"""
+Window snapshots.
+
+Enumerating windows and looking up their processes is slow enough to freeze
+the GUI, so scans run on a background thread through SnapshotWorker. Only the
+finished snapshot is handed back to the Tk loop.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from .backends import (
+    GWL_EXSTYLE,
+    GWL_STYLE,
+    WS_DISABLED,
+    WS_EX_LAYERED,
+    WS_EX_TOOLWINDOW,
+    WS_VISIBLE,
+)
+from .instrumentation import metrics
+from .records import (
+    FLAG_DISABLED,
+    FLAG_LAYERED,
+    FLAG_TOOL_WINDOW,
+    FLAG_VISIBLE,
+    WindowRecord,
+)
+
+log = logging.getLogger(__name__)
+
+# A finished scan: generation orders snapshots, elapsed is the scan time in
+# seconds, matches holds the RuleMatches of the worker's auto-hide rules and
+# native_calls the backend calls the scan made (None if the backend does not
+# count them)
+Snapshot = namedtuple(
+    "Snapshot",
+    ["generation", "windows", "elapsed", "matches", "native_calls"],
+    defaults=((), None),
+)
+
+# A finished re-check of some windows: hwnds are the windows checked and
+# windows the WindowRecords of those still listed; the others left the list
+Recheck = namedtuple("Recheck", ["hwnds", "windows", "elapsed", "native_calls"])
+
+
+def is_alt_tab_window(backend, hwnd, hidden_windows=()):
+    """Check if a window would appear in the Alt+Tab dialog"""
+    state = _alt_tab_state(backend, hwnd, hidden_windows)
+    return state is not None and state[0]
+
+
+def _alt_tab_state(backend, hwnd, hidden_windows, enumerated=False):
+    """Run the Alt+Tab checks on a top-level window, cheapest rejection first
+
+    Returns (listed, visible, style, ex_style, title), or None as soon as a
+    check rejects the window. Windows in hidden_windows are listed whether
+    or not they pass, so for them everything is read; nothing is ever read
+    twice. enumerated=True skips IsWindow for handles EnumWindows just
+    returned.
+    """
+    hidden = hwnd in hidden_windows
+    if not enumerated and not backend.is_window(hwnd):
+        return None
+
+    # One read answers visibility and the disabled check, and rejects the
+    # invisible helper windows that make up most of the desktop; for a
+    # top-level window IsWindowVisible is exactly its WS_VISIBLE bit
+    style = backend.get_window_long(hwnd, GWL_STYLE)
+    visible = bool(style & WS_VISIBLE)
+    listed = not style & WS_DISABLED
+    if not hidden and not (visible and listed):
+        return None
+
+    # Exclude tool windows
+    ex_style = backend.get_window_long(hwnd, GWL_EXSTYLE)
+    if (ex_style & WS_EX_TOOLWINDOW) != 0 and not hidden:
+        return None
+
+    # Make sure it's not a child window
+    if not hidden and backend.get_parent(hwnd) != 0:
+        return None
+
+    # Check if window has a title; the text is read last because getting it
+    # can mean a message round trip to the window's thread
+    title = backend.get_window_text(hwnd)
+    if not title and not hidden:
+        return None
+
+    return listed, visible, style, ex_style, title
+
+
+def get_process_name_from_hwnd(backend, hwnd):
+    """Get process name and PID from window handle"""
+    try:
+        with metrics.timer("process_lookup"):
+            pid = backend.get_window_pid(hwnd)
+            return backend.get_process_name(pid), pid
+    except Exception as e:
+        log.debug("Error getting process of window %s: %s", hwnd, e)
+        return "Unknown", 0
+
+
+def describe_window(backend, hwnd, hidden_windows=(), enumerated=False):
+    """Return the WindowRecord for a window to list, or None to skip it"""
+    state = _alt_tab_state(backend, hwnd, hidden_windows, enumerated)
+    if state is None:
+        return None
+    return _window_record(backend, hwnd, state)
+
+
+def _window_record(backend, hwnd, state):
+    """Build the WindowRecord for a window from what the Alt+Tab checks read"""
+    _, visible, style, ex_style, title = state
+    proc_name, pid = get_process_name_from_hwnd(backend, hwnd)
+
+    flags = FLAG_VISIBLE if visible else 0
+    if style & WS_DISABLED:
+        flags |= FLAG_DISABLED
+    if ex_style & WS_EX_TOOLWINDOW:
+        flags |= FLAG_TOOL_WINDOW
+    if ex_style & WS_EX_LAYERED:
+        flags |= FLAG_LAYERED
+    return WindowRecord(hwnd, title, proc_name, pid, flags)
+
+
+def scan_windows(backend, hidden_windows=(), cancelled=None):
+    """Enumerate the windows to list, in z-order
+
+    Returns a list of WindowRecords, or None if cancelled() became true
+    part-way through the scan.
+    """
+    if metrics.enabled:
+        return _scan_windows_timed(backend, hidden_windows, cancelled)
+    windows = []
+
+    for hwnd in backend.enum_windows():
+        if cancelled is not None and cancelled():
+            return None
+
+        window = describe_window(backend, hwnd, hidden_windows, enumerated=True)
+        if window is not None:
+            windows.append(window)
+
+    return windows
+
+
+def _scan_windows_timed(backend, hidden_windows, cancelled):
+    """scan_windows that records the time each phase of the scan took"""
+    clock = time.perf_counter
+    started = clock()
+    hwnds = backend.enum_windows()
+    enumerated = clock()
+    filtering = describing = 0.0
+    windows = []
+
+    for hwnd in hwnds:
+        if cancelled is not None and cancelled():
+            return None
+
+        mark = clock()
+        state = _alt_tab_state(backend, hwnd, hidden_windows, enumerated=True)
+        checked = clock()
+        filtering += checked - mark
+        if state is not None:
+            windows.append(_window_record(backend, hwnd, state))
+            describing += clock() - checked
+
+    metrics.record("scan.enumerate", enumerated - started)
+    metrics.record("scan.filter", filtering)
+    metrics.record("scan.describe", describing)
+    return windows
+
+
+class SnapshotWorker:
+    """Build window snapshots on a background thread
+
+    request() starts a new scan and supersedes any scan still in flight; the
+    stale scan stops at the next window and its result is dropped. Finished
+    snapshots are passed to deliver(snapshot). When schedule is given (for
+    example root.after) the worker polls for completion through it, so deliver
+    runs on the thread that called request(); without it deliver is called from
+    the worker thread. When rules (a RuleSet) is set, every scanned window is
+    also matched against it on the worker thread, and a search_index
+    (SearchIndex) is synced with every scan there as well.
+    """
+
+    poll_interval = 15  # ms between completion checks when scheduled
+
+    def __init__(
+        self, backend, deliver=None, schedule=None, rules=None, search_index=None
+    ):
+        self.backend = backend
+        self.deliver = deliver
+        self.schedule = schedule
+        self.rules = rules
+        self.search_index = search_index
+        self.latest = None  # Most recent snapshot that completed
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = None
+
+    def request(self, hidden_windows=()):
+        """Start a scan and return a Future for its snapshot
+
+        The future resolves to None if the scan is superseded before finishing.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._pending is not None:
+                self._pending.cancel()
+            future = self._executor.submit(
+                self._scan, generation, frozenset(hidden_windows)
+            )
+            self._pending = future
+
+        if self.schedule is not None:
+            self.schedule(self.poll_interval, lambda: self._poll(future))
+        else:
+            future.add_done_callback(self._finish)
+        return future
+
+    def recheck(self, hwnds, hidden_windows=()):
+        """Describe just the given windows again and return a Future for the Recheck
+
+        Re-checks run on the scan thread, so they never overlap a scan, and
+        they do not supersede the scan in flight.
+        """
+        return self._executor.submit(
+            self._recheck, tuple(hwnds), frozenset(hidden_windows)
+        )
+
+    def submit(self, function, *args):
+        """Run function(*args) on the scan thread and return a Future for its result
+
+        Like re-checks, calls never overlap a scan and do not supersede it.
+        """
+        return self._executor.submit(function, *args)
+
+    def wait(self, timeout=None):
+        """Block until the latest requested scan finishes and return its snapshot"""
+        while True:
+            future = self._pending
+            if future is None:
+                return self.latest
+            try:
+                snapshot = future.result(timeout)
+            except CancelledError:
+                snapshot = None
+            if future is self._pending:
+                return snapshot
+
+    def shutdown(self):
+        """Cancel outstanding scans and stop the worker thread"""
+        with self._lock:
+            self._generation += 1
+            if self._pending is not None:
+                self._pending.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _scan(self, generation, hidden_windows):
+        def cancelled():
+            return generation != self._generation
+
+        started = time.perf_counter()
+        # Scans run on this one worker thread, so the per-thread count is the scan's
+        calls_before = self.backend.native_calls()
+        windows = scan_windows(self.backend, hidden_windows, cancelled)
+        if windows is None:
+            return None
+        native_calls = (
+            self.backend.native_calls() - calls_before
+            if calls_before is not None
+            else None
+        )
+        matches = ()
+        if self.rules:
+            with metrics.timer("scan.rules"):
+                matches = self.rules.match_all(windows, self.get_exe)
+        # A superseded scan must not leave the filter index describing its list
+        if self.search_index is not None and not cancelled():
+            with metrics.timer("scan.search_index"):
+                self.search_index.sync(windows)
+        snapshot = Snapshot(
+            generation, windows, time.perf_counter() - started, matches, native_calls
+        )
+        metrics.record("scan", snapshot.elapsed)
+        if generation == self._generation:
+            self.latest = snapshot
+        return snapshot
+
+    def _recheck(self, hwnds, hidden_windows):
+        started = time.perf_counter()
+        calls_before = self.backend.native_calls()
+        windows = []
+        for hwnd in hwnds:
+            window = describe_window(self.backend, hwnd, hidden_windows)
+            if window is not None:
+                windows.append(window)
+        native_calls = (
+            self.backend.native_calls() - calls_before
+            if calls_before is not None
+            else None
+        )
+        recheck = Recheck(hwnds, windows, time.perf_counter() - started, native_calls)
+        metrics.record("recheck", recheck.elapsed)
+        return recheck
+
+    def get_exe(self, pid):
+        """Return the executable path of a process, for exe rules"""
+        return self.backend.get_process_info(pid).exe
+
+    def _poll(self, future):
+        if not future.done():
+            self.schedule(self.poll_interval, lambda: self._poll(future))
+            return
+        self._finish(future)
+
+    def _finish(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            log.error("Error scanning windows", exc_info=future.exception())
+            return
+        snapshot = future.result()
+        if snapshot is None or snapshot.generation != self._generation:
+            return
+        if self.deliver is not None:
+            self.deliver(snapshot)
@@ -1,425 +1,1194 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import win32gui
-import win32con
-import win32process
-import psutil
-import ctypes
-import traceback
+from tkinter import ttk, messagebox, simpledialog
+import logging
 import os
-import time
+import sys
+from operator import attrgetter
+
+if __name__ == "__main__" and not __package__:
+    # Running as a script (python src/taskbar_manager.py): enable package imports
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "src"
+
+# Only light modules are imported here so the window can paint quickly; the
+# window system backend, the workers and pywin32/psutil load in finish_startup
+from .instrumentation import metrics, setup_logging
+from .records import WindowTable
+from .search_index import SearchIndex
+from .virtual_list import VirtualList
+
+# Phases summarized in the debug panel; the JSON export has all of them
+DEBUG_PHASES = (
+    "scan",
+    "scan.enumerate",
+    "scan.filter",
+    "scan.describe",
+    "list.update",
+    "bulk.hide",
+    "bulk.show",
+    "bulk.arrange",
+)
+
+# Columns shown always, and the per-process columns the resource sampler fills
+WINDOW_COLUMNS = ("title", "process", "pid", "visible")
+RESOURCE_COLUMNS = ("cpu", "memory", "threads")
+
+log = logging.getLogger(__name__)
+
+_admin = None
+
 
 # Check if running as admin
 def is_admin():
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin() != 0
-    except:
-        return False
+    global _admin
+    if _admin is None:
+        # The answer cannot change while we run, so ask Windows only once
+        try:
+            import ctypes
+
+            _admin = ctypes.windll.shell32.IsUserAnAdmin() != 0
+        except Exception:
+            _admin = False
+    return _admin
+
 
 class TaskbarManager:
-    def __init__(self, root):
+    def __init__(self, root, backend=None, admin_warning=True):
         self.root = root
+        self.backend = backend
+        self.admin_warning = admin_warning
         self.root.title("Taskbar Manager")
         self.root.geometry("800x500")
         self.root.resizable(True, True)
-        
+
+        # Filter box: narrows the list to windows whose title or process name
+        # contains every typed word
+        filter_frame = ttk.Frame(root)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var)
+        self.filter_entry.pack(fill=tk.X, expand=True, side=tk.LEFT, padx=5)
+        self.filter_var.trace_add("write", lambda *args: self.apply_filter())
+        # Enter selects every match, so the buttons act on the whole filtered set
+        self.filter_entry.bind("<Return>", lambda event: self.window_list.select_all())
+        self.filter_entry.bind("<Escape>", lambda event: self.filter_var.set(""))
+
         # Create main frame
         main_frame = ttk.Frame(root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Create treeview for displaying applications
-        self.tree = ttk.Treeview(main_frame, columns=("title", "process", "pid", "visible"), show="headings")
-        self.tree.heading("title", text="Window Title")
-        self.tree.heading("process", text="Process Name")
-        self.tree.heading("pid", text="Process ID")
-        self.tree.heading("visible", text="Visibility")
-        self.tree.column("title", width=250)
-        self.tree.column("process", width=150)
-        self.tree.column("pid", width=80)
-        self.tree.column("visible", width=80)
-        self.tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        scrollbar.pack(fill=tk.Y, side=tk.RIGHT)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        
+
+        # Create the list of applications; only the rows in view exist as
+        # treeview items, so it stays fast with tens of thousands of windows.
+        # The resource columns show the latest sample of the window's process
+        self.resources = {}  # pid -> ResourceSample while resource sampling is on
+        self.window_list = VirtualList(
+            main_frame,
+            columns=(
+                ("title", "Window Title", 250),
+                ("process", "Process Name", 150),
+                ("pid", "Process ID", 80),
+                ("visible", "Visibility", 80),
+                ("cpu", "CPU %", 60),
+                ("memory", "Memory (MB)", 90),
+                ("threads", "Threads", 60),
+            ),
+            key="hwnd",
+            tag=lambda window: "visible" if window.is_visible else "hidden",
+            cells={column: self.resource_cell(column) for column in RESOURCE_COLUMNS},
+        )
+        self.window_list.show_columns(WINDOW_COLUMNS)
+        self.window_list.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.window_list.tree
+
+        # Preview panel beside the list with the thumbnail of the window under
+        # the pointer; packed by start_previews
+        self.preview_frame = ttk.Frame(main_frame, width=330)
+        self.preview_label = ttk.Label(
+            self.preview_frame,
+            compound=tk.TOP,
+            anchor=tk.N,
+            wraplength=320,
+            text="Point at a window to preview it",
+        )
+        self.preview_label.pack(fill=tk.BOTH, expand=True, padx=(5, 0))
+        self.preview_photo = None  # keeps the shown PhotoImage alive
+        self.preview_hwnd = None
+        self.tree.bind("<Motion>", self.on_list_motion)
+
+        # Set colors for visible/hidden status
+        self.tree.tag_configure("visible", foreground="green")
+        self.tree.tag_configure("hidden", foreground="gray")
+        self.tree.tag_configure("group", background="#e8eef7")
+
+        # Right-click acts on the selection, or on the row clicked outside it
+        self.row_menu = None
+        self.tree.bind("<Button-3>", self.show_row_menu)
+
         # Create buttons frame
         button_frame = ttk.Frame(root)
         button_frame.pack(fill=tk.X, pady=10)
-        
+
         # Add buttons
-        ttk.Button(button_frame, text="Refresh", command=self.refresh_apps).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Hide Selected", command=self.hide_selected).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Show Selected", command=self.show_selected).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Close Selected", command=self.close_selected).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Reset All", command=self.reset_all).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Hide All Similar", command=self.hide_all_similar).pack(side=tk.LEFT, padx=5)
-        
+        ttk.Button(button_frame, text="Refresh", command=self.refresh_apps).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(button_frame, text="Hide Selected", command=self.hide_selected).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(button_frame, text="Show Selected", command=self.show_selected).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(
+            button_frame, text="Close Selected", command=self.close_selected
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reset All", command=self.reset_all).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(
+            button_frame, text="Hide All Similar", command=self.hide_all_similar
+        ).pack(side=tk.LEFT, padx=5)
+
+        # Named layouts of which windows are shown, where and in what order
+        self.workspace_menu = tk.Menu(
+            root, tearoff=0, postcommand=self.build_workspace_menu
+        )
+        self.workspace_delete_menu = tk.Menu(self.workspace_menu, tearoff=0)
+        ttk.Menubutton(button_frame, text="Workspaces", menu=self.workspace_menu).pack(
+            side=tk.LEFT, padx=5
+        )
+
+        # Keep the list current from window events instead of manual refreshes
+        self.live_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Live Updates",
+            variable=self.live_var,
+            command=self.toggle_live_updates,
+        ).pack(side=tk.LEFT, padx=5)
+
+        # One collapsible row per application, with its window and hidden counts
+        self.group_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Group by App",
+            variable=self.group_var,
+            command=self.toggle_grouping,
+        ).pack(side=tk.LEFT, padx=5)
+
+        # CPU, memory and thread columns, sampled in the background
+        self.resources_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Resources",
+            variable=self.resources_var,
+            command=self.toggle_resources,
+        ).pack(side=tk.LEFT, padx=5)
+
+        # Thumbnail of the window under the pointer
+        self.previews_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Previews",
+            variable=self.previews_var,
+            command=self.toggle_previews,
+        ).pack(side=tk.LEFT, padx=5)
+
         # Add status bar
         self.status_var = tk.StringVar()
-        status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-        self.status_var.set("Ready" + (" (Admin Mode)" if is_admin() else ""))
-        
+        self.status_bar = ttk.Label(
+            root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W
+        )
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var.set("Loading windows...")
+
+        # Debug panel above the status bar with refresh and hide/show timings;
+        # F12 shows it and turns the instrumentation on
+        self.debug_var = tk.StringVar()
+        self.debug_visible = False
+        self.debug_frame = ttk.Frame(root)
+        ttk.Label(self.debug_frame, textvariable=self.debug_var, anchor=tk.W).pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=5
+        )
+        ttk.Button(
+            self.debug_frame, text="Export Timings", command=self.export_timings
+        ).pack(side=tk.RIGHT, padx=5)
+        self.root.bind("<F12>", lambda event: self.toggle_debug_panel())
+        if metrics.enabled:
+            self.toggle_debug_panel()
+
         # Initialize window list and track hidden windows
-        self.windows = []
+        self.windows = WindowTable()  # listed WindowRecords by hwnd and by process
+        self.search_index = SearchIndex()  # title/process trigrams for the filter box
         self.hidden_windows = set()  # Track hidden windows by hwnd
-        self.window_positions = {}   # Store original positions
-        
+        self.window_positions = {}  # Store original positions
+        self.last_refresh_touched = 0
+        self.last_scan_calls = None  # backend calls made by the latest scan
+        self.applied_generation = 0  # Generation of the snapshot on screen
+        self.refresh_status = None  # Status to show once the pending scan lands
+        self.tracker = None  # WindowTracker while live updates are on
+        self.sampler = None  # ResourceSampler while the resource columns are on
+        self.thumbnails = None  # Thumbnails while the preview panel is on
+        self.panic = None  # PanicButton while panic hotkeys are registered
+        self.control_server = None  # ControlServer if TASKBAR_MANAGER_CONTROL is set
+        self.rules = None  # Auto-hide RuleSet, loaded by finish_startup
+        self.rule_seen = set()  # hwnds already checked against the rules
+        self.snapshot_worker = None  # Created by finish_startup
+        self.refresher = None  # RefreshScheduler, created by finish_startup
+        self.bulk_engine = None
+        self.hide_strategies = None
+        self.journal = None  # HiddenJournal, opened by finish_startup
+        self.workspaces = None  # WorkspaceStore, loaded by finish_startup
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Set up custom styles for buttons
         self.setup_styles()
-        
-        # Refresh the application list
+
+        # Let the window paint before loading the backend and scanning
+        self.root.after(1, self.finish_startup)
+
+    def finish_startup(self):
+        """Load the backend and workers, then stream in the first scan"""
+        # Flush the first frame to the screen before doing anything slow
+        self.root.update_idletasks()
+
+        from .backends import CtypesBackend
+        from .hide_strategy import StrategyCache
+        from .journal import HiddenJournal
+        from .refresh import RefreshScheduler
+        from .rules import RuleError, RuleSet, load_rules
+        from .snapshot import SnapshotWorker
+        from .window_ops import BulkWindowEngine
+        from .workspaces import WorkspaceStore
+
+        if self.backend is None:
+            self.backend = CtypesBackend()
+
+        try:
+            self.rules = load_rules()
+        except RuleError as e:
+            log.warning("Ignoring auto-hide rules: %s", e)
+            self.rules = RuleSet([])
+
+        # Scan windows in the background; the refresh scheduler below hands
+        # results back through root.after, together with the windows matched
+        # by the auto-hide rules, and the filter box index is brought up to
+        # date on the worker thread
+        self.snapshot_worker = SnapshotWorker(
+            self.backend, rules=self.rules, search_index=self.search_index
+        )
+
+        # Windows left hidden by an earlier session that crashed or exited
+        self.journal = HiddenJournal()
+        stranded = self.journal.stranded(self.backend)
+        for entry in stranded:
+            self.hidden_windows.add(entry.hwnd)
+            self.window_positions[entry.hwnd] = entry.rect
+
+        # Hide/show many windows concurrently without blocking the Tk loop,
+        # starting each hide from the strategy learned for its application
+        self.hide_strategies = StrategyCache()
+        self.bulk_engine = BulkWindowEngine(
+            self.backend,
+            self.window_positions,
+            schedule=self.root.after,
+            strategies=self.hide_strategies,
+            journal=self.journal,
+        )
+        self.workspaces = WorkspaceStore()
+
+        # Refreshes after actions are merged and re-check only the windows
+        # acted on; full scans run one at a time
+        self.refresher = RefreshScheduler(
+            lambda: self.snapshot_worker.request(self.hidden_windows),
+            lambda hwnds: self.snapshot_worker.recheck(hwnds, self.hidden_windows),
+            self.apply_refresh,
+            schedule=self.root.after,
+        )
+
+        # Global hotkeys that hide and restore the panic targets, if configured
+        if sys.platform == "win32":
+            self.start_panic_hotkeys()
+
+        # Local scripts can list and act on windows through the control server
+        if os.environ.get("TASKBAR_MANAGER_CONTROL"):
+            self.start_control_server(os.environ["TASKBAR_MANAGER_CONTROL"])
+
+        # Fill the application list, and bring stranded windows back
         self.refresh_apps()
-        
+        if stranded:
+            self.show_windows(
+                [entry.hwnd for entry in stranded],
+                message="Restored {count} window(s) hidden by an " "earlier session",
+            )
+
         # Show admin warning if not admin
-        if not is_admin():
+        if self.admin_warning and not is_admin():
             messagebox.showwarning(
-                "Limited Functionality", 
-                "Running without administrator privileges.\nSome windows may not be hideable without admin rights."
+                "Limited Functionality",
+                "Running without administrator privileges.\n"
+                "Some windows may not be hideable without admin rights.",
             )
-    
+
     def setup_styles(self):
         """Set up custom styles for buttons"""
         style = ttk.Style()
-        style.configure("Accent.TButton", 
-                       background="#007acc", 
-                       foreground="white")
-        style.configure("Special.TButton",
-                       background="#ff7700",
-                       foreground="white")
-    
+        style.configure("Accent.TButton", background="#007acc", foreground="white")
+        style.configure("Special.TButton", background="#ff7700", foreground="white")
+
     def is_alt_tab_window(self, hwnd):
         """Check if a window would appear in the Alt+Tab dialog"""
-        if not win32gui.IsWindow(hwnd):
-            return False
-            
-        if not win32gui.IsWindowVisible(hwnd):
-            # Only consider visible windows unless they're in our hidden list
-            if hwnd not in self.hidden_windows:
-                return False
-        
-        # Get window styles
-        style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
-        ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-        
-        # Check if it's a visible app window
-        if (style & win32con.WS_VISIBLE) == 0 and hwnd not in self.hidden_windows:
-            return False
-        
-        # Exclude certain window styles
-        if (style & win32con.WS_DISABLED) != 0:
-            return False
-        
-        # Exclude tool windows
-        if (ex_style & win32con.WS_EX_TOOLWINDOW) != 0 and hwnd not in self.hidden_windows:
-            return False
-        
-        # Make sure it's not a child window
-        if win32gui.GetParent(hwnd) != 0 and hwnd not in self.hidden_windows:
-            return False
-        
-        # Check if window has a title
-        title = win32gui.GetWindowText(hwnd)
-        if not title and hwnd not in self.hidden_windows:
-            return False
-        
-        return True
-    
+        from .snapshot import is_alt_tab_window
+
+        return is_alt_tab_window(self.backend, hwnd, self.hidden_windows)
+
     def get_process_name_from_hwnd(self, hwnd):
         """Get process name from window handle"""
+        from .snapshot import get_process_name_from_hwnd
+
+        return get_process_name_from_hwnd(self.backend, hwnd)
+
+    def refresh_apps(self, status=None, wait=False, hwnds=None):
+        """Refresh the list of applications
+
+        The scan runs on the snapshot worker and the list updates once it lands.
+        With hwnds only those windows are checked again, as after an action.
+        Requests close together are merged by the refresh scheduler.
+        status replaces the "Found N applications" message for this refresh;
+        wait=True blocks until the list is up to date and returns the number
+        of rows it touched. Without wait nothing is known yet and None is
+        returned.
+        """
+        self.refresh_status = status
+        if status is not None:
+            self.status_var.set(status)
+        if self.refresher is None:
+            # Still starting up; finish_startup runs the first scan
+            return None
+
+        self.refresher.request(hwnds)
+        if not wait:
+            return None
+        self.refresher.wait()
+        return self.last_refresh_touched
+
+    def apply_refresh(self, result):
+        """Show the result of a refresh: a full Snapshot or a Recheck of some windows"""
+        from .snapshot import Recheck
+
+        if isinstance(result, Recheck):
+            self.apply_recheck(result)
+        else:
+            self.apply_snapshot(result)
+
+    def apply_recheck(self, recheck):
+        """Update the windows a re-check described and drop those no longer listed"""
+        listed = {window.hwnd for window in recheck.windows}
+        changed = [
+            window
+            for window in recheck.windows
+            if self.windows.get(window.hwnd) != window
+        ]
+        removed = [
+            hwnd
+            for hwnd in recheck.hwnds
+            if hwnd not in listed and hwnd in self.windows
+        ]
+        self.last_scan_calls = recheck.native_calls
+        self.apply_window_changes(changed, removed, status=self.refresh_status)
+        if self.tracker is not None:
+            self.tracker.windows.update((window.hwnd, window) for window in changed)
+            for hwnd in removed:
+                self.tracker.windows.pop(hwnd, None)
+
+    def apply_snapshot(self, snapshot):
+        """Show a finished window snapshot in the treeview"""
+        if snapshot.generation <= self.applied_generation:
+            return
+        self.applied_generation = snapshot.generation
+
+        self.windows = WindowTable(snapshot.windows)
+        self.last_scan_calls = snapshot.native_calls
+        if self.filter_var.get().strip():
+            self.apply_filter()
+        with metrics.timer("list.update"):
+            self.last_refresh_touched = self.update_tree(snapshot.windows)
+        self.update_debug_panel()
+        if self.tracker is not None:
+            self.tracker.seed(snapshot.windows)
+        if self.panic is not None:
+            self.panic.seed(snapshot.windows)
+        if self.control_server is not None:
+            self.control_server.seed(snapshot.windows)
+        self.update_sampled_pids()
+        if self.thumbnails is not None:
+            self.thumbnails.cache.retain(self.windows.by_hwnd)
+
+        if self.refresh_status is not None:
+            self.status_var.set(self.refresh_status)
+        else:
+            self.status_var.set(
+                f"Found {len(self.windows)} applications"
+                + (
+                    f" from {len(self.windows.by_process)} programs"
+                    if self.group_var.get()
+                    else ""
+                )
+                + (" (Admin Mode)" if is_admin() else "")
+            )
+
+        # Rules act once per window, the first time a scan sees it
+        new_matches = [
+            match for match in snapshot.matches if match.hwnd not in self.rule_seen
+        ]
+        self.rule_seen = set(self.windows.by_hwnd)
+        self.run_rule_actions(new_matches)
+
+    def run_rule_actions(self, matches):
+        """Carry out the actions of matched auto-hide rules"""
+        hwnds = {"hide": [], "show": [], "close": []}
+        for match in matches:
+            hwnds[match.action].append(match.hwnd)
+
+        if hwnds["close"]:
+            self.close_windows(hwnds["close"], prefix="Auto: ")
+        if hwnds["hide"]:
+            self.hide_windows(hwnds["hide"], label="auto-hidden ")
+        if hwnds["show"]:
+            self.show_windows(hwnds["show"], message="Auto-showed {count} window(s)")
+
+    def update_tree(self, windows):
+        """Show a window list, keyed by hwnd
+
+        Only rows in view whose cells changed are rewritten, and selection and
+        scroll position survive a refresh. Returns the number of rows touched.
+        """
+        return self.window_list.set_records(windows)
+
+    def apply_filter(self):
+        """Show only the windows matching the filter box"""
+        query = self.filter_var.get()
+        matches = self.search_index.search(query) if query.strip() else None
+        with metrics.timer("list.filter"):
+            self.window_list.set_filter(matches)
+        if matches is not None:
+            self.status_var.set(
+                f"{len(matches)} of {len(self.windows)} "
+                f'applications match "{query.strip()}"'
+            )
+
+    def toggle_grouping(self):
+        """Switch between the flat list and one group per application"""
+        if self.group_var.get():
+            self.window_list.set_grouping(
+                lambda window: window.process.lower(), self.summarize_group
+            )
+        else:
+            self.window_list.set_grouping(None)
+
+    def summarize_group(self, process, windows):
+        """Header cells of an application's group: name, window count, hidden
+        count and the resources of its processes added up"""
+        hidden = sum(1 for window in windows if not window.is_visible)
+        samples = [
+            self.resources[pid]
+            for pid in {window.pid for window in windows}
+            if pid in self.resources
+        ]
+        totals = []
+        for column in RESOURCE_COLUMNS:
+            values = [
+                getattr(sample, column)
+                for sample in samples
+                if getattr(sample, column) is not None
+            ]
+            totals.append(round(sum(values), 1) if values else None)
+        return (
+            windows[0].process,
+            f"{len(windows)} window(s)",
+            "",
+            f"{hidden} hidden" if hidden else "",
+            *totals,
+        )
+
+    def resource_cell(self, column):
+        """Return the cell function of a resource column: the field of the
+        window's process sample, or None while it has none"""
+        get = attrgetter(column)
+        resources = self.resources
+
+        def cell(window):
+            sample = resources.get(window.pid)
+            return None if sample is None else get(sample)
+
+        return cell
+
+    def toggle_resources(self):
+        """Start or stop resource sampling from the Resources checkbox"""
+        if self.resources_var.get():
+            self.start_resource_sampling()
+        else:
+            self.stop_resource_sampling()
+
+    def start_resource_sampling(self, psutil_module=None):
+        """Show the resource columns and sample the listed processes"""
+        if self.sampler is not None:
+            return
+        from .resource_sampler import ResourceSampler
+
+        self.sampler = ResourceSampler(
+            self.apply_resource_samples,
+            schedule=self.root.after,
+            psutil_module=psutil_module,
+        )
+        self.update_sampled_pids()
+        self.sampler.start()
+        self.window_list.show_columns(WINDOW_COLUMNS + RESOURCE_COLUMNS)
+        self.resources_var.set(True)
+
+    def stop_resource_sampling(self):
+        """Stop sampling and hide the resource columns"""
+        if self.sampler is None:
+            return
+        self.sampler.stop()
+        self.sampler = None
+        self.resources.clear()
+        self.window_list.show_columns(WINDOW_COLUMNS)
+        self.window_list.refresh()
+        self.resources_var.set(False)
+
+    def toggle_previews(self):
+        """Show or hide the preview panel from the Previews checkbox"""
+        if self.previews_var.get():
+            self.start_previews()
+        else:
+            self.stop_previews()
+
+    def start_previews(self, source=None):
+        """Show the preview panel; thumbnails are captured as windows are pointed at"""
+        if self.thumbnails is not None:
+            return
+        from .thumbnails import (
+            PrintWindowSource,
+            ThumbnailCache,
+            Thumbnails,
+            max_bytes_from_env,
+        )
+
+        if source is None:
+            source = PrintWindowSource()
+        self.thumbnails = Thumbnails(
+            source,
+            ThumbnailCache(max_bytes_from_env()),
+            deliver=self.on_thumbnail,
+            schedule=self.root.after,
+        )
+        self.preview_frame.pack(side=tk.RIGHT, fill=tk.Y, before=self.window_list)
+        self.previews_var.set(True)
+
+    def stop_previews(self):
+        """Hide the preview panel and drop the cached thumbnails"""
+        if self.thumbnails is None:
+            return
+        self.thumbnails.shutdown()
+        self.thumbnails = None
+        self.preview_frame.pack_forget()
+        self.preview_hwnd = None
+        self.preview_photo = None
+        self.preview_label.configure(image="", text="Point at a window to preview it")
+        self.previews_var.set(False)
+
+    def on_list_motion(self, event):
+        """Preview the window under the pointer"""
+        if self.thumbnails is None:
+            return
+        index = self.window_list.index_at(event.y)
+        if index is None:
+            return
+        window = self.window_list.records[index]
+        if getattr(window, "hwnd", None) in (None, self.preview_hwnd):
+            return  # a group header, or the window already shown
+        self.preview_hwnd = window.hwnd
+        hidden = window.hwnd in self.hidden_windows or not window.is_visible
+        self.show_preview(window, self.thumbnails.request(window, hidden))
+
+    def on_thumbnail(self, thumbnail):
+        """Show a finished capture if its window is still the one pointed at"""
+        window = self.windows.get(thumbnail.hwnd)
+        if window is not None and thumbnail.hwnd == self.preview_hwnd:
+            self.show_preview(window, thumbnail)
+        self.update_debug_panel()
+
+    def show_preview(self, window, thumbnail):
+        """Put a window's thumbnail, or why there is none, in the preview panel"""
+        hidden = window.hwnd in self.hidden_windows or not window.is_visible
+        if thumbnail is None:
+            self.preview_photo = None
+            text = (
+                "No preview: the window was hidden before it was captured"
+                if hidden
+                else "Capturing..."
+            )
+            self.preview_label.configure(image="", text=f"{window.title}\n{text}")
+            return
+        from PIL import ImageTk
+
+        self.preview_photo = ImageTk.PhotoImage(thumbnail.image)
+        suffix = "\n(hidden; last seen)" if hidden else ""
+        self.preview_label.configure(
+            image=self.preview_photo, text=window.title + suffix
+        )
+
+    def update_sampled_pids(self):
+        """Point the sampler at the processes of the listed windows"""
+        if self.sampler is not None:
+            # PID 0 stands for windows whose process could not be found
+            self.sampler.set_pids({window.pid for window in self.windows if window.pid})
+
+    def apply_resource_samples(self, changed, gone):
+        """Show the process samples that changed since the last ones"""
+        self.resources.update(changed)
+        for pid in gone:
+            self.resources.pop(pid, None)
+        with metrics.timer("list.resources"):
+            self.window_list.refresh()
+        self.update_debug_panel()
+
+    def show_row_menu(self, event):
+        """Pop up Hide/Show/Close for the selection under the pointer"""
+        index = self.window_list.index_at(event.y)
+        if index is None:
+            return
+        if (
+            self.window_list.row_key(self.window_list.records[index])
+            not in self.window_list.selected
+        ):
+            self.window_list.select_index(index)
+        if self.row_menu is None:
+            self.row_menu = tk.Menu(self.root, tearoff=0)
+            self.row_menu.add_command(label="Hide", command=self.hide_selected)
+            self.row_menu.add_command(label="Show", command=self.show_selected)
+            self.row_menu.add_command(label="Close", command=self.close_selected)
+            self.row_menu.add_command(
+                label="Force Close...",
+                command=lambda: self.close_selected(terminate=True),
+            )
+        self.row_menu.tk_popup(event.x_root, event.y_root)
+
+    def start_panic_hotkeys(self, source=None):
+        """Register the panic and restore hotkeys from hotkeys.json"""
+        if self.panic is not None:
+            return
+        from .hotkeys import (
+            HotkeyError,
+            PanicButton,
+            WinHotkeySource,
+            load_hotkey_config,
+        )
+
         try:
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            try:
-                process = psutil.Process(pid)
-                return process.name(), pid
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                return "Unknown", pid
-        except Exception as e:
-            print(f"Error getting process: {e}")
-            return "Unknown", 0
-    
-    def refresh_apps(self):
-        """Refresh the list of applications"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        self.windows = []
-        
-        # Enumerate windows
-        def enum_windows_callback(hwnd, _):
-            if self.is_alt_tab_window(hwnd) or hwnd in self.hidden_windows:
-                title = win32gui.GetWindowText(hwnd)
-                proc_name, pid = self.get_process_name_from_hwnd(hwnd)
-                visibility = "Visible" if win32gui.IsWindowVisible(hwnd) else "Hidden"
-                
-                window_info = {
-                    "hwnd": hwnd,
-                    "title": title,
-                    "process": proc_name,
-                    "pid": pid,
-                    "visible": visibility
-                }
-                
-                self.windows.append(window_info)
-                
-                # Add to treeview
-                item = self.tree.insert("", tk.END, text=title, 
-                             values=(title, proc_name, pid, visibility),
-                             tags=("visible" if visibility == "Visible" else "hidden"))
-                
-        win32gui.EnumWindows(enum_windows_callback, None)
-        
-        # Set colors for visible/hidden status
-        self.tree.tag_configure("visible", foreground="green")
-        self.tree.tag_configure("hidden", foreground="gray")
-        
-        self.status_var.set(f"Found {len(self.windows)} applications" + 
-                           (" (Admin Mode)" if is_admin() else ""))
-    
+            config = load_hotkey_config()
+        except HotkeyError as e:
+            log.warning("Ignoring panic hotkeys: %s", e)
+            return
+        if config is None:
+            return  # Not set up in hotkeys.json
+        if source is None:
+            source = WinHotkeySource(config.bindings)
+        panic = PanicButton(
+            self.bulk_engine,
+            source,
+            config.targets,
+            get_exe=self.snapshot_worker.get_exe,
+            deliver=self.on_panic,
+            schedule=self.root.after,
+        )
+        panic.seed(self.windows)
+        try:
+            panic.start()
+        except OSError as e:
+            log.warning("Panic hotkeys unavailable: %s", e)
+            return
+        self.panic = panic
+
+    def stop_panic_hotkeys(self):
+        """Unregister the panic hotkeys"""
+        if self.panic is None:
+            return
+        self.panic.stop()
+        self.panic = None
+
+    def on_panic(self, panic_result):
+        """Record what a panic or restore hotkey press did and refresh those windows"""
+        count = self.record_action(panic_result.action, panic_result.result)
+        verb = "hid" if panic_result.action == "hide" else "restored"
+        latency = panic_result.latency * 1000
+        self.refresh_apps(
+            status=f"Panic hotkey {verb} {count} window(s) "
+            f"{latency:.0f} ms after the keypress",
+            hwnds=[window_result.hwnd for window_result in panic_result.result.results],
+        )
+
+    def record_action(self, action, result):
+        """Update the hidden windows after a hide, show or close started outside
+        the buttons; returns the number of windows it succeeded on"""
+        count = 0
+        for window_result in result.results:
+            if action == "hide":
+                if window_result.ok:
+                    self.hidden_windows.add(window_result.hwnd)
+            elif action == "show" or window_result.ok:
+                self.hidden_windows.discard(window_result.hwnd)
+            count += window_result.ok
+        return count
+
+    def start_control_server(self, address=None):
+        """Serve the window list and window actions to local scripts"""
+        if self.control_server is not None:
+            return
+        from .control_server import DEFAULT_ADDRESS, ControlServer
+
+        try:
+            server = ControlServer(
+                self.bulk_engine,
+                address or DEFAULT_ADDRESS,
+                deliver=self.on_control_action,
+                schedule=self.root.after,
+            )
+            server.seed(self.windows)
+            server.start()
+        except (OSError, ValueError) as e:
+            log.warning("Control server not started: %s", e)
+            return
+        self.control_server = server
+
+    def stop_control_server(self):
+        """Close the control server and its connections"""
+        if self.control_server is None:
+            return
+        self.control_server.stop()
+        self.control_server = None
+
+    def on_control_action(self, control_action):
+        """Record a hide, show or close requested by a control client and refresh"""
+        count = self.record_action(control_action.action, control_action.result)
+        self.refresh_apps(
+            status=f"Control client: {control_action.action} " f"{count} window(s)",
+            hwnds=[
+                window_result.hwnd for window_result in control_action.result.results
+            ],
+        )
+
+    def toggle_debug_panel(self):
+        """Show or hide the debug panel; showing it turns on the instrumentation"""
+        self.debug_visible = not self.debug_visible
+        if not self.debug_visible:
+            self.debug_frame.pack_forget()
+            return
+        metrics.enabled = True
+        self.debug_frame.pack(side=tk.BOTTOM, fill=tk.X, after=self.status_bar)
+        self.update_debug_panel()
+
+    def update_debug_panel(self):
+        if not metrics.enabled:
+            return
+        text = metrics.describe(DEBUG_PHASES)
+        if self.last_scan_calls is not None:
+            text += f"   last scan {self.last_scan_calls} native calls"
+        if self.refresher is not None:
+            stats = self.refresher.stats()
+            text += (
+                f"   refreshes {stats['requested']} requested, "
+                f"{stats['scans']} scans, {stats['rechecks']} re-checks"
+            )
+        if self.panic is not None and self.panic.last is not None:
+            text += (
+                f"   panic {self.panic.last.action} "
+                f"{self.panic.last.latency * 1000:.0f} ms"
+            )
+        if self.control_server is not None:
+            stats = self.control_server.stats()
+            text += (
+                f"   control {stats['clients']} clients, "
+                f"{stats['requests']} requests"
+            )
+        if self.sampler is not None:
+            text += (
+                f"   sampler {self.sampler.overhead():.2f}% CPU, "
+                f"every {self.sampler.interval:.1f} s"
+            )
+        if self.thumbnails is not None:
+            stats = self.thumbnails.stats()
+            megabytes = stats["bytes"] / 1048576
+            text += (
+                f"   thumbnails {stats['size']} ({megabytes:.1f} MB), "
+                f"{stats['hit_rate']:.0%} hits"
+            )
+        self.debug_var.set(text)
+
+    def export_timings(self):
+        """Write every recorded timing to the settings directory as JSON"""
+        try:
+            path = metrics.export()
+        except OSError as e:
+            log.warning("Failed to export timings: %s", e)
+            self.status_var.set(f"Failed to export timings: {e}")
+            return
+        self.status_var.set(f"Timings written to {path}")
+
+    def toggle_live_updates(self):
+        """Start or stop live updates from the Live Updates checkbox"""
+        if self.live_var.get():
+            self.start_live_updates()
+        else:
+            self.stop_live_updates()
+
+    def start_live_updates(self, source=None):
+        """Track window events and update the list as windows change"""
+        if self.tracker is not None:
+            return
+        if self.backend is None:
+            self.live_var.set(False)
+            return
+        from .window_events import WindowTracker, WinEventSource
+
+        self.tracker = WindowTracker(
+            self.backend,
+            source if source is not None else WinEventSource(),
+            self.hidden_windows,
+            self.apply_window_changes,
+            schedule=self.root.after,
+        )
+        self.tracker.seed(self.windows)
+        self.tracker.start()
+        self.live_var.set(True)
+
+    def stop_live_updates(self):
+        """Stop tracking window events"""
+        if self.tracker is None:
+            return
+        self.tracker.stop()
+        self.tracker = None
+        self.live_var.set(False)
+
+    def apply_window_changes(self, changed, removed, status=None):
+        """Apply the windows a tracker flush or a re-check added, changed or removed
+
+        status replaces the "Found N applications (live)" message.
+        """
+        self.search_index.update(changed, removed)
+        if self.filter_var.get().strip():
+            self.apply_filter()
+        with metrics.timer("list.update"):
+            touched = self.window_list.update_records(changed, removed)
+        self.update_debug_panel()
+        self.windows.update(changed, removed)
+        if self.panic is not None:
+            self.panic.update(changed, removed)
+        if self.control_server is not None:
+            self.control_server.update(changed, removed)
+        self.update_sampled_pids()
+        if self.thumbnails is not None:
+            self.thumbnails.forget(removed)
+        self.rule_seen.difference_update(removed)
+        new_windows = []
+        for window in changed:
+            if window.hwnd not in self.rule_seen:
+                self.rule_seen.add(window.hwnd)
+                new_windows.append(window)
+
+        self.last_refresh_touched = touched
+        if status is not None:
+            self.status_var.set(status)
+        else:
+            self.status_var.set(
+                f"Found {len(self.windows)} applications (live)"
+                + (" (Admin Mode)" if is_admin() else "")
+            )
+
+        if self.rules and new_windows:
+            self.run_rule_actions(
+                self.rules.match_all(new_windows, self.snapshot_worker.get_exe)
+            )
+
     def get_selected_windows(self):
-        """Get the selected windows from the treeview"""
-        selected_ids = self.tree.selection()
-        selected_windows = []
-        
-        for idx in selected_ids:
-            item_values = self.tree.item(idx, "values")
-            pid = int(item_values[2])  # PID is now at index 2
-            
-            # Find the window info that matches this PID
-            for window in self.windows:
-                if window["pid"] == pid:
-                    selected_windows.append(window)
-                    break
-        
-        return selected_windows
-        
+        """Get the selected windows from the window list
+
+        A selected application group stands for all of its windows; its
+        members come from the group, without scanning the other windows.
+        """
+        return self.window_list.selected_records()
+
     def hide_window(self, hwnd):
-        """Use multiple techniques to hide a window"""
-        if not win32gui.IsWindow(hwnd):
-            return False
-        
-        try:
-            print(f"Hiding window {hwnd}...")
-            
-            # Store original position for later
-            try:
-                rect = win32gui.GetWindowRect(hwnd)
-                self.window_positions[hwnd] = rect
-            except Exception as e:
-                print(f"  Failed to get window rect: {e}")
-            
-            # Try multiple techniques in sequence with short pauses
-            
-            # First try with standard hiding
-            win32gui.ShowWindow(hwnd, win32con.SW_HIDE)
-            time.sleep(0.05)
-            
-            # Try to minimize first then hide (works better for some windows)
-            win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-            time.sleep(0.05)
-            win32gui.ShowWindow(hwnd, win32con.SW_HIDE)
-            
-            # Make window a tool window so it doesn't show in taskbar
-            ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-            win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE, 
-                                 ex_style | win32con.WS_EX_TOOLWINDOW)
-            
-            # Enable layered window for transparency
-            ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-            win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE,
-                                 ex_style | win32con.WS_EX_LAYERED)
-            
-            # Set complete transparency
-            win32gui.SetLayeredWindowAttributes(hwnd, 0, 0, win32con.LWA_ALPHA)
-            
-            # Move far off-screen
-            win32gui.SetWindowPos(hwnd, win32con.HWND_BOTTOM,
-                                -32000, -32000, 0, 0, 
-                                win32con.SWP_NOSIZE | win32con.SWP_NOACTIVATE)
-            
-            # Try to disable the window
-            win32gui.EnableWindow(hwnd, False)
-            
+        """Use multiple techniques to hide a window (blocks until done)"""
+        result = self.bulk_engine.run("hide", [hwnd]).results[0]
+        if result.ok:
             # Add to our list of hidden windows
             self.hidden_windows.add(hwnd)
-            
-            return True
-        except Exception as e:
-            print(f"Error hiding window {hwnd}: {e}")
-            traceback.print_exc()
-            return False
-    
+        return result.ok
+
     def show_window(self, hwnd):
-        """Restore a hidden window"""
-        try:
-            print(f"Showing window {hwnd}...")
-            
-            # Re-enable the window
-            try:
-                win32gui.EnableWindow(hwnd, True)
-            except Exception as e:
-                print(f"  Failed to re-enable: {e}")
-            
-            # Restore opacity
-            try:
-                ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-                if (ex_style & win32con.WS_EX_LAYERED):
-                    win32gui.SetLayeredWindowAttributes(hwnd, 0, 255, win32con.LWA_ALPHA)
-            except Exception as e:
-                print(f"  Failed to restore opacity: {e}")
-            
-            # Move window back to original or visible position
-            try:
-                if hwnd in self.window_positions:
-                    rect = self.window_positions[hwnd]
-                    win32gui.SetWindowPos(
-                        hwnd, 
-                        win32con.HWND_TOP,
-                        rect[0], rect[1],  # Original position
-                        rect[2] - rect[0], rect[3] - rect[1],  # Original size
-                        win32con.SWP_SHOWWINDOW
-                    )
-                else:
-                    win32gui.SetWindowPos(
-                        hwnd, 
-                        win32con.HWND_TOP,
-                        100, 100,  # Visible position
-                        0, 0,  # Keep same size
-                        win32con.SWP_NOSIZE | win32con.SWP_SHOWWINDOW
-                    )
-            except Exception as e:
-                print(f"  Failed to reposition window: {e}")
-            
-            # Restore window style
-            try:
-                style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-                win32gui.SetWindowLong(
-                    hwnd, 
-                    win32con.GWL_EXSTYLE, 
-                    style & ~win32con.WS_EX_TOOLWINDOW
-                )
-            except Exception as e:
-                print(f"  Failed to restore window style: {e}")
-                
-            # Show the window with multiple flags
-            try:
-                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                win32gui.ShowWindow(hwnd, win32con.SW_SHOW)
-                win32gui.ShowWindow(hwnd, win32con.SW_NORMAL)
-            except Exception as e:
-                print(f"  Failed to show window: {e}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error showing window {hwnd}: {e}")
-            traceback.print_exc()
-            return False
-            
+        """Restore a hidden window (blocks until done)"""
+        return self.bulk_engine.run("show", [hwnd]).results[0].ok
+
+    def hide_windows(self, hwnds, label=""):
+        """Hide windows concurrently and refresh once they are all done"""
+
+        def done(result):
+            count = 0
+            for window_result in result.results:
+                if window_result.ok:
+                    self.hidden_windows.add(window_result.hwnd)
+                    count += 1
+            self.refresh_apps(
+                status=f"Hidden {count} {label}window(s) "
+                f"in {result.elapsed * 1000:.0f} ms",
+                hwnds=hwnds,
+            )
+
+        self.status_var.set(f"Hiding {len(hwnds)} {label}window(s)...")
+        return self.bulk_engine.submit("hide", hwnds, done)
+
+    def show_windows(self, hwnds, message="Showed {count} window(s)"):
+        """Show windows concurrently and refresh once they are all done"""
+
+        def done(result):
+            count = 0
+            for window_result in result.results:
+                self.hidden_windows.discard(window_result.hwnd)
+                if window_result.ok:
+                    count += 1
+            self.refresh_apps(
+                status=message.format(count=count)
+                + f" in {result.elapsed * 1000:.0f} ms",
+                hwnds=hwnds,
+            )
+
+        self.status_var.set(f"Showing {len(hwnds)} window(s)...")
+        return self.bulk_engine.submit("show", hwnds, done)
+
     def hide_selected(self):
         """Hide selected windows"""
         selected_windows = self.get_selected_windows()
-        
+
         if not selected_windows:
             self.status_var.set("No windows selected")
             return
-        
-        count = 0
-        for window in selected_windows:
-            hwnd = window["hwnd"]
-            if self.hide_window(hwnd):
-                count += 1
-        
-        self.refresh_apps()
-        self.status_var.set(f"Hidden {count} window(s)")
-    
+
+        self.hide_windows([window.hwnd for window in selected_windows])
+
     def show_selected(self):
         """Show selected windows"""
         selected_windows = self.get_selected_windows()
-        
+
         if not selected_windows:
             self.status_var.set("No windows selected")
             return
-        
-        count = 0
-        for window in selected_windows:
-            hwnd = window["hwnd"]
-            if self.show_window(hwnd):
-                count += 1
-                if hwnd in self.hidden_windows:
-                    self.hidden_windows.remove(hwnd)
-        
-        self.refresh_apps()
-        self.status_var.set(f"Showed {count} window(s)")
-    
+
+        self.show_windows([window.hwnd for window in selected_windows])
+
     def hide_all_similar(self):
         """Hide all windows of the same application as the selected window"""
         selected_windows = self.get_selected_windows()
-        
+
         if not selected_windows:
             self.status_var.set("No windows selected")
             return
-            
+
         # Get the process name of the first selected window
-        target_process = selected_windows[0]["process"].lower()
-        
-        count = 0
-        for window in self.windows:
-            if window["process"].lower() == target_process:
-                hwnd = window["hwnd"]
-                if self.hide_window(hwnd):
-                    count += 1
-        
-        self.refresh_apps()
-        self.status_var.set(f"Hidden {count} {target_process} window(s)")
-    
-    def close_selected(self):
-        """Close selected windows"""
+        target_process = selected_windows[0].process.lower()
+
+        hwnds = [window.hwnd for window in self.windows.group(target_process)]
+        return self.hide_windows(hwnds, label=f"{target_process} ")
+
+    def close_windows(self, hwnds, terminate=False, prefix=""):
+        """Close windows concurrently and report once each is gone or timed out
+
+        The list is refreshed when every window has finished, so closed
+        windows are gone from it and ones that refused to close are still there.
+        """
+        from .window_ops import close_summary
+
+        def done(result):
+            for window_result in result.results:
+                if window_result.ok:
+                    self.hidden_windows.discard(window_result.hwnd)
+            self.refresh_apps(status=prefix + close_summary(result), hwnds=hwnds)
+
+        self.status_var.set(f"{prefix}Closing {len(hwnds)} window(s)...")
+        return self.bulk_engine.close(hwnds, terminate, callback=done)
+
+    def close_selected(self, terminate=False):
+        """Close selected windows; terminate=True ends the processes of windows
+        that stay open past the close timeout, after asking"""
         selected_windows = self.get_selected_windows()
-        
+
         if not selected_windows:
             self.status_var.set("No windows selected")
             return
-        
-        count = 0
-        for window in selected_windows:
-            hwnd = window["hwnd"]
-            win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
-            if hwnd in self.hidden_windows:
-                self.hidden_windows.remove(hwnd)
-            count += 1
-        
-        self.refresh_apps()
-        self.status_var.set(f"Closed {count} window(s)")
-        
+
+        if terminate and not messagebox.askyesno(
+            "Force Close",
+            f"Close {len(selected_windows)} window(s)?\nApplications that do not "
+            f"close within {self.bulk_engine.close_timeout:g} seconds will be "
+            "terminated and lose unsaved work.",
+        ):
+            return
+
+        return self.close_windows(
+            [window.hwnd for window in selected_windows], terminate
+        )
+
+    def build_workspace_menu(self):
+        """Fill the Workspaces menu with the saved workspaces as it opens"""
+        names = self.workspaces.names() if self.workspaces is not None else []
+        self.workspace_menu.delete(0, tk.END)
+        self.workspace_delete_menu.delete(0, tk.END)
+        self.workspace_menu.add_command(
+            label="Save Workspace...", command=self.save_workspace
+        )
+        if not names:
+            return
+        self.workspace_menu.add_separator()
+        for name in names:
+            self.workspace_menu.add_command(
+                label=name, command=lambda name=name: self.restore_workspace(name)
+            )
+            self.workspace_delete_menu.add_command(
+                label=name, command=lambda name=name: self.delete_workspace(name)
+            )
+        self.workspace_menu.add_separator()
+        self.workspace_menu.add_cascade(label="Delete", menu=self.workspace_delete_menu)
+
+    def save_workspace(self, name=None):
+        """Save the visibility, position and stacking of the listed windows
+
+        Without a name the user is asked for one.
+        """
+        if self.workspaces is None:
+            return
+        from .workspaces import capture_workspace
+
+        if name is None:
+            name = (
+                simpledialog.askstring(
+                    "Save Workspace", "Workspace name:", parent=self.root
+                )
+                or ""
+            ).strip()
+            if not name:
+                return
+            if self.workspaces.get(name) is not None and not messagebox.askyesno(
+                "Save Workspace", f'Replace workspace "{name}"?'
+            ):
+                return
+
+        # Reading every window's rect and the z-order takes a call per window,
+        # so it runs on the scan thread over copies of the list's state
+        self.status_var.set(f'Saving workspace "{name}"...')
+        future = self.snapshot_worker.submit(
+            capture_workspace,
+            name,
+            self.backend,
+            list(self.windows),
+            frozenset(self.hidden_windows),
+            dict(self.window_positions),
+        )
+        self.finish_save_workspace(name, future)
+        return future
+
+    def finish_save_workspace(self, name, future):
+        """Store a captured workspace once the scan thread has read it"""
+        if not future.done():
+            self.root.after(
+                self.snapshot_worker.poll_interval,
+                lambda: self.finish_save_workspace(name, future),
+            )
+            return
+        if future.exception() is not None:
+            log.error("Error saving workspace %r", name, exc_info=future.exception())
+            self.status_var.set(f'Failed to save workspace "{name}"')
+            return
+        workspace = future.result()
+        self.workspaces.put(workspace)
+        self.status_var.set(
+            f'Saved workspace "{name}" with ' f"{len(workspace.windows)} window(s)"
+        )
+
+    def restore_workspace(self, name):
+        """Hide, show and place the listed windows as a saved workspace has them"""
+        workspace = self.workspaces.get(name) if self.workspaces is not None else None
+        if workspace is None:
+            self.status_var.set(f'No workspace named "{name}"')
+            return
+        from .workspaces import plan_restore
+
+        plan = plan_restore(workspace, self.windows, self.hidden_windows)
+        if not plan.hide and not plan.placements:
+            self.status_var.set(f'None of the windows of workspace "{name}" are open')
+            return
+
+        def done(result):
+            hidden = 0
+            for window_result in result.hidden:
+                if window_result.ok:
+                    self.hidden_windows.add(window_result.hwnd)
+                    hidden += 1
+            for window_result in result.shown:
+                self.hidden_windows.discard(window_result.hwnd)
+            placed = sum(window_result.ok for window_result in result.placed)
+            status = (
+                f'Restored workspace "{name}": {placed} window(s) placed, '
+                f"{hidden} hidden in {result.elapsed * 1000:.0f} ms"
+            )
+            if plan.missing:
+                status += f", {len(plan.missing)} not open"
+            placed = [placement[0] for placement in plan.placements]
+            self.refresh_apps(status=status, hwnds=plan.hide + placed)
+
+        self.status_var.set(f'Restoring workspace "{name}"...')
+        return self.bulk_engine.arrange(plan.hide, plan.show, plan.placements, done)
+
+    def delete_workspace(self, name):
+        """Forget a saved workspace"""
+        if self.workspaces is not None and self.workspaces.delete(name):
+            self.status_var.set(f'Deleted workspace "{name}"')
+
     def reset_all(self):
         """Reset all hidden windows to default visible state"""
-        if not self.hidden_windows:
+        hwnds = set(self.hidden_windows)
+        if self.journal is not None:
+            # A hide that failed after changing the window is only journaled
+            hwnds.update(self.journal.entries)
+        if not hwnds:
             self.status_var.set("No hidden windows to reset")
             return
-            
-        count = 0
-        # Make a copy of hidden_windows since we'll be modifying it during iteration
-        hidden_hwnd_copy = self.hidden_windows.copy()
-        
-        for hwnd in hidden_hwnd_copy:
-            if self.show_window(hwnd):
-                count += 1
-                self.hidden_windows.remove(hwnd)
-            else:
-                # Handle case where window no longer exists
-                self.hidden_windows.remove(hwnd)
-        
-        self.refresh_apps()
-        self.status_var.set(f"Reset {count} hidden window(s) to visible state")
+
+        # Windows that no longer exist are dropped from the hidden set as well
+        return self.show_windows(
+            list(hwnds), message="Reset {count} hidden window(s) to visible " "state"
+        )
+
+    def on_close(self):
+        """Stop background work and close the main window"""
+        self.stop_live_updates()
+        self.stop_panic_hotkeys()
+        self.stop_control_server()
+        self.stop_resource_sampling()
+        self.stop_previews()
+        if self.snapshot_worker is not None:
+            self.snapshot_worker.shutdown()
+            self.bulk_engine.shutdown()
+            self.journal.close()
+        self.root.destroy()
+
 
 def main():
+    setup_logging()
     root = tk.Tk()
-    app = TaskbarManager(root)
+    TaskbarManager(root)
     root.mainloop()
 
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,362 @@
+"""
+Window thumbnails.
+
+Titles alone do not tell ten "Untitled - Notepad" windows apart, so the list
+can preview a window's content. Thumbnails captures a window on demand on a
+worker thread, scales it down once and keeps the small image in
+ThumbnailCache, an LRU cache bounded by the bytes its images hold. A capture
+source is any object with capture(hwnd) returning a PIL image or None:
+PrintWindowSource reads real windows on Windows, SyntheticCaptureSource
+draws placeholder images so the cache can be exercised anywhere.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 200)  # largest thumbnail, aspect ratio kept
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # image bytes kept by the cache
+BUDGET_ENV = "TASKBAR_MANAGER_THUMBNAIL_MB"  # overrides DEFAULT_MAX_BYTES
+MAX_AGE = 30.0  # seconds before a visible window's thumbnail is captured again
+
+PW_RENDERFULLCONTENT = 0x2  # PrintWindow flag: include DirectComposition content
+DIB_RGB_COLORS = 0
+BI_RGB = 0
+
+# title is the window title when it was captured; size is the image's bytes
+Thumbnail = namedtuple("Thumbnail", ["hwnd", "image", "title", "captured", "size"])
+
+
+def max_bytes_from_env():
+    """Return the cache budget from TASKBAR_MANAGER_THUMBNAIL_MB, or the default"""
+    value = os.environ.get(BUDGET_ENV)
+    if not value:
+        return DEFAULT_MAX_BYTES
+    try:
+        return int(float(value) * 1024 * 1024)
+    except ValueError:
+        log.warning("Ignoring %s=%r: not a number of megabytes", BUDGET_ENV, value)
+        return DEFAULT_MAX_BYTES
+
+
+def image_bytes(image):
+    """Return the bytes a PIL image's pixels take"""
+    return image.width * image.height * len(image.getbands())
+
+
+class ThumbnailCache:
+    """Thumbnails by hwnd, least recently used dropped first beyond max_bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # hwnd -> Thumbnail, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, hwnd):
+        """Return the Thumbnail of a window, or None"""
+        with self._lock:
+            thumbnail = self._entries.get(hwnd)
+            if thumbnail is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(hwnd)
+            self.hits += 1
+            return thumbnail
+
+    def put(self, thumbnail):
+        """Store a thumbnail, replacing the window's previous one"""
+        with self._lock:
+            old = self._entries.pop(thumbnail.hwnd, None)
+            if old is not None:
+                self.bytes -= old.size
+            if thumbnail.size > self.max_bytes:
+                return
+            self._entries[thumbnail.hwnd] = thumbnail
+            self.bytes += thumbnail.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+
+    def discard(self, hwnd):
+        """Forget the thumbnail of a window"""
+        with self._lock:
+            old = self._entries.pop(hwnd, None)
+            if old is not None:
+                self.bytes -= old.size
+
+    def retain(self, hwnds):
+        """Forget the thumbnails of every window not in hwnds"""
+        with self._lock:
+            for hwnd in [hwnd for hwnd in self._entries if hwnd not in hwnds]:
+                self.bytes -= self._entries.pop(hwnd).size
+
+    def stats(self):
+        """Return the cache counters as a dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class Thumbnails:
+    """Capture, scale and cache window thumbnails off the Tk thread
+
+    request() returns the cached thumbnail of a window at once and, when
+    there is none or it is stale, queues a capture on the worker thread.
+    A thumbnail is stale when the window's title changed or it is older
+    than max_age. Hidden windows are never captured, since there is nothing
+    on screen to read; they keep their last thumbnail however old. Finished
+    captures are passed to deliver(thumbnail); with schedule (for example
+    root.after) deliver runs on the thread that called request().
+    """
+
+    poll_interval = 30  # ms between completion checks when scheduled
+
+    def __init__(
+        self,
+        source,
+        cache=None,
+        size=THUMBNAIL_SIZE,
+        max_age=MAX_AGE,
+        deliver=None,
+        schedule=None,
+    ):
+        self.source = source
+        self.cache = cache if cache is not None else ThumbnailCache()
+        self.size = size
+        self.max_age = max_age
+        self.deliver = deliver
+        self.schedule = schedule
+        self.captures = 0
+        self.capture_time = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = {}  # hwnd -> Future of a capture in flight
+
+    def request(self, window, hidden=False):
+        """Return a WindowRecord's cached Thumbnail, or None; refresh it if stale"""
+        thumbnail = self.cache.get(window.hwnd)
+        if hidden or (thumbnail is not None and not self.is_stale(thumbnail, window)):
+            return thumbnail
+        if window.hwnd not in self._pending:
+            future = self._executor.submit(self.capture, window.hwnd, window.title)
+            self._pending[window.hwnd] = future
+            if self.schedule is not None:
+                self.schedule(
+                    self.poll_interval, lambda: self._poll(window.hwnd, future)
+                )
+            else:
+                future.add_done_callback(
+                    lambda future: self._finish(window.hwnd, future)
+                )
+        return thumbnail
+
+    def is_stale(self, thumbnail, window):
+        return (
+            thumbnail.title != window.title
+            or time.monotonic() - thumbnail.captured > self.max_age
+        )
+
+    def forget(self, hwnds):
+        """Drop the thumbnails of windows that no longer exist"""
+        for hwnd in hwnds:
+            self.cache.discard(hwnd)
+
+    def shutdown(self):
+        for future in self._pending.values():
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+    def capture(self, hwnd, title):
+        """Capture a window on the calling thread and cache its thumbnail
+
+        Returns the Thumbnail, or None if the source could not capture it.
+        """
+        started = time.perf_counter()
+        try:
+            image = self.source.capture(hwnd)
+        except Exception as e:
+            log.debug("Error capturing window %s: %s", hwnd, e)
+            image = None
+        if image is None:
+            return None
+        # Scale down once; the cache and the preview only ever see the small image
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail(self.size)
+        thumbnail = Thumbnail(hwnd, image, title, time.monotonic(), image_bytes(image))
+        self.cache.put(thumbnail)
+        self.captures += 1
+        self.capture_time += time.perf_counter() - started
+        return thumbnail
+
+    def _poll(self, hwnd, future):
+        if not future.done():
+            self.schedule(self.poll_interval, lambda: self._poll(hwnd, future))
+            return
+        self._finish(hwnd, future)
+
+    def _finish(self, hwnd, future):
+        if self._pending.get(hwnd) is future:
+            del self._pending[hwnd]
+        if future.cancelled():
+            return
+        # A failed capture leaves nothing in the cache, so the next request retries
+        thumbnail = future.result()
+        if thumbnail is not None and self.deliver is not None:
+            self.deliver(thumbnail)
+
+    def stats(self):
+        """Return the cache counters with the capture count and mean capture time"""
+        stats = self.cache.stats()
+        stats["captures"] = self.captures
+        stats["capture_ms"] = (
+            self.capture_time / self.captures * 1000 if self.captures else 0.0
+        )
+        return stats
+
+
+class PrintWindowSource:
+    """Capture windows with PrintWindow, which draws them even when covered"""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class BITMAPINFOHEADER(ctypes.Structure):
+            _fields_ = [
+                ("biSize", wintypes.DWORD),
+                ("biWidth", wintypes.LONG),
+                ("biHeight", wintypes.LONG),
+                ("biPlanes", wintypes.WORD),
+                ("biBitCount", wintypes.WORD),
+                ("biCompression", wintypes.DWORD),
+                ("biSizeImage", wintypes.DWORD),
+                ("biXPelsPerMeter", wintypes.LONG),
+                ("biYPelsPerMeter", wintypes.LONG),
+                ("biClrUsed", wintypes.DWORD),
+                ("biClrImportant", wintypes.DWORD),
+            ]
+
+        # Private WinDLLs, so the argtypes set here never affect ctypes.windll
+        user32 = ctypes.WinDLL("user32")
+        gdi32 = ctypes.WinDLL("gdi32")
+        user32.GetWindowRect.argtypes = (wintypes.HWND, ctypes.POINTER(wintypes.RECT))
+        user32.GetWindowRect.restype = wintypes.BOOL
+        user32.GetWindowDC.argtypes = (wintypes.HWND,)
+        user32.GetWindowDC.restype = wintypes.HDC
+        user32.ReleaseDC.argtypes = (wintypes.HWND, wintypes.HDC)
+        user32.PrintWindow.argtypes = (wintypes.HWND, wintypes.HDC, wintypes.UINT)
+        user32.PrintWindow.restype = wintypes.BOOL
+        gdi32.CreateCompatibleDC.argtypes = (wintypes.HDC,)
+        gdi32.CreateCompatibleDC.restype = wintypes.HDC
+        gdi32.CreateCompatibleBitmap.argtypes = (
+            wintypes.HDC,
+            ctypes.c_int,
+            ctypes.c_int,
+        )
+        gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+        gdi32.SelectObject.argtypes = (wintypes.HDC, wintypes.HGDIOBJ)
+        gdi32.SelectObject.restype = wintypes.HGDIOBJ
+        gdi32.GetDIBits.argtypes = (
+            wintypes.HDC,
+            wintypes.HBITMAP,
+            wintypes.UINT,
+            wintypes.UINT,
+            ctypes.c_void_p,
+            ctypes.POINTER(BITMAPINFOHEADER),
+            wintypes.UINT,
+        )
+        gdi32.DeleteObject.argtypes = (wintypes.HGDIOBJ,)
+        gdi32.DeleteDC.argtypes = (wintypes.HDC,)
+        self._user32 = user32
+        self._gdi32 = gdi32
+        self._ctypes = ctypes
+        self._rect = wintypes.RECT
+        self._header = BITMAPINFOHEADER
+
+    def capture(self, hwnd):
+        from PIL import Image
+
+        ctypes, user32, gdi32 = self._ctypes, self._user32, self._gdi32
+        rect = self._rect()
+        if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+            return None
+        width, height = rect.right - rect.left, rect.bottom - rect.top
+        if width <= 0 or height <= 0:
+            return None
+
+        window_dc = user32.GetWindowDC(hwnd)
+        memory_dc = gdi32.CreateCompatibleDC(window_dc)
+        bitmap = gdi32.CreateCompatibleBitmap(window_dc, width, height)
+        previous = gdi32.SelectObject(memory_dc, bitmap)
+        try:
+            if not user32.PrintWindow(hwnd, memory_dc, PW_RENDERFULLCONTENT):
+                return None
+            # A negative height asks for the rows top-down, as PIL expects
+            header = self._header(
+                biSize=ctypes.sizeof(self._header),
+                biWidth=width,
+                biHeight=-height,
+                biPlanes=1,
+                biBitCount=32,
+                biCompression=BI_RGB,
+            )
+            buffer = ctypes.create_string_buffer(width * height * 4)
+            if not gdi32.GetDIBits(
+                memory_dc,
+                bitmap,
+                0,
+                height,
+                buffer,
+                ctypes.byref(header),
+                DIB_RGB_COLORS,
+            ):
+                return None
+            return Image.frombuffer("RGB", (width, height), buffer, "raw", "BGRX", 0, 1)
+        finally:
+            gdi32.SelectObject(memory_dc, previous)
+            gdi32.DeleteObject(bitmap)
+            gdi32.DeleteDC(memory_dc)
+            user32.ReleaseDC(hwnd, window_dc)
+
+
+class SyntheticCaptureSource:
+    """Capture source that draws a flat image per window, for tests and benchmarks
+
+    Every capture of a window returns a size image in a colour derived from
+    its hwnd, after an optional latency in seconds. calls counts captures.
+    """
+
+    def __init__(self, size=(1280, 800), latency=0.0):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+
+    def capture(self, hwnd):
+        from PIL import Image
+
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        color = (hwnd * 7919 % 256, hwnd * 104729 % 256, hwnd * 1299709 % 256)
+        return Image.new("RGB", self.size, color)
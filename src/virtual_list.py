@@ -0,0 +1,501 @@
+"""
+Virtualized window list.
+
+A ttk.Treeview slows down with every item it holds: inserting, tagging and
+scrolling thousands of rows makes refreshes and scrolling sluggish.
+VirtualList keeps the records in a plain Python list and gives the Treeview
+only as many items as fit on screen; scrolling rewrites those items instead
+of moving through real ones. Sorting, filtering and selection work on the
+full list, and the selection is kept by record key so it survives refreshes
+and re-sorting. In grouped mode every group gets a header row that can be
+expanded to show its members or collapsed to hide them; selecting a header
+selects the whole group.
+"""
+
+import tkinter as tk
+from collections import namedtuple
+from operator import attrgetter, itemgetter
+from tkinter import ttk
+
+DEFAULT_ROWS = 20  # visible rows assumed until the widget is laid out
+WHEEL_ROWS = 3  # rows scrolled per mouse wheel notch
+SORT_MARKS = (" ▲", " ▼")  # ascending, descending
+GROUP_MARKS = ("▸ ", "▾ ")  # collapsed, expanded
+
+# Selection key of a group header row, distinct from every record key
+GroupKey = namedtuple("GroupKey", ["group"])
+
+
+class GroupRow:
+    """Header row of a group; members are its shown records in display order"""
+
+    __slots__ = ("group", "members", "values")
+
+    def __init__(self, group):
+        self.group = group
+        self.members = []
+        self.values = None  # summary cells, computed when the row is first drawn
+
+
+class VirtualList(ttk.Frame):
+    """Scrollable, sortable list that renders only the records in view
+
+    columns is a sequence of (name, heading, width). Records are objects
+    with an attribute for every column and a unique value in the key
+    attribute; cells maps a column that is not a record attribute to a
+    function returning its value for a record. A None value shows as an
+    empty cell and sorts last. tag(record) returns the Treeview tag that
+    styles the record's row. Group header rows are tagged "group".
+    """
+
+    def __init__(self, master, columns, key, tag=None, cells=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = tuple(name for name, _, _ in columns)
+        self.headings = {name: heading for name, heading, _ in columns}
+        cells = cells or {}
+        self.cells = {
+            name: cells.get(name) or attrgetter(name) for name in self.columns
+        }
+        self._cell_getters = tuple(self.cells[name] for name in self.columns)
+        self._computed = frozenset(cells)  # columns whose values come from cells
+        self.key = key
+        self.key_of = attrgetter(key)
+        self.tag = tag
+        self.all_records = []  # every record, in sort order
+        self.records = []  # the records shown, in display order
+        self.positions = {}  # key -> index in records
+        self.filter_keys = None  # keys to show, or None to show every record
+        self.selected = set()  # keys of the selected records
+        self.anchor = None  # key a Shift selection extends from
+        self.cursor = None  # key moved by the arrow keys
+        self.sort_column = None
+        self.sort_descending = False
+        self.group_of = None  # record -> group, while grouped
+        self.summarize = None  # (group, members) -> header cells, while grouped
+        self.groups = {}  # group -> GroupRow, while grouped
+        self.expanded = set()  # groups whose members are shown
+        self.first = 0  # index of the record in the top row
+        self.rows = DEFAULT_ROWS
+        self._items = []  # Treeview item per visible row
+        self._shown = []  # (values, tags) last written to each item
+
+        self.tree = ttk.Treeview(
+            self, columns=self.columns, show="headings", height=DEFAULT_ROWS
+        )
+        for name, heading, width in columns:
+            self.tree.heading(
+                name, text=heading, command=lambda name=name: self.sort_by(name)
+            )
+            self.tree.column(name, width=width)
+        self.tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(fill=tk.Y, side=tk.RIGHT)
+
+        # Widget bindings run before the Treeview class bindings; returning
+        # "break" keeps the Treeview from selecting or scrolling its own items
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<Button-1>", lambda event: self._on_click(event, "set"))
+        self.tree.bind(
+            "<Control-Button-1>", lambda event: self._on_click(event, "toggle")
+        )
+        self.tree.bind(
+            "<Shift-Button-1>", lambda event: self._on_click(event, "extend")
+        )
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda event: self._scroll(WHEEL_ROWS))
+        for sequence, move in (
+            ("Up", -1),
+            ("Down", 1),
+            ("Prior", "-page"),
+            ("Next", "page"),
+            ("Home", "home"),
+            ("End", "end"),
+        ):
+            self.tree.bind(
+                f"<{sequence}>", lambda event, move=move: self._on_key(move, "set")
+            )
+            self.tree.bind(
+                f"<Shift-{sequence}>",
+                lambda event, move=move: self._on_key(move, "extend"),
+            )
+        self.tree.bind("<Control-a>", lambda event: self.select_all() or "break")
+        self.tree.bind("<Double-Button-1>", self._on_double_click)
+        self.tree.bind("<Left>", lambda event: self._on_expand_key(False))
+        self.tree.bind("<Right>", lambda event: self._on_expand_key(True))
+        self.render()
+
+    def set_records(self, records):
+        """Replace every record; returns the number of rows rewritten on screen"""
+        self.all_records = list(records)
+        if self.sort_column is not None:
+            self._sort()
+        self._refilter()
+        return self.render()
+
+    def update_records(self, changed=(), removed=()):
+        """Add or replace changed records and drop removed keys
+
+        Returns the number of rows rewritten on screen.
+        """
+        removed = set(removed)
+        key_of = self.key_of
+        changed = {key_of(record): record for record in changed}
+        records = [
+            changed.pop(key_of(record), record)
+            for record in self.all_records
+            if key_of(record) not in removed
+        ]
+        records.extend(changed.values())
+        self.all_records = records
+        if self.sort_column is not None:
+            self._sort()
+        self._refilter()
+        return self.render()
+
+    def set_filter(self, keys):
+        """Show only the records whose key is in keys; None shows every record
+
+        Selected records that are filtered out are deselected, so actions on
+        the selection never reach rows the user cannot see.
+        """
+        self.filter_keys = keys
+        self.first = 0
+        self._refilter()
+        return self.render()
+
+    def set_grouping(self, group_of, summarize=None):
+        """Group the records by group_of(record); None shows a flat list again
+
+        summarize(group, members) returns the header cells of a group, one
+        per column; the first cell is prefixed with an expand/collapse mark.
+        Groups start collapsed and appear in the order of their first
+        member, so sorting orders the groups too.
+        """
+        self.group_of = group_of
+        self.summarize = summarize
+        self.first = 0
+        self._refilter()
+        return self.render()
+
+    def set_expanded(self, group, expanded):
+        """Show or hide the members of a group"""
+        if expanded:
+            self.expanded.add(group)
+        else:
+            self.expanded.discard(group)
+        self._refilter()
+        self.render()
+
+    def _refilter(self):
+        keys = self.filter_keys
+        if keys is None:
+            records = self.all_records
+        else:
+            key_of = self.key_of
+            records = [record for record in self.all_records if key_of(record) in keys]
+        self.records = records if self.group_of is None else self._group(records)
+        self._reindex()
+        self.selected = {key for key in self.selected if key in self.positions}
+
+    def _group(self, records):
+        """Return the display rows for records: each group's header, then its members"""
+        group_of = self.group_of
+        groups = {}
+        for record in records:
+            group = group_of(record)
+            row = groups.get(group)
+            if row is None:
+                row = groups[group] = GroupRow(group)
+            row.members.append(record)
+        self.groups = groups
+
+        rows = []
+        for group, row in groups.items():
+            rows.append(row)
+            if group in self.expanded:
+                rows.extend(row.members)
+        return rows
+
+    def row_key(self, row):
+        """Return the selection key of a display row"""
+        if isinstance(row, GroupRow):
+            return GroupKey(row.group)
+        return self.key_of(row)
+
+    def sort_by(self, column, descending=None):
+        """Sort every record by a column; by default a second call reverses the order"""
+        if descending is None:
+            descending = column == self.sort_column and not self.sort_descending
+        if self.sort_column is not None:
+            self.tree.heading(self.sort_column, text=self.headings[self.sort_column])
+        self.sort_column = column
+        self.sort_descending = descending
+        self.tree.heading(column, text=self.headings[column] + SORT_MARKS[descending])
+        self._sort()
+        self._refilter()
+        self.render()
+
+    def _sort(self):
+        get = self.cells[self.sort_column]
+        present = []
+        missing = []
+        for record in self.all_records:
+            value = get(record)
+            if value is None:
+                missing.append(record)
+            else:
+                present.append(
+                    (value.lower() if isinstance(value, str) else value, record)
+                )
+
+        # Python's sort is stable, so ties keep the order the records came in
+        present.sort(key=itemgetter(0), reverse=self.sort_descending)
+        self.all_records = [record for _, record in present] + missing
+
+    def show_columns(self, columns):
+        """Show only the given columns, in that order; the others keep their values"""
+        self.tree.configure(displaycolumns=tuple(columns))
+
+    def refresh(self):
+        """Re-read the cells of the records in view after cell values changed
+
+        Group headers are summarized again; when the list is sorted by a
+        column computed through cells, it is sorted again too.
+        """
+        if self.sort_column is not None and self.sort_column in self._computed:
+            self._sort()
+            self._refilter()
+        else:
+            for row in self.groups.values():
+                row.values = None
+        return self.render()
+
+    def _reindex(self):
+        key_of = self.key_of if self.group_of is None else self.row_key
+        self.positions = {
+            key_of(record): index for index, record in enumerate(self.records)
+        }
+
+    def selection(self):
+        """Return the keys of the selected rows in display order
+
+        A selected group header appears as a GroupKey.
+        """
+        return sorted(self.selected, key=self.positions.__getitem__)
+
+    def selected_records(self):
+        """Return the selected records in display order, with groups as their members"""
+        records = []
+        seen = set()
+        for key in self.selection():
+            if isinstance(key, GroupKey):
+                members = self.groups[key.group].members
+            else:
+                members = (self.records[self.positions[key]],)
+            for record in members:
+                record_key = self.key_of(record)
+                if record_key not in seen:
+                    seen.add(record_key)
+                    records.append(record)
+        return records
+
+    def select(self, keys):
+        """Select exactly the given keys"""
+        self.selected = {key for key in keys if key in self.positions}
+        self.render()
+
+    def select_all(self):
+        self.selected = set(self.positions)
+        self.render()
+
+    def select_index(self, index, mode="set"):
+        """Select the record at a display index
+
+        mode "set" selects only that record, "toggle" adds or removes it and
+        "extend" selects the range from the anchor to it.
+        """
+        key = self.row_key(self.records[index])
+        anchor = self.positions.get(self.anchor)
+        if mode == "toggle":
+            self.selected ^= {key}
+            self.anchor = key
+        elif mode == "extend" and anchor is not None:
+            low, high = sorted((anchor, index))
+            self.selected = set(map(self.row_key, self.records[low : high + 1]))
+        else:
+            self.selected = {key}
+            self.anchor = key
+        self.cursor = key
+        self.see(index)
+        self.render()
+
+    def see(self, index):
+        """Scroll so the record at a display index is in view"""
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.rows:
+            self.first = index - self.rows + 1
+
+    def yview(self, *args):
+        """Scrollbar protocol: report or change the visible fraction"""
+        count = len(self.records)
+        if not args:
+            if not count:
+                return 0.0, 1.0
+            return self.first / count, min(1.0, (self.first + self.rows) / count)
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * count)
+        elif args[0] == "scroll":
+            self.first += int(args[1]) * (self.rows if args[2] == "pages" else 1)
+        self.render()
+
+    def _scroll(self, rows):
+        self.first += rows
+        self.render()
+        return "break"
+
+    def render(self):
+        """Write the records in view to the Treeview items
+
+        Only rows whose cells or tags changed are touched, so the Tk cost of a
+        refresh or a scroll step is bounded by the number of visible rows.
+        Returns the number of rows rewritten.
+        """
+        count = len(self.records)
+        self.first = max(0, min(self.first, count - self.rows))
+        self._fit_items()
+
+        touched = 0
+        selection = []
+        for row, item in enumerate(self._items):
+            index = self.first + row
+            if index < count:
+                record = self.records[index]
+                if isinstance(record, GroupRow):
+                    values = self._group_values(record)
+                    tags = ("group",)
+                    key = GroupKey(record.group)
+                else:
+                    values = tuple(
+                        "" if value is None else value
+                        for value in (get(record) for get in self._cell_getters)
+                    )
+                    tags = (self.tag(record),) if self.tag is not None else ()
+                    key = self.key_of(record)
+                if key in self.selected:
+                    selection.append(item)
+            else:
+                values, tags = (), ()
+            if self._shown[row] != (values, tags):
+                self.tree.item(item, values=values, tags=tags)
+                self._shown[row] = (values, tags)
+                touched += 1
+
+        if set(selection) != set(self.tree.selection()):
+            self.tree.selection_set(selection)
+        self.scrollbar.set(*self.yview())
+        return touched
+
+    def _group_values(self, row):
+        if row.values is None:
+            if self.summarize is not None:
+                cells = list(self.summarize(row.group, row.members))
+            else:
+                cells = [row.group, len(row.members)] + [""] * (len(self.columns) - 2)
+            cells[0] = GROUP_MARKS[row.group in self.expanded] + str(cells[0])
+            row.values = tuple("" if cell is None else cell for cell in cells)
+        return row.values
+
+    def _fit_items(self):
+        """Keep exactly one Treeview item per visible row"""
+        if len(self._items) == self.rows:
+            return
+        while len(self._items) < self.rows:
+            item = self.tree.insert("", tk.END, iid=f"row{len(self._items)}", values=())
+            self._items.append(item)
+            self._shown.append(((), ()))
+        if len(self._items) > self.rows:
+            self.tree.delete(*self._items[self.rows :])
+            del self._items[self.rows :]
+            del self._shown[self.rows :]
+        self.tree.yview_moveto(0)
+
+    def _on_configure(self, event):
+        # Row geometry is only known once the Treeview has laid itself out
+        self.after_idle(self._fit_rows, event.height)
+
+    def _fit_rows(self, height):
+        """Resize the item pool to the number of rows that fit in height pixels"""
+        bbox = self.tree.bbox(self._items[0]) if self._items else ""
+        if not bbox:
+            return
+        # bbox is (x, y, width, height); y is below the headings
+        rows = max(1, (height - bbox[1]) // bbox[3])
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def index_at(self, y):
+        """Return the display index of the row at a y coordinate, or None"""
+        item = self.tree.identify_row(y)
+        if not item or item not in self._items:
+            return None
+        index = self.first + self._items.index(item)
+        return index if index < len(self.records) else None
+
+    def _on_click(self, event, mode):
+        if self.tree.identify_region(event.x, event.y) in ("heading", "separator"):
+            return None  # let the Treeview sort or resize columns
+        self.tree.focus_set()
+        index = self.index_at(event.y)
+        if index is not None:
+            self.select_index(index, mode)
+        return "break"
+
+    def _on_double_click(self, event):
+        index = self.index_at(event.y)
+        if index is not None and isinstance(self.records[index], GroupRow):
+            group = self.records[index].group
+            self.set_expanded(group, group not in self.expanded)
+            return "break"
+        return None
+
+    def _on_expand_key(self, expanded):
+        """Expand or collapse the group at the cursor, its header or a member"""
+        index = self.positions.get(self.cursor)
+        if self.group_of is None or index is None:
+            return None
+        row = self.records[index]
+        group = row.group if isinstance(row, GroupRow) else self.group_of(row)
+        self.set_expanded(group, expanded)
+        # Collapsing from a member moves the cursor to the group's header
+        header = self.positions[GroupKey(group)]
+        if index != header and not expanded:
+            self.select_index(header)
+        return "break"
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll(-notches * WHEEL_ROWS)
+
+    def _on_key(self, move, mode):
+        if not self.records:
+            return "break"
+        current = self.positions.get(self.cursor)
+        if move == "home":
+            index = 0
+        elif move == "end":
+            index = len(self.records) - 1
+        elif current is None:
+            index = self.first
+        elif move == "page":
+            index = current + self.rows
+        elif move == "-page":
+            index = current - self.rows
+        else:
+            index = current + move
+        self.select_index(max(0, min(index, len(self.records) - 1)), mode)
+        return "break"
@@ -0,0 +1,337 @@
+"""
+Live window tracking.
+
+Instead of re-enumerating every window, WindowTracker listens to window
+events (create, destroy, name change, show, hide) from an event source and
+re-describes only the windows they mention. Bursts are coalesced: events are
+collected per hwnd and applied together on the next flush, so a window that
+changes title fifty times in a frame costs one update. Events about child
+windows are dropped on the hook thread, and in the GUI the coalesced windows
+are described on the tracker's own thread, so only finished records reach
+the Tk loop.
+
+WinEventSource reads events from SetWinEventHook on Windows;
+ScriptedEventSource replays a list of events and lets the tracker be driven
+and benchmarked anywhere.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .snapshot import describe_window
+
+# kind is one of "create", "destroy", "name_change", "show", "hide"
+WindowEvent = namedtuple("WindowEvent", ["kind", "hwnd"])
+
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+GA_ROOT = 2
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+WM_QUIT = 0x0012
+
+EVENT_KINDS = {
+    EVENT_OBJECT_CREATE: "create",
+    EVENT_OBJECT_DESTROY: "destroy",
+    EVENT_OBJECT_SHOW: "show",
+    EVENT_OBJECT_HIDE: "hide",
+    EVENT_OBJECT_NAMECHANGE: "name_change",
+}
+
+log = logging.getLogger(__name__)
+
+
+class WinEventSource:
+    """Window events from SetWinEventHook, received on a private thread
+
+    Out-of-context hooks are delivered through the message queue of the
+    thread that installed them, so the hook thread runs its own message loop.
+    Only top-level windows are reported; a destroyed window can no longer be
+    checked, so every destroy is passed on.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._thread_id = None
+        self._callback = None
+        self._ready = threading.Event()
+
+    def start(self, callback):
+        """Install the hooks and call callback(event) for every window event"""
+        self._callback = callback
+        self._ready.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="win-event-hook", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        """Remove the hooks and end the hook thread"""
+        if self._thread is None:
+            return
+        import ctypes
+
+        ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread.join(5)
+        self._thread = None
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.HMODULE,
+            WinEventProc,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        ]
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        user32.GetAncestor.restype = wintypes.HWND
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+
+        def handle(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            if hwnd and id_object == OBJID_WINDOW and id_child == CHILDID_SELF:
+                kind = EVENT_KINDS.get(event)
+                # Controls fire most of these events; only top-level windows are listed
+                if kind is not None and (
+                    kind == "destroy" or user32.GetAncestor(hwnd, GA_ROOT) == hwnd
+                ):
+                    self._callback(WindowEvent(kind, hwnd))
+
+        # Keep a reference to the callback for as long as the hooks exist
+        proc = WinEventProc(handle)
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        hooks = [
+            user32.SetWinEventHook(
+                EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE, None, proc, 0, 0, flags
+            ),
+            user32.SetWinEventHook(
+                EVENT_OBJECT_NAMECHANGE,
+                EVENT_OBJECT_NAMECHANGE,
+                None,
+                proc,
+                0,
+                0,
+                flags,
+            ),
+        ]
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        self._ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+
+
+class ScriptedEventSource:
+    """Replay a scripted list of WindowEvents from a background thread
+
+    rate limits delivery to that many events per second; None replays as
+    fast as possible. wait() blocks until the whole script was delivered.
+    """
+
+    def __init__(self, events, rate=None):
+        self.events = list(events)
+        self.rate = rate
+        self._thread = None
+        self._stopped = threading.Event()
+        self._done = threading.Event()
+
+    def start(self, callback):
+        self._stopped.clear()
+        self._done.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(callback,), name="scripted-events", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, timeout=None):
+        """Block until every scripted event was delivered"""
+        return self._done.wait(timeout)
+
+    def _run(self, callback):
+        started = time.perf_counter()
+        for index, event in enumerate(self.events):
+            if self._stopped.is_set():
+                break
+            if self.rate:
+                delay = started + index / self.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            callback(event)
+        self._done.set()
+
+
+class WindowTracker:
+    """Keep a window index current from window events
+
+    Events may arrive on any thread; they are coalesced per hwnd and applied
+    by flush(), which describes the windows on the calling thread. When
+    schedule (for example root.after) is given, the events queued every
+    coalesce_ms are described on the tracker's own thread instead and the
+    records applied on the thread that called start(), so the scheduling
+    thread never waits for the backend. Each flush calls
+    on_change(changed, removed) with the WindowRecords that were added or
+    updated and the hwnds that left the list.
+    """
+
+    def __init__(
+        self,
+        backend,
+        source,
+        hidden_windows=(),
+        on_change=None,
+        schedule=None,
+        coalesce_ms=50,
+    ):
+        self.backend = backend
+        self.source = source
+        self.hidden_windows = hidden_windows
+        self.on_change = on_change
+        self.schedule = schedule
+        self.coalesce_ms = coalesce_ms
+        self.windows = {}  # hwnd -> WindowRecord, for every listed window
+        self.events_received = 0
+        self.events_applied = 0
+        self.flushes = 0
+        self.flush_time = 0.0
+        self._pending = {}  # hwnd -> last event kind since the previous flush
+        self._lock = threading.Lock()
+        self._running = False
+        self._executor = None
+        self._describing = None  # Future of the scheduled describe in flight
+
+    def seed(self, windows):
+        """Reset the index from a full snapshot"""
+        self.windows = {window.hwnd: window for window in windows}
+
+    def start(self):
+        self._running = True
+        self.source.start(self.post)
+        if self.schedule is not None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="window-tracker"
+            )
+            self.schedule(self.coalesce_ms, self._tick)
+
+    def stop(self):
+        self._running = False
+        self.source.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._describing = None
+
+    def post(self, event):
+        """Queue an event; safe to call from any thread"""
+        with self._lock:
+            self.events_received += 1
+            self._pending[event.hwnd] = event.kind
+
+    def flush(self):
+        """Apply queued events and return (changed, removed)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return [], []
+        return self._apply(self._describe(pending, self.hidden_windows))
+
+    def _describe(self, pending, hidden_windows):
+        """Return [(hwnd, WindowRecord or None)] for the queued events"""
+        started = time.perf_counter()
+        described = []
+        for hwnd, kind in pending.items():
+            window = None
+            if kind != "destroy":
+                try:
+                    window = describe_window(self.backend, hwnd, hidden_windows)
+                except Exception:
+                    window = None
+            described.append((hwnd, window))
+        self.flush_time += time.perf_counter() - started
+        return described
+
+    def _apply(self, described):
+        changed = []
+        removed = []
+        for hwnd, window in described:
+            if window is None:
+                if self.windows.pop(hwnd, None) is not None:
+                    removed.append(hwnd)
+            elif self.windows.get(hwnd) != window:
+                self.windows[hwnd] = window
+                changed.append(window)
+
+        self.events_applied += len(described)
+        self.flushes += 1
+
+        if (changed or removed) and self.on_change is not None:
+            self.on_change(changed, removed)
+        return changed, removed
+
+    def stats(self):
+        """Return event counters; applied_per_sec is measured over flush time only"""
+        return {
+            "events_received": self.events_received,
+            "events_applied": self.events_applied,
+            "flushes": self.flushes,
+            "flush_time": self.flush_time,
+            "applied_per_sec": (
+                self.events_applied / self.flush_time if self.flush_time else 0.0
+            ),
+        }
+
+    def _tick(self):
+        if not self._running:
+            return
+        describing = self._describing
+        if describing is not None and describing.done():
+            self._describing = None
+            if describing.exception() is not None:
+                log.error("Error describing windows", exc_info=describing.exception())
+            else:
+                self._apply(describing.result())
+        if self._describing is None:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if pending:
+                # Events arriving meanwhile wait for the next tick
+                self._describing = self._executor.submit(
+                    self._describe, pending, frozenset(self.hidden_windows)
+                )
+        self.schedule(self.coalesce_ms, self._tick)
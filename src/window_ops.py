@@ -0,0 +1,643 @@
+"""
+Hide and show operations.
+
+Hiding a window is a sequence of Win32 steps, some followed by a short pause
+while the window settles. BulkWindowEngine runs the sequences for many
+windows at once: steps execute on a thread pool, pauses are asyncio timers,
+so a bulk operation takes about as long as its slowest window rather than
+the sum of all of them. With a StrategyCache the engine starts from the
+strategy learned for each application and escalates only when verification
+shows the window is still listed. With a HiddenJournal every hide is logged
+before the window is touched, so hidden windows survive a crash.
+
+Closing posts WM_CLOSE and then follows each window until it is destroyed or
+its process exits; an application that ignores the request can have its
+process terminated once a timeout passes.
+
+arrange() switches between layouts: it hides and shows windows like the bulk
+actions, then moves, sizes and restacks the visible ones in a single deferred
+batch, so the desktop repaints once instead of once per window.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .backends import (
+    GWL_EXSTYLE,
+    HWND_BOTTOM,
+    HWND_TOP,
+    LWA_ALPHA,
+    SW_HIDE,
+    SW_MINIMIZE,
+    SW_NORMAL,
+    SW_RESTORE,
+    SW_SHOW,
+    SWP_NOACTIVATE,
+    SWP_NOSIZE,
+    SWP_SHOWWINDOW,
+    WM_CLOSE,
+    WS_EX_LAYERED,
+    WS_EX_TOOLWINDOW,
+)
+from .hide_strategy import HIDE_STRATEGIES
+from .instrumentation import metrics
+from .journal import capture_entry
+from .snapshot import is_alt_tab_window
+
+# One step of a sequence: pause is the delay in seconds after the step, and a
+# failing optional step is skipped instead of failing the whole sequence.
+Step = namedtuple("Step", ["name", "call", "pause", "optional"])
+
+# Outcome for one window; error is the exception that stopped its sequence
+WindowResult = namedtuple("WindowResult", ["hwnd", "ok", "elapsed", "error"])
+
+# Outcome of closing one window: a WindowResult with outcome one of "closed"
+# (the window was destroyed), "exited" (its process ended), "terminated" (its
+# process was terminated after the timeout), "timeout" or "failed"
+CloseResult = namedtuple("CloseResult", WindowResult._fields + ("outcome",))
+
+# Outcome of a bulk operation; elapsed is the total wall time in seconds
+BulkResult = namedtuple("BulkResult", ["action", "results", "elapsed"])
+
+# Outcome of arrange(): a list of WindowResults for each part
+LayoutResult = namedtuple("LayoutResult", ["hidden", "shown", "placed", "elapsed"])
+
+# Hide steps that only read the window; the steps after them change it
+READ_ONLY_STEPS = ("check", "save_state")
+
+SETTLE_PAUSE = 0.05  # seconds to let a window settle between hide steps
+CLOSE_TIMEOUT = 5.0  # seconds an application gets to close a window
+
+# How close_summary() words each outcome
+CLOSE_OUTCOMES = {
+    "closed": "closed",
+    "exited": "process exited",
+    "terminated": "terminated",
+    "timeout": "still open",
+    "failed": "failed",
+}
+
+log = logging.getLogger(__name__)
+
+
+def hide_strategy_steps(backend, hwnd, window_positions, strategy, journal=None):
+    """Build the steps a hide strategy adds on top of the weaker strategies
+
+    The original rect is stored in window_positions so show_steps can put
+    the window back where it was, and logged to journal when one is given.
+    """
+
+    def check():
+        if not backend.is_window(hwnd):
+            raise LookupError(f"window {hwnd} no longer exists")
+
+    def save_state():
+        if journal is None:
+            window_positions[hwnd] = backend.get_window_rect(hwnd)
+            return
+        # A window that is already hidden keeps the state from before its first hide
+        entry = journal.entries.get(hwnd)
+        if entry is None:
+            entry = capture_entry(backend, hwnd)
+            journal.record_hide(entry)
+        window_positions[hwnd] = entry.rect
+
+    def add_ex_style(flag):
+        def call():
+            ex_style = backend.get_window_long(hwnd, GWL_EXSTYLE)
+            backend.set_window_long(hwnd, GWL_EXSTYLE, ex_style | flag)
+
+        return call
+
+    if strategy == "hide":
+        return [
+            Step("check", check, 0, False),
+            Step("save_state", save_state, 0, True),
+            # First try with standard hiding
+            Step(
+                "hide", lambda: backend.show_window(hwnd, SW_HIDE), SETTLE_PAUSE, False
+            ),
+        ]
+    if strategy == "minimize":
+        # Minimize then hide again (works better for some windows)
+        return [
+            Step(
+                "minimize",
+                lambda: backend.show_window(hwnd, SW_MINIMIZE),
+                SETTLE_PAUSE,
+                False,
+            ),
+            Step("hide_again", lambda: backend.show_window(hwnd, SW_HIDE), 0, False),
+        ]
+    if strategy == "tool_window":
+        # Make window a tool window so it doesn't show in taskbar
+        return [Step("tool_window", add_ex_style(WS_EX_TOOLWINDOW), 0, False)]
+    if strategy == "full":
+        return [
+            # Enable layered window and make it fully transparent
+            Step("layered", add_ex_style(WS_EX_LAYERED), 0, False),
+            Step(
+                "transparent",
+                lambda: backend.set_layered_window_attributes(hwnd, 0, 0, LWA_ALPHA),
+                0,
+                False,
+            ),
+            # Move far off-screen
+            Step(
+                "move_offscreen",
+                lambda: backend.set_window_pos(
+                    hwnd, HWND_BOTTOM, -32000, -32000, 0, 0, SWP_NOSIZE | SWP_NOACTIVATE
+                ),
+                0,
+                False,
+            ),
+            Step("disable", lambda: backend.enable_window(hwnd, False), 0, False),
+        ]
+    raise ValueError(f"unknown hide strategy: {strategy}")
+
+
+def hide_steps(backend, hwnd, window_positions, up_to="full", journal=None):
+    """Build the step sequence that hides a window with every strategy up to up_to"""
+    steps = []
+    for strategy in HIDE_STRATEGIES[: HIDE_STRATEGIES.index(up_to) + 1]:
+        steps.extend(
+            hide_strategy_steps(backend, hwnd, window_positions, strategy, journal)
+        )
+    return steps
+
+
+def show_steps(backend, hwnd, window_positions, ex_style=None):
+    """Build the step sequence that restores a hidden window
+
+    ex_style is the extended style from before the hide, if it is known;
+    otherwise only the tool window flag is removed. Every step is optional: a
+    window that refuses one of them is still shown as far as possible.
+    """
+
+    def restore_opacity():
+        if backend.get_window_long(hwnd, GWL_EXSTYLE) & WS_EX_LAYERED:
+            backend.set_layered_window_attributes(hwnd, 0, 255, LWA_ALPHA)
+
+    def reposition():
+        if hwnd in window_positions:
+            rect = window_positions[hwnd]
+            backend.set_window_pos(
+                hwnd,
+                HWND_TOP,
+                rect[0],
+                rect[1],  # Original position
+                rect[2] - rect[0],
+                rect[3] - rect[1],  # Original size
+                SWP_SHOWWINDOW,
+            )
+        else:
+            backend.set_window_pos(
+                hwnd, HWND_TOP, 100, 100, 0, 0, SWP_NOSIZE | SWP_SHOWWINDOW
+            )
+
+    def restore_style():
+        if ex_style is not None:
+            backend.set_window_long(hwnd, GWL_EXSTYLE, ex_style)
+            return
+        current = backend.get_window_long(hwnd, GWL_EXSTYLE)
+        backend.set_window_long(hwnd, GWL_EXSTYLE, current & ~WS_EX_TOOLWINDOW)
+
+    def show():
+        backend.show_window(hwnd, SW_RESTORE)
+        backend.show_window(hwnd, SW_SHOW)
+        backend.show_window(hwnd, SW_NORMAL)
+
+    return [
+        Step("enable", lambda: backend.enable_window(hwnd, True), 0, True),
+        Step("restore_opacity", restore_opacity, 0, True),
+        Step("reposition", reposition, 0, True),
+        Step("restore_style", restore_style, 0, True),
+        Step("show", show, 0, True),
+    ]
+
+
+def close_summary(result):
+    """Describe a close BulkResult: how many closed, how long it took and what
+    happened to the rest, e.g.
+    "Closed 3 of 4 window(s) in 420 ms (3 closed, 1 still open)"
+    """
+    counts = Counter(window.outcome for window in result.results)
+    closed = sum(window.ok for window in result.results)
+    text = (
+        f"Closed {closed} of {len(result.results)} window(s) "
+        f"in {result.elapsed * 1000:.0f} ms"
+    )
+    if set(counts) - {"closed"}:
+        text += (
+            " ("
+            + ", ".join(
+                f"{counts[outcome]} {label}"
+                for outcome, label in CLOSE_OUTCOMES.items()
+                if counts[outcome]
+            )
+            + ")"
+        )
+    return text
+
+
+class BulkWindowEngine:
+    """Run hide/show/close step sequences for many windows concurrently
+
+    Sequences are driven by an asyncio loop on a private thread. Each step is
+    handed to a thread pool, so a window whose owner is slow to answer only
+    delays itself, and pauses are timers that never block a thread. When
+    schedule (for example root.after) is given, completion callbacks run on
+    the thread that submitted the operation.
+    """
+
+    poll_interval = 15  # ms between completion checks when scheduled
+    verify_timeout = 0.1  # seconds to wait for a window to leave the Alt+Tab set
+    verify_interval = 0.01
+    close_timeout = CLOSE_TIMEOUT
+    close_interval = 0.05  # seconds between checks whether a closing window is gone
+    terminate_timeout = 2.0  # seconds to wait for a terminated process to go
+
+    def __init__(
+        self,
+        backend,
+        window_positions=None,
+        max_workers=16,
+        schedule=None,
+        strategies=None,
+        journal=None,
+    ):
+        self.backend = backend
+        self.window_positions = window_positions if window_positions is not None else {}
+        self.schedule = schedule
+        self.strategies = strategies
+        self.journal = journal
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def steps_for(self, action, hwnd):
+        """Return the step sequence for an action ("hide" or "show")"""
+        if action == "hide":
+            return hide_steps(
+                self.backend, hwnd, self.window_positions, journal=self.journal
+            )
+        if action == "show":
+            entry = self.journal.entries.get(hwnd) if self.journal is not None else None
+            return show_steps(
+                self.backend,
+                hwnd,
+                self.window_positions,
+                entry.ex_style if entry is not None else None,
+            )
+        raise ValueError(f"unknown action: {action}")
+
+    def submit(self, action, hwnds, callback=None):
+        """Start an action on a set of windows and return a Future for the BulkResult
+
+        action is "hide", "show" or "close" (see close() for its options).
+        callback(result) is called once every window has finished.
+        """
+        if action == "close":
+            return self.close(hwnds, callback=callback)
+        return self._start(self._run(action, self._runs(action, hwnds)), callback)
+
+    def close(self, hwnds, terminate=False, timeout=None, callback=None):
+        """Close windows and follow each until it is gone; returns a Future
+
+        The BulkResult holds a CloseResult per window. A window counts as
+        closed once it is destroyed or its process exits. After timeout
+        seconds (close_timeout by default) a window that is still there
+        either fails with outcome "timeout" or, with terminate=True, has its
+        process terminated. Never terminates this process.
+        """
+        timeout = self.close_timeout if timeout is None else timeout
+        runs = [self._close_tracked(hwnd, terminate, timeout) for hwnd in hwnds]
+        return self._start(self._run("close", runs), callback)
+
+    def arrange(self, hide, show, placements, callback=None):
+        """Hide and show windows, then place windows in one batch; returns a Future
+
+        hide and show run concurrently, as submit() runs them. placements
+        are set_window_pos argument tuples, applied by place() once every
+        hide and show has finished. The result is a LayoutResult.
+        """
+        return self._start(self._arrange(hide, show, placements), callback)
+
+    def place(self, placements):
+        """Apply set_window_pos argument tuples in one deferred batch
+
+        Returns a WindowResult for each placement.
+
+        If the batch fails, for example because a window closed meanwhile,
+        the windows are placed one at a time so the others still move.
+        """
+        started = time.perf_counter()
+        try:
+            self.backend.defer_window_positions(placements)
+        except Exception as e:
+            log.debug("Deferred placement of %d windows failed: %s", len(placements), e)
+        else:
+            elapsed = time.perf_counter() - started
+            return [
+                WindowResult(placement[0], True, elapsed, None)
+                for placement in placements
+            ]
+
+        results = []
+        for placement in placements:
+            started = time.perf_counter()
+            try:
+                self.backend.set_window_pos(*placement)
+            except Exception as e:
+                log.warning("Error placing window %s: %s", placement[0], e)
+                results.append(
+                    WindowResult(placement[0], False, time.perf_counter() - started, e)
+                )
+            else:
+                results.append(
+                    WindowResult(
+                        placement[0], True, time.perf_counter() - started, None
+                    )
+                )
+        return results
+
+    def _start(self, coroutine, callback):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+        if callback is not None:
+            if self.schedule is not None:
+                self.schedule(self.poll_interval, lambda: self._poll(future, callback))
+            else:
+                future.add_done_callback(lambda done: callback(done.result()))
+        return future
+
+    def run(self, action, hwnds, timeout=None):
+        """Run an action on a set of windows and wait for the BulkResult"""
+        return self.submit(action, hwnds).result(timeout)
+
+    def shutdown(self):
+        """Stop the event loop and the step thread pool"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+        self._executor.shutdown(wait=False)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="bulk-window-engine", daemon=True
+                )
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _runs(self, action, hwnds):
+        """Return the coroutines that hide or show each window"""
+        if action == "hide" and self.strategies is not None:
+            return [self._hide_adaptive(hwnd) for hwnd in hwnds]
+        if action == "hide":
+            return [self._hide_fixed(hwnd) for hwnd in hwnds]
+        return [
+            self._run_sequence(hwnd, self.steps_for(action, hwnd)) for hwnd in hwnds
+        ]
+
+    async def _run(self, action, runs):
+        started = time.perf_counter()
+        results = await asyncio.gather(*runs)
+        if self.journal is not None and action in ("show", "close"):
+            # A window that is still open stays hidden, so it keeps its entry
+            for result in results:
+                if action == "show" or result.ok:
+                    self.journal.record_show(result.hwnd)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._persist)
+        elapsed = time.perf_counter() - started
+        metrics.record(f"bulk.{action}", elapsed)
+        return BulkResult(action, list(results), elapsed)
+
+    async def _arrange(self, hide, show, placements):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *self._runs("hide", hide), *self._runs("show", show)
+        )
+        hidden, shown = list(results[: len(hide)]), list(results[len(hide) :])
+        if self.journal is not None:
+            for result in shown:
+                self.journal.record_show(result.hwnd)
+        placed = []
+        if placements:
+            placed = await loop.run_in_executor(
+                self._executor, metrics.wrap("layout.place", self.place), placements
+            )
+        await loop.run_in_executor(self._executor, self._persist)
+        elapsed = time.perf_counter() - started
+        metrics.record("bulk.arrange", elapsed)
+        return LayoutResult(hidden, shown, placed, elapsed)
+
+    def _forget_failed_hide(self, hwnd, journaled, completed):
+        """Drop the journal entry of a hide that failed before touching the window
+
+        The entry is written before the window is touched, and a window that
+        was never changed must not be "restored" after a crash. Once any step
+        changed the window the entry stays, so the window can still be shown
+        again; so does the entry of a window journaled by an earlier hide.
+        """
+        if self.journal is None or journaled:
+            return
+        if any(name not in READ_ONLY_STEPS for name in completed):
+            return
+        self.journal.record_show(hwnd)
+
+    def _persist(self):
+        """Save learned strategies and fsync the journal once per bulk operation"""
+        if self.strategies is not None:
+            self.strategies.save()
+        if self.journal is not None:
+            self.journal.sync()
+
+    async def _run_steps(self, hwnd, steps, settle=True, completed=None):
+        """Run steps in order; return the error that stopped them, or None
+
+        With settle=False the pause after the last step is skipped. The names
+        of the steps that succeeded are appended to completed, if given.
+        """
+        loop = asyncio.get_running_loop()
+        for index, step in enumerate(steps):
+            try:
+                # Timed on the pool thread, so queueing for a thread is not counted
+                await loop.run_in_executor(
+                    self._executor, metrics.wrap(f"step.{step.name}", step.call)
+                )
+            except Exception as e:
+                if not step.optional:
+                    log.warning("Error in %s for window %s: %s", step.name, hwnd, e)
+                    return e
+                log.debug("Failed %s for window %s: %s", step.name, hwnd, e)
+            else:
+                if completed is not None:
+                    completed.append(step.name)
+            if step.pause and (settle or index < len(steps) - 1):
+                await asyncio.sleep(step.pause)
+        return None
+
+    async def _run_sequence(self, hwnd, steps):
+        started = time.perf_counter()
+        error = await self._run_steps(hwnd, steps)
+        return WindowResult(hwnd, error is None, time.perf_counter() - started, error)
+
+    async def _hide_fixed(self, hwnd):
+        """Hide with every strategy, as without a StrategyCache"""
+        started = time.perf_counter()
+        journaled = self.journal is not None and hwnd in self.journal.entries
+        completed = []
+        error = await self._run_steps(
+            hwnd, self.steps_for("hide", hwnd), completed=completed
+        )
+        if error is not None:
+            self._forget_failed_hide(hwnd, journaled, completed)
+        return WindowResult(hwnd, error is None, time.perf_counter() - started, error)
+
+    async def _hide_adaptive(self, hwnd):
+        """Hide with the learned strategy first and escalate until verified"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        journaled = self.journal is not None and hwnd in self.journal.entries
+        completed = []
+        key = await loop.run_in_executor(self._executor, self._app_key, hwnd)
+        level = self.strategies.start_level(key) if key else 0
+
+        # Everything up to the learned strategy goes in one batch
+        steps = hide_steps(
+            self.backend,
+            hwnd,
+            self.window_positions,
+            HIDE_STRATEGIES[level],
+            self.journal,
+        )
+        while True:
+            error = await self._run_steps(
+                hwnd, steps, settle=False, completed=completed
+            )
+            if error is not None:
+                self._forget_failed_hide(hwnd, journaled, completed)
+                return WindowResult(hwnd, False, time.perf_counter() - started, error)
+            if level == len(HIDE_STRATEGIES) - 1 or await self._verify_hidden(hwnd):
+                break
+            level += 1
+            steps = hide_strategy_steps(
+                self.backend,
+                hwnd,
+                self.window_positions,
+                HIDE_STRATEGIES[level],
+                self.journal,
+            )
+
+        if key:
+            self.strategies.record(key, level)
+        return WindowResult(hwnd, True, time.perf_counter() - started, None)
+
+    async def _verify_hidden(self, hwnd):
+        """Poll until the window leaves the Alt+Tab set or verify_timeout passes"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.verify_timeout
+        while True:
+            listed = await loop.run_in_executor(
+                self._executor, is_alt_tab_window, self.backend, hwnd
+            )
+            if not listed or loop.time() >= deadline:
+                metrics.record("verify", loop.time() - started)
+                return not listed
+            await asyncio.sleep(self.verify_interval)
+
+    async def _close_tracked(self, hwnd, terminate, timeout):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        def finish(outcome, error=None):
+            elapsed = time.perf_counter() - started
+            metrics.record("close.window", elapsed)
+            return CloseResult(hwnd, error is None, elapsed, error, outcome)
+
+        try:
+            pid = await loop.run_in_executor(
+                self._executor, self.backend.get_window_pid, hwnd
+            )
+            await loop.run_in_executor(
+                self._executor,
+                metrics.wrap(
+                    "step.close", lambda: self.backend.post_message(hwnd, WM_CLOSE)
+                ),
+            )
+        except Exception as e:
+            log.warning("Error closing window %s: %s", hwnd, e)
+            return finish("failed", e)
+
+        outcome = await self._wait_gone(hwnd, pid, timeout)
+        if outcome is not None:
+            return finish(outcome)
+        if not terminate or not pid or pid == os.getpid():
+            return finish(
+                "timeout", TimeoutError(f"window {hwnd} still open after {timeout} s")
+            )
+
+        log.info(
+            "Window %s ignored WM_CLOSE for %s s; terminating process %s",
+            hwnd,
+            timeout,
+            pid,
+        )
+        try:
+            await loop.run_in_executor(
+                self._executor, self.backend.terminate_process, pid
+            )
+        except Exception as e:
+            # It may have exited between the last check and the terminate
+            log.debug("Failed to terminate process %s: %s", pid, e)
+        if await self._wait_gone(hwnd, pid, self.terminate_timeout) is None:
+            return finish(
+                "timeout", TimeoutError(f"process {pid} still running after terminate")
+            )
+        return finish("terminated")
+
+    async def _wait_gone(self, hwnd, pid, timeout):
+        """Poll until the window is destroyed or its process exits
+
+        Returns "closed" or "exited", or None if neither happened in timeout seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not await loop.run_in_executor(
+                self._executor, self.backend.is_window, hwnd
+            ):
+                return "closed"
+            if pid and not await loop.run_in_executor(
+                self._executor, self.backend.process_exists, pid
+            ):
+                return "exited"
+            if loop.time() >= deadline:
+                return None
+            await asyncio.sleep(self.close_interval)
+
+    def _app_key(self, hwnd):
+        """Return the strategy cache key for a window's application, or None"""
+        try:
+            name = self.backend.get_process_name(self.backend.get_window_pid(hwnd))
+        except Exception:
+            return None
+        return name.lower() if name != "Unknown" else None
+
+    def _poll(self, future, callback):
+        if not future.done():
+            self.schedule(self.poll_interval, lambda: self._poll(future, callback))
+            return
+        callback(future.result())
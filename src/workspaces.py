@@ -0,0 +1,277 @@
+"""
+Workspace snapshots.
+
+A workspace is a named layout of the listed windows: which of them are
+visible, where each one is and how they are stacked. Saving one reads the
+rect and z-order of every listed window; restoring one hides and shows the
+windows whose visibility differs and then moves, sizes and restacks the
+visible ones in one deferred batch (BulkWindowEngine.arrange), so switching
+between layouts repaints the desktop once.
+
+Window handles do not survive an application restart, so a saved window is
+matched to an open window of the same process by its handle, then by its
+exact title, then by its title pattern, and last by taking the process's
+remaining windows in z-order. The pattern is a glob kept from the
+application part of the title when it is saved ("* - Notepad" for
+"notes.txt - Notepad"), so a window that has since opened another document
+still matches; it can be edited in workspaces.json. Listed windows that are
+not in the workspace are left alone.
+"""
+
+import fnmatch
+import logging
+import re
+import time
+from collections import namedtuple
+
+from .backends import (
+    HWND_TOP,
+    SWP_NOACTIVATE,
+    SWP_NOMOVE,
+    SWP_NOOWNERZORDER,
+    SWP_NOSIZE,
+)
+from .config import config_path, load_json, save_json
+
+WORKSPACE_FILE = "workspaces.json"
+
+# GetWindowRect of a minimized window reports it parked at this position
+MINIMIZED_POSITION = -32000
+
+# What separates the document part of a title from the application name
+TITLE_SEPARATORS = (" - ", " \u2014 ", " \u2013 ", " | ")
+
+# One window of a workspace; rect is None when the window was minimized, and
+# z is its place in the z-order, 0 being the topmost listed window
+WorkspaceWindow = namedtuple(
+    "WorkspaceWindow", ["hwnd", "process", "title", "pattern", "visible", "rect", "z"]
+)
+
+# saved is the time.time() the workspace was captured
+Workspace = namedtuple("Workspace", ["name", "windows", "saved"])
+
+# What restoring a workspace does: the windows to hide and to show, the
+# set_window_pos argument tuples placing the visible ones, and the saved
+# windows that matched no open window
+RestorePlan = namedtuple("RestorePlan", ["hide", "show", "placements", "missing"])
+
+log = logging.getLogger(__name__)
+
+
+def title_pattern(title):
+    """Return a glob matching a title whatever its document part, or None
+
+    The glob keeps what follows the last separator, the application name in
+    most titles. Titles without a separator give None.
+    """
+    cut = max(title.rfind(separator) for separator in TITLE_SEPARATORS)
+    if cut <= 0:
+        return None
+    return "*" + re.sub(r"([*?[])", r"[\1]", title[cut:])
+
+
+def capture_workspace(name, backend, windows, hidden_windows=(), window_positions=None):
+    """Describe the listed windows as a Workspace
+
+    Windows in hidden_windows are saved as hidden, at the rect they had
+    before they were hidden (from window_positions). Windows that close
+    while they are read are left out.
+    """
+    positions = window_positions if window_positions is not None else {}
+    order = {hwnd: z for z, hwnd in enumerate(backend.enum_windows())}
+    entries = []
+    for window in sorted(
+        windows, key=lambda window: order.get(window.hwnd, len(order))
+    ):
+        visible = window.hwnd not in hidden_windows and window.is_visible
+        if visible:
+            try:
+                rect = backend.get_window_rect(window.hwnd)
+            except Exception as e:
+                log.debug(
+                    "Leaving window %s out of workspace %r: %s", window.hwnd, name, e
+                )
+                continue
+        else:
+            rect = positions.get(window.hwnd)
+        rect = tuple(rect) if rect else None
+        if rect is not None and rect[0] <= MINIMIZED_POSITION:
+            rect = None
+        entries.append(
+            WorkspaceWindow(
+                window.hwnd,
+                window.process,
+                window.title,
+                title_pattern(window.title),
+                visible,
+                rect,
+                len(entries),
+            )
+        )
+    return Workspace(name, entries, time.time())
+
+
+def match_windows(workspace, windows):
+    """Pair saved windows with open ones; returns (pairs, missing)
+
+    pairs is a list of (WorkspaceWindow, window) and missing lists the
+    saved windows left without a match. Each open window matches at most
+    one saved window.
+    """
+    by_process = {}
+    for window in windows:
+        by_process.setdefault(window.process.lower(), []).append(window)
+    pairs = []
+    taken = set()
+    missing = list(workspace.windows)
+
+    def claim(matches):
+        left = []
+        for entry in missing:
+            window = next(
+                (
+                    window
+                    for window in by_process.get(entry.process.lower(), ())
+                    if window.hwnd not in taken and matches(entry, window)
+                ),
+                None,
+            )
+            if window is None:
+                left.append(entry)
+            else:
+                taken.add(window.hwnd)
+                pairs.append((entry, window))
+        return left
+
+    missing = claim(lambda entry, window: window.hwnd == entry.hwnd)
+    missing = claim(lambda entry, window: window.title == entry.title)
+    missing = claim(
+        lambda entry, window: bool(entry.pattern)
+        and fnmatch.fnmatchcase(window.title.lower(), entry.pattern.lower())
+    )
+    missing = claim(lambda entry, window: True)
+    return pairs, missing
+
+
+def plan_restore(workspace, windows, hidden_windows=()):
+    """Work out what restoring a workspace over the listed windows takes
+
+    The visible windows are placed top to bottom in their saved z-order,
+    each inserted below the one before it, without being activated.
+    """
+    pairs, missing = match_windows(workspace, windows)
+    hide, show, placements = [], [], []
+    above = HWND_TOP
+    for entry, window in sorted(pairs, key=lambda pair: pair[0].z):
+        hidden = window.hwnd in hidden_windows
+        if not entry.visible:
+            if not hidden:
+                hide.append(window.hwnd)
+            continue
+        if hidden:
+            show.append(window.hwnd)
+        flags = SWP_NOACTIVATE | SWP_NOOWNERZORDER
+        if entry.rect is None:
+            placement = (
+                window.hwnd,
+                above,
+                0,
+                0,
+                0,
+                0,
+                flags | SWP_NOMOVE | SWP_NOSIZE,
+            )
+        else:
+            left, top, right, bottom = entry.rect
+            placement = (
+                window.hwnd,
+                above,
+                left,
+                top,
+                right - left,
+                bottom - top,
+                flags,
+            )
+        placements.append(placement)
+        above = window.hwnd
+    return RestorePlan(hide, show, placements, missing)
+
+
+def _workspace_to_json(workspace):
+    return {
+        "saved": workspace.saved,
+        "windows": [
+            dict(entry._asdict(), rect=list(entry.rect) if entry.rect else None)
+            for entry in workspace.windows
+        ],
+    }
+
+
+def _workspace_from_json(name, data):
+    windows = []
+    for index, entry in enumerate(data["windows"]):
+        rect = entry.get("rect")
+        windows.append(
+            WorkspaceWindow(
+                int(entry.get("hwnd") or 0),
+                str(entry["process"]),
+                str(entry.get("title", "")),
+                entry.get("pattern") or None,
+                bool(entry.get("visible", True)),
+                tuple(int(value) for value in rect) if rect else None,
+                int(entry.get("z", index)),
+            )
+        )
+    return Workspace(name, windows, float(data.get("saved", 0)))
+
+
+class WorkspaceStore:
+    """Named workspaces persisted in the settings directory
+
+    Every change is written to disk at once; workspaces are saved by hand,
+    so writes are rare. A workspace that cannot be read is skipped.
+    """
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else config_path(WORKSPACE_FILE)
+        data = load_json(self.path, {}) or {}
+        self._workspaces = {}
+        for name, value in data.get("workspaces", {}).items():
+            try:
+                self._workspaces[name] = _workspace_from_json(name, value)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                log.warning("Ignoring unreadable workspace %r: %s", name, e)
+
+    def names(self):
+        """Return the workspace names in alphabetical order"""
+        return sorted(self._workspaces, key=str.lower)
+
+    def get(self, name):
+        """Return a Workspace by name, or None"""
+        return self._workspaces.get(name)
+
+    def put(self, workspace):
+        """Add a workspace, replacing any of the same name, and save"""
+        self._workspaces[workspace.name] = workspace
+        self.save()
+
+    def delete(self, name):
+        """Remove a workspace and save; returns whether it existed"""
+        if self._workspaces.pop(name, None) is None:
+            return False
+        self.save()
+        return True
+
+    def save(self):
+        """Write every workspace to disk"""
+        data = {
+            "version": 1,
+            "workspaces": {
+                name: _workspace_to_json(workspace)
+                for name, workspace in self._workspaces.items()
+            },
+        }
+        try:
+            save_json(self.path, data)
+        except OSError as e:
+            log.warning("Failed to save workspaces: %s", e)